@@ -35,8 +35,11 @@ from langgraph.graph.state import CompiledStateGraph
 from langgraph.types import StateSnapshot, Command, interrupt
 from openai import OpenAIError
 from services.search_service import SearchService
+from services.priority_queues import tier_for_user
+from middleware.access_control_middleware import access_control
 
 import os
+import asyncio
 import random
 import logging
 import json
@@ -50,13 +53,21 @@ from schemas import (
     Message,
     RangeFilter,
 )
-from utils import dump_messages, prepare_messages
+from utils import build_context_window, dump_messages, prepare_messages, split_turns
 from database_manager import mongo_manager
 from database import mongo_db
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
 
+# Fenêtre de contexte envoyée au LLM
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", 6))
+HISTORY_SUMMARY_BATCH = int(os.getenv("HISTORY_SUMMARY_BATCH", 3))
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", 6000))
+HISTORY_TOOL_MAX_CHARS = int(os.getenv("HISTORY_TOOL_MAX_CHARS", 600))
+# Tag des appels de résumé, exclus du flux SSE envoyé au client
+SUMMARY_TAG = "history_summary"
+
 # Initialisation des outils
 search_service = None
 google_places = None
@@ -93,6 +104,7 @@ async def search_listing(
     max_price: int,
     location_near: Optional[list] = None,
     enrich_top_k: int = 4,
+    bbox: Optional[list] = None,
     session_id: Annotated[str, InjectedState("session_id")] = None,
 ):
     """Search listings in listings website according to user preferences.
@@ -105,6 +117,7 @@ async def search_listing(
         max_price: Maximum price wanted
         location_near: Optional nearby locations in a list
         enrich_top_k: Number of listings to enrich with page details
+        bbox: Optional area [min_lat, min_lon, max_lat, max_lon] for borough or city wide searches
         state: The state of the graph
 
     """
@@ -126,14 +139,25 @@ async def search_listing(
             "max_price": max_price,
             "location_near": location_near,
             "enrich_top_k": enrich_top_k,
+            "bbox": bbox,
         }
 
-        user_ip = "127.0.0.1"
+        # L'IP du client n'arrive pas jusqu'à l'outil: limite par session seulement
+        # (une IP fixe mettrait tous les utilisateurs dans le même quota)
+        user_ip = None
+
+        # Utilisateurs premium: queue prioritaire (scraping:high)
+        try:
+            tier = tier_for_user(await access_control.is_premium(session_id))
+        except Exception as e:
+            logger.warning(f"Niveau de l'utilisateur inconnu: {e}\n")
+            tier = tier_for_user(False)
 
         result = await search_service.search_listings(
             search_params,
             user_ip,
             session_id,
+            tier=tier,
         )
 
         logger.info(f"Résultat SearchService: {result}\n")
@@ -145,6 +169,7 @@ async def search_listing(
                 "data": result["data"],
                 "source": "cache",
                 "cached_at": result["cached_at"],
+                "stale": result.get("stale", False),
             }
         elif result["status"] == "queued":
             # 📋 JOB EN QUEUE : Non-bloquant !
@@ -174,6 +199,16 @@ async def search_listing(
                 "data": result["data"],
                 "source": "completed_job",
             }
+        elif result["status"] == "no_results":
+            # 🔎 CACHE NÉGATIF : même recherche vide ou en échec il y a peu
+            logger.info(f"🔎 Cache négatif: {result['reason']}\n")
+            return {
+                "status": "no_results",
+                "reason": result["reason"],
+                "message": result["message"],
+                "retry_after": result["retry_after"],
+                "source": "negative_cache",
+            }
         elif result["status"] == "rate_limited":
             # 🚫 RATE LIMIT : Trop de requêtes
             logger.warning("🚫 Rate limit dépassé\n")
@@ -238,10 +273,48 @@ class IanGraph:
             api_key=os.getenv("OPENAI_API_KEY"),
             max_tokens=1000,
         ).bind_tools([search_listing])
+        # Modèle sans outils pour résumer les anciens tours
+        self.summary_llm = ChatOpenAI(
+            model="gpt-4o-mini",
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_tokens=400,
+        )
         # Utiliser le manager au lieu d'une connexion directe
         self._client = mongo_manager.get_async_client()
         self._graph: Optional[CompiledStateGraph] = None
         self._checkpointer: Optional[AsyncMongoDBSaver] = None
+        self._startup_lock: Optional[asyncio.Lock] = None
+
+    async def startup(self) -> None:
+        """Construit une fois par processus le checkpointer et le graph compilé.
+
+        Le checkpointer réutilise le client Motor partagé de mongo_manager
+        (pool de connexions) au lieu d'ouvrir une connexion par requête.
+        """
+        if self._startup_lock is None:
+            self._startup_lock = asyncio.Lock()
+        async with self._startup_lock:
+            if self._graph is not None:
+                return
+            checkpointer = AsyncMongoDBSaver(
+                self._client,
+                db_name=os.getenv("MONGO_DB"),
+            )
+            self._graph_builder = await self._create_graph_builder()
+            self._graph = self._graph_builder.compile(checkpointer=checkpointer)
+            self._checkpointer = checkpointer
+            logger.info("Graph compilé et checkpointer prêt")
+
+    async def shutdown(self) -> None:
+        """Libère le graph compilé (le client Motor est fermé par mongo_manager)."""
+        self._graph = None
+        self._checkpointer = None
+
+    async def _get_graph(self) -> CompiledStateGraph:
+        """Retourne le graph compilé, en le construisant au premier appel."""
+        if self._graph is None:
+            await self.startup()
+        return self._graph
 
     def __process_message(self, messages: list[BaseMessage]) -> list[Message]:
         openai_style_messages = convert_to_openai_messages(messages)
@@ -322,110 +395,98 @@ class IanGraph:
         }
 
         try:
-            # ✅ Créer le checkpointer et compiler le graph pour cette invocation
-            async with AsyncMongoDBSaver.from_conn_string(
-                os.getenv("MONGO_URI"),
-                db_name=os.getenv("MONGO_DB"),
-                collection_name="checkpointers",
-            ) as checkpointer:
-
-                # Créer le graph builder si pas encore fait
-                if not hasattr(self, "_graph_builder"):
-                    self._graph_builder = await self._create_graph_builder()
+            graph_with_checkpointer = await self._get_graph()
 
-                # Compiler le graph avec le checkpointer pour cette invocation
-                graph_with_checkpointer = self._graph_builder.compile(
-                    checkpointer=checkpointer
-                )
+            events = graph_with_checkpointer.astream_events(
+                {"messages": dump_messages(messages), "session_id": session_id},
+                config=config,
+            )
+            async for event in events:
+                event_type = event["event"]
+                if SUMMARY_TAG in event.get("tags", []):
+                    continue
 
-                events = graph_with_checkpointer.astream_events(
-                    {"messages": dump_messages(messages), "session_id": session_id},
-                    config=config,
-                )
-                async for event in events:
-                    event_type = event["event"]
-
-                    # 🔍 DEBUG : Voir la structure de l'event
-                    # print(f"Event reçu: {event}\n")
-                    # print(f"Event type: {event_type}\n")
-                    # print(f"Event data keys: {event.get('data', {}).keys()}")
-
-                    # ✅ APRÈS (sécurisé) - Vérifier AVANT d'accéder
-                    if event_type in (
-                        "on_llm_stream",
-                        "on_chat_model_stream",
-                    ) and "chunk" in event.get("data", {}):
-                        chunk_content = self.serialise_ai_message_chunk(
-                            event["data"]["chunk"]
-                        )
-                        payload = {"type": "content", "content": chunk_content}
+                # 🔍 DEBUG : Voir la structure de l'event
+                # print(f"Event reçu: {event}\n")
+                # print(f"Event type: {event_type}\n")
+                # print(f"Event data keys: {event.get('data', {}).keys()}")
+
+                # ✅ APRÈS (sécurisé) - Vérifier AVANT d'accéder
+                if event_type in (
+                    "on_llm_stream",
+                    "on_chat_model_stream",
+                ) and "chunk" in event.get("data", {}):
+                    chunk_content = self.serialise_ai_message_chunk(
+                        event["data"]["chunk"]
+                    )
+                    payload = {"type": "content", "content": chunk_content}
+                    yield f"data: {json.dumps(payload)}\n\n"
+                # elif event_type == "on_chat_model_stream":
+
+                elif event_type == "on_chat_model_end":
+                    data = event.get("data", {})
+                    output = data.get("output")
+                    if output and hasattr(output, "tool_calls"):
+                        tool_calls = output.tool_calls
+                        payload = {"type": "tool_calls", "tool_calls": tool_calls}
                         yield f"data: {json.dumps(payload)}\n\n"
-                    # elif event_type == "on_chat_model_stream":
-
-                    elif event_type == "on_chat_model_end":
-                        data = event.get("data", {})
-                        output = data.get("output")
-                        if output and hasattr(output, "tool_calls"):
-                            tool_calls = output.tool_calls
-                            payload = {"type": "tool_calls", "tool_calls": tool_calls}
-                            yield f"data: {json.dumps(payload)}\n\n"
-
-                    elif event_type == "on_tool_start":
-                        data = event.get("data", {})
-                        # certains événements ont 'name' et 'tool_input' directement
-                        tool_name = data.get("name") or getattr(
-                            data.get("output"), "tool_name", "unknown"
-                        )
-                        tool_args = data.get("tool_input") or getattr(
-                            data.get("output"), "tool_input", {}
-                        )
+
+                elif event_type == "on_tool_start":
+                    data = event.get("data", {})
+                    # certains événements ont 'name' et 'tool_input' directement
+                    tool_name = data.get("name") or getattr(
+                        data.get("output"), "tool_name", "unknown"
+                    )
+                    tool_args = data.get("tool_input") or getattr(
+                        data.get("output"), "tool_input", {}
+                    )
+                    payload = {
+                        "type": "tool_start",
+                        "tool": tool_name,
+                        "args": tool_args,
+                    }
+                    yield f"data: {json.dumps(payload)}\n\n"
+
+                elif event_type == "on_tool_end":
+                    print(f"Event reçu: {event}\n")
+                    data = event.get("data", {})
+                    # L'objet output contient la ToolMessage avec JSON dans content
+                    output: ToolMessage = data.get("output")
+                    if output:
+                        # Émettre d'abord l'événement tool_end
                         payload = {
-                            "type": "tool_start",
-                            "tool": tool_name,
-                            "args": tool_args,
+                            "type": "tool_end",
+                            "tool": output.name,
+                            "result": output.content,
                         }
                         yield f"data: {json.dumps(payload)}\n\n"
-
-                    elif event_type == "on_tool_end":
-                        print(f"Event reçu: {event}\n")
-                        data = event.get("data", {})
-                        # L'objet output contient la ToolMessage avec JSON dans content
-                        output: ToolMessage = data.get("output")
-                        if output:
-                            # Émettre d'abord l'événement tool_end
-                            payload = {
-                                "type": "tool_end",
-                                "tool": output.name,
-                                "result": output.content,
-                            }
-                            yield f"data: {json.dumps(payload)}\n\n"
-                            # Puis parser le JSON de output.content
-                            try:
-                                result_data = json.loads(output.content)
-                                print(f"result_data reçu: {result_data}\n")
-                                if result_data.get("status") in (
-                                    "queued",
-                                    "processing",
-                                ) and result_data.get("job_id"):
-                                    job_payload = {
-                                        "type": "job",
-                                        "job_id": result_data["job_id"],
-                                        "status": result_data["status"],
-                                        "estimated_wait": result_data.get(
-                                            "estimated_wait"
-                                        ),
-                                    }
-                                    print(f"job_payload reçu: {job_payload}\n")
-                                    yield f"data: {json.dumps(job_payload)}\n\n"
-                            except Exception as e:
-                                print(f"Erreur parsing output.content: {e}")
-
-                    elif event_type == "end" or (
-                        event_type == "on_chain_end"
-                        and event.get("name") == "LangGraph"
-                    ):
-                        yield f"data: {json.dumps({'type': '[DONE]'})}\n\n"
-                        break
+                        # Puis parser le JSON de output.content
+                        try:
+                            result_data = json.loads(output.content)
+                            print(f"result_data reçu: {result_data}\n")
+                            if result_data.get("status") in (
+                                "queued",
+                                "processing",
+                            ) and result_data.get("job_id"):
+                                job_payload = {
+                                    "type": "job",
+                                    "job_id": result_data["job_id"],
+                                    "status": result_data["status"],
+                                    "estimated_wait": result_data.get(
+                                        "estimated_wait"
+                                    ),
+                                }
+                                print(f"job_payload reçu: {job_payload}\n")
+                                yield f"data: {json.dumps(job_payload)}\n\n"
+                        except Exception as e:
+                            print(f"Erreur parsing output.content: {e}")
+
+                elif event_type == "end" or (
+                    event_type == "on_chain_end"
+                    and event.get("name") == "LangGraph"
+                ):
+                    yield f"data: {json.dumps({'type': '[DONE]'})}\n\n"
+                    break
 
         except Exception as e:
             logger.error(f"error_getting_response: {e}")
@@ -447,35 +508,21 @@ class IanGraph:
             },
         }
         try:
-            # ✅ Créer le checkpointer et compiler le graph pour cette invocation
-            async with AsyncMongoDBSaver.from_conn_string(
-                os.getenv("MONGO_URI"),
-                db_name=os.getenv("MONGO_DB"),
-                collection_name="checkpointers",
-            ) as checkpointer:
-
-                # Créer le graph builder si pas encore fait
-                if not hasattr(self, "_graph_builder"):
-                    self._graph_builder = await self._create_graph_builder()
-
-                # Compiler le graph avec le checkpointer pour cette invocation
-                graph_with_checkpointer = self._graph_builder.compile(
-                    checkpointer=checkpointer
-                )
+            graph_with_checkpointer = await self._get_graph()
 
-                # Convertir session_id en string si c'est un ObjectId
-                session_id_str = (
-                    str(session_id) if hasattr(session_id, "__str__") else session_id
-                )
+            # Convertir session_id en string si c'est un ObjectId
+            session_id_str = (
+                str(session_id) if hasattr(session_id, "__str__") else session_id
+            )
 
-                response = await graph_with_checkpointer.ainvoke(
-                    {"messages": dump_messages(messages), "session_id": session_id_str},
-                    config=config,
-                )
+            response = await graph_with_checkpointer.ainvoke(
+                {"messages": dump_messages(messages), "session_id": session_id_str},
+                config=config,
+            )
 
-                logger.info(f"response: {response} \n")
+            logger.info(f"response: {response} \n")
 
-                return self.__process_message(response["messages"])
+            return self.__process_message(response["messages"])
         except Exception as e:
             logger.error(f"error_getting_response: {e}")
             raise e
@@ -538,26 +585,93 @@ class IanGraph:
 
             logger.info(f"lenght of state.messages: {len(state.messages)}")
 
-            # Build safe history: preserve ToolMessages, remove orphan tool_calls
             history = self._coerce_messages(state.messages)
-            history = self._sanitize_messages(history)
 
-            system_msg = SystemMessage(
-                content="You are a helpful assistant that can search for listings and provide information about them."
+            # Replier dans le résumé les tours sortis de la fenêtre verbatim.
+            # Le résumé est mis en cache dans le state: chaque tour n'est résumé qu'une fois.
+            summary = state.summary
+            summarized_count = min(state.summarized_count, len(history))
+            turns = [
+                i for i in split_turns(history) if i >= summarized_count
+            ]
+            if len(turns) > HISTORY_KEEP_TURNS + HISTORY_SUMMARY_BATCH - 1:
+                keep_from = turns[-HISTORY_KEEP_TURNS]
+                folded = await self._summarize(
+                    summary, history[summarized_count:keep_from]
+                )
+                # Résumé en échec: compteur inchangé, ces tours restent dans la
+                # fenêtre (build_context_window les coupe) et seront repliés au
+                # prochain tour
+                if folded is not None:
+                    summary, summarized_count = folded, keep_from
+
+            # Build safe history: preserve ToolMessages, remove orphan tool_calls
+            window = self._sanitize_messages(history[summarized_count:])
+
+            llm_input: list[BaseMessage] = build_context_window(
+                window,
+                system_prompt="You are a helpful assistant that can search for listings and provide information about them.",
+                summary=summary,
+                max_tokens=HISTORY_MAX_TOKENS,
+                tool_max_chars=HISTORY_TOOL_MAX_CHARS,
+            )
+            logger.info(
+                f"Fenêtre LLM: {len(llm_input)} messages / {len(history)} dans l'historique"
             )
-            llm_input: list[BaseMessage] = [system_msg] + history
 
             logger.info("Message ajouté au state")
             logger.info("=== FIN CHATBOT ===")
 
             ai_msg = await self.llm.ainvoke(llm_input)
-            return {"messages": [ai_msg]}
+            return {
+                "messages": [ai_msg],
+                "summary": summary,
+                "summarized_count": summarized_count,
+            }
 
         except Exception as e:
             logger.error(f"Erreur dans chatbot: {e}")
             logger.error(f"Traceback:", exc_info=True)
             raise
 
+    async def _summarize(
+        self, summary: str, messages: list[BaseMessage]
+    ) -> Optional[str]:
+        """Fold `messages` into the rolling summary (one cheap LLM call).
+
+        Returns None when the summary call fails, so the caller keeps the
+        messages instead of marking them as summarized.
+        """
+        if not messages:
+            return summary
+        transcript = "\n".join(
+            f"{m.type}: {m.content}"[:1000]
+            for m in messages
+            if not isinstance(m, ToolMessage)
+        )
+        prompt = [
+            SystemMessage(
+                content=(
+                    "Update the running summary of an apartment-search conversation. "
+                    "Keep the user's criteria (city, budget, bedrooms, locations), "
+                    "preferences, rejected options and pending searches. "
+                    "Answer with the summary only, under 200 words."
+                )
+            ),
+            HumanMessage(
+                content=f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"
+            ),
+        ]
+        try:
+            response = await self.summary_llm.ainvoke(
+                prompt, config={"tags": [SUMMARY_TAG]}
+            )
+            return response.content
+        except Exception as e:
+            # Pas de résumé plutôt qu'un échec du tour
+            logger.error(f"Erreur lors du résumé de l'historique: {e}")
+            return None
+
     async def tools_router(self, state: GraphState):
         logger.info(f"=== DÉBUT TOOLS_ROUTER ===")
 
@@ -1,68 +1,183 @@
 from agents.tools.base_tool import BaseTool
+from utils.geocode_cache import geocode_cache, normalize_query
+from schemas.places import DEFAULT_PLACE_FIELDS, PlacesResponse, field_mask
+from services.http_pool import http_pool
 from dotenv import load_dotenv
+from typing import Dict, Iterable, Optional
 import requests
+import asyncio
+import logging
+import httpx
 import os
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+class PlacesError(Exception):
+    """Appel Google Places impossible (réseau, timeout, statut HTTP)."""
 
 
 class GooglePlaces(BaseTool):
     def __init__(self):
         self.api_key = os.getenv("GOOGLE_PLACES_API_KEY")
         self.base_url = "https://places.googleapis.com/v1/places:searchText"
-    
+        # Délai strict par appel: l'API répond en < 1 s quand tout va bien
+        self.timeout = float(os.getenv("PLACES_TIMEOUT", 5))
+
+        # Connexion keep-alive pour le chemin synchrone (execute)
+        self.session = requests.Session()
+
+        # Requêtes en vol, par requête normalisée: les appels identiques
+        # concurrents partagent la même tâche (liés à une event loop)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Métriques
+        self.api_calls = 0
+        self.coalesced = 0
+
     @property
     def name(self):
         return "google_places"
 
-    @property 
+    @property
     def description(self):
         return "Search for places using Google Places API based on location and keywords"
 
-    def execute(self,city:str,location_near:list):
-        
-        text_query = []
-        
-        print(self.api_key)
-        headers ={
+    def _headers(self, fields: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        return {
             "Content-Type": "application/json",
-            "X-Goog-Api-Key": self.api_key,
-            "X-Goog-FieldMask": "places.displayName,places.location"   
-        }       
-            
+            "X-Goog-Api-Key": self.api_key or "",
+            "X-Goog-FieldMask": field_mask(fields),
+        }
+
+    @staticmethod
+    def _text_query(city: str, location_near: Optional[list]) -> str:
+        text_query = []
         if location_near:
-            location_near = " ".join(location_near)
-            print("location_near: ",location_near)
-            text_query.append(f"{location_near}")
-            
+            text_query.append(" ".join(location_near))
         if city:
-            print("city: ",city)
             text_query.append(f"in {city}")
-            
-        
-        text_query = " ".join(text_query)
-        
-        print(text_query)
-        
+        return " ".join(text_query)
+
+    def execute(self,city:str,location_near:list,timeout:float=None):
+
+        # Ville connue (data/cities.json) ou requête déjà résolue: pas d'appel réseau
+        cached = geocode_cache.get(city, location_near)
+        if cached is not None:
+            return cached
+
+        text_query = self._text_query(city, location_near)
+        logger.info(f"[GooglePlaces] searchText: {text_query}")
+
         data = {
             "textQuery": text_query
         }
-        
+
         try:
-            response = requests.post(
+            self.api_calls += 1
+            response = self.session.post(
                 self.base_url,
-                headers=headers,
-                json=data  # requests convertit automatiquement en JSON
+                headers=self._headers(),
+                json=data,  # requests convertit automatiquement en JSON
+                timeout=timeout or self.timeout,
             )
             response.raise_for_status()
-            print(response.json())
-            return response.json()
-            
+            result = response.json()
+            if result.get("places"):
+                geocode_cache.set(city, location_near, result)
+            else:
+                geocode_cache.set_missing(city, location_near)
+            return result
+
         except requests.exceptions.RequestException as e:
             print(f"Erreur lors de la requête: {e}")
             return None
-            
-        
-        
-        
\ No newline at end of file
+
+    async def search_async(
+        self,
+        city: str,
+        location_near: Optional[list] = None,
+        timeout: Optional[float] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> PlacesResponse:
+        """
+        Version asynchrone d'execute, réponse typée (schemas/places.py).
+
+        - client httpx partagé (services/http_pool): connexions keep-alive
+        - délai strict: min(timeout, PLACES_TIMEOUT)
+        - appels identiques concurrents fusionnés en un seul appel réseau;
+          l'abandon d'un appelant (timeout, annulation) n'annule pas les autres
+        Lève PlacesError si l'API est injoignable ou répond en erreur.
+        """
+        fields = tuple(fields or DEFAULT_PLACE_FIELDS)
+        default_mask = set(fields) <= set(DEFAULT_PLACE_FIELDS)
+        query = self._text_query(city, location_near)
+
+        # Le cache géocodage ne contient que displayName/location
+        if default_mask:
+            cached = await asyncio.to_thread(geocode_cache.get, city, location_near)
+            if cached is not None:
+                return PlacesResponse.from_api(cached, query=query, source="cache")
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._inflight = {}
+            self._loop = loop
+
+        key = f"{normalize_query(city, location_near)}|{field_mask(fields)}"
+        task = self._inflight.get(key)
+        if task is None:
+            task = loop.create_task(self._fetch(city, location_near, fields, default_mask))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+
+        limit = min(timeout, self.timeout) if timeout is not None else self.timeout
+        try:
+            data = await asyncio.wait_for(asyncio.shield(task), timeout=limit)
+        except asyncio.TimeoutError:
+            raise PlacesError(f"timeout ({limit:.1f}s) pour '{query}'")
+        return PlacesResponse.from_api(data, query=query)
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        # Tous les appelants ont pu abandonner: l'erreur est lue ici
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"[GooglePlaces] échec: {task.exception()}")
+
+    async def _fetch(
+        self, city: str, location_near: Optional[list], fields: tuple, cache: bool
+    ) -> dict:
+        text_query = self._text_query(city, location_near)
+        logger.info(f"[GooglePlaces] searchText (async): {text_query}")
+        self.api_calls += 1
+        try:
+            response = await http_pool.get(None, verify=True).post(
+                self.base_url,
+                headers=self._headers(fields),
+                json={"textQuery": text_query},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            result = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            raise PlacesError(f"{type(e).__name__}: {e}") from e
+
+        if cache:
+            if result.get("places"):
+                await asyncio.to_thread(geocode_cache.set, city, location_near, result)
+            else:
+                # Aucun lieu: entrée négative courte (GEOCODE_NEGATIVE_TTL)
+                await asyncio.to_thread(geocode_cache.set_missing, city, location_near)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "api_calls": self.api_calls,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
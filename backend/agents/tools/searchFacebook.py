@@ -43,11 +43,17 @@ load_dotenv()
 from agents.tools.base_tool import BaseTool
 from agents.tools.bases.base_scraper import BaseScraper
 from agents.tools.onePage import OnePage
+from services.http_pool import http_pool
+from utils.request_budget import RequestBudget, RequestBudgetExhausted
+from utils.deadline import Deadline, DeadlineExceeded
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+GRAPHQL_URL = "https://www.facebook.com/api/graphql/"
+
+
 class SearchFacebook(BaseTool, BaseScraper):
 
     @property
@@ -72,6 +78,23 @@ class SearchFacebook(BaseTool, BaseScraper):
 
         self.max_retries = 3
         self.retry_delay = 10
+
+        # Budget de pagination du feed (page_info.end_cursor)
+        self.feed_max_listings = int(os.getenv("FB_FEED_MAX_LISTINGS", 100))
+        self.feed_max_pages = int(os.getenv("FB_FEED_MAX_PAGES", 10))
+        self.feed_time_budget = float(os.getenv("FB_FEED_TIME_BUDGET", 30))
+        # execute_async ne garde que top_k annonces: la pagination s'arrête à
+        # top_k * FB_COLLECT_FACTOR (marge pour le classement et les doublons)
+        self.collect_factor = int(os.getenv("FB_COLLECT_FACTOR", 2))
+
+        # Recherche multi-tuiles (bbox / polygone)
+        self.search_radius = int(os.getenv("FB_SEARCH_RADIUS_M", 4000))
+        self.tile_concurrency = int(os.getenv("FB_TILE_CONCURRENCY", 3))
+        self.tile_max_pages = int(os.getenv("FB_TILE_MAX_PAGES", 2))
+        self.tile_max_requests = int(os.getenv("FB_TILE_MAX_REQUESTS", 120))
+
+        # Temps gardé pour l'enrichissement quand la pagination suit l'échéance du job
+        self.enrich_reserve = float(os.getenv("FB_ENRICH_RESERVE", 20))
         self.event_publisher = EventPublisher()
 
     def execute(
@@ -85,7 +108,64 @@ class SearchFacebook(BaseTool, BaseScraper):
         user_id: str,
         job_id,
     ) -> Any:
+        return asyncio.run(
+            self.collect_listings(
+                lat,
+                lon,
+                minBudget,
+                maxBudget,
+                minBedrooms,
+                maxBedrooms,
+                user_id,
+                job_id,
+            )
+        )
 
+    async def collect_listings(
+        self,
+        lat: float,
+        lon: float,
+        minBudget: float,
+        maxBudget: float,
+        minBedrooms: int,
+        maxBedrooms: int,
+        user_id: str,
+        job_id,
+    ) -> list:
+        """Collecte les annonces brutes via GraphQL, sans bloquer l'event loop."""
+        listings = []
+        async for page in self.stream_listings(
+            lat,
+            lon,
+            minBudget,
+            maxBudget,
+            minBedrooms,
+            maxBedrooms,
+            user_id,
+            job_id,
+        ):
+            listings.extend(page)
+        return listings
+
+    async def stream_listings(
+        self,
+        lat: float,
+        lon: float,
+        minBudget: float,
+        maxBudget: float,
+        minBedrooms: int,
+        maxBedrooms: int,
+        user_id: str,
+        job_id,
+        tiles: list = None,
+        deadline: Deadline = None,
+        max_listings: int = None,
+    ):
+        """
+        Produit les annonces brutes page par page (voir iter_listings), ou
+        tuile par tuile si une liste de tuiles est fournie, jusqu'à
+        max_listings annonces (FB_FEED_MAX_LISTINGS par défaut).
+        """
         self.listings = []
         self.seen_listing_ids = set()
 
@@ -119,11 +199,31 @@ class SearchFacebook(BaseTool, BaseScraper):
         )
 
         # query = {"lat":"40.7128","lon":"-74.0060","bedrooms":2,"minBudget":80000,"maxBudget":100000,"bedrooms":3,"minBedrooms":3,"maxBedrooms":4}
-        listings = asyncio.run(
-            self.scrape(inputs["lat"], inputs["lon"], inputs, user_id, job_id)
-        )
-        if not listings:
-            listings = []
+        if tiles:
+            pages = self.iter_tiled_listings(
+                tiles,
+                inputs,
+                user_id,
+                job_id,
+                max_listings=max_listings,
+                deadline=deadline,
+            )
+        else:
+            pages = self.iter_listings(
+                inputs["lat"],
+                inputs["lon"],
+                inputs,
+                user_id,
+                job_id,
+                max_listings=max_listings,
+                deadline=deadline,
+            )
+
+        found = 0
+        async for page in pages:
+            found += len(page)
+            yield page
+        if not found:
             print("Aucune annonce trouvée: ")
             self.event_publisher.publish(
                 job_id,
@@ -135,8 +235,6 @@ class SearchFacebook(BaseTool, BaseScraper):
             )
             # print("listings: ", listings)
 
-        return listings
-
     async def execute_async(
         self,
         lat: float,
@@ -152,8 +250,16 @@ class SearchFacebook(BaseTool, BaseScraper):
         top_k: int = 5,
         concurrency: int = 3,
         timeout_sec: float = 90.0,
+        tiles: list = None,
+        deadline: Deadline = None,
         **kwargs,
     ) -> Any:
+        """
+        Collecte + enrichissement des top_k annonces dans les limites de
+        `deadline` (échéance du job): à l'échéance, les annonces déjà
+        collectées sont retournées et deadline.partial passe à True.
+        """
+        deadline = deadline or Deadline.after(timeout_sec + self.feed_time_budget)
         logger.info(
             "[execute_async] start lat=%.5f lon=%.5f price=[%s,%s] beds=[%s,%s] top_k=%s conc=%s timeout=%ss",
             lat,
@@ -167,41 +273,23 @@ class SearchFacebook(BaseTool, BaseScraper):
             timeout_sec,
         )
 
-        # Exécuter la collecte synchrone existante dans un thread
-        def _run_sync():
-            return self.execute(
-                lat,
-                lon,
-                minBudget,
-                maxBudget,
-                minBedrooms,
-                maxBedrooms,
-                user_id,
-                job_id,
-            )
-
-        listings = await asyncio.to_thread(_run_sync)
-        logger.info(
-            "[execute_async] base listings récupérés: %d",
-            len(listings) if isinstance(listings, list) else -1,
-        )
-
-        # if progress:
-        #     progress("progress", {"count": len(listings)})
-
-        if not listings:
-            return []
-
-        self.event_publisher.publish(
-            job_id,
-            "progress",
-            {"status": "processing", "message": f"{len(listings)} listings"},
-        )
-
         onepage = OnePage()
         sem = asyncio.Semaphore(concurrency)
 
-        async def enrich(item: dict) -> dict:
+        def publish_enriched(item: dict, position: int) -> None:
+            # Résultats progressifs: chaque annonce enrichie part dès que son
+            # fetch se termine (ordre de complétion), avant l'événement completed
+            self.event_publisher.publish(
+                job_id,
+                "listing_enriched",
+                {
+                    "position": position,
+                    "listing": self.normalize_item(item),
+                    "error": bool(item.get("onepage", {}).get("error")),
+                },
+            )
+
+        async def enrich(item: dict, position: int) -> dict:
             # Gestion intelligente de l'URL selon le type de listing
             url = None
 
@@ -231,10 +319,12 @@ class SearchFacebook(BaseTool, BaseScraper):
                     or item.get("title"),
                     item.get("listing_type", "unknown"),
                 )
+                publish_enriched(item, position)
                 return item
 
             try:
                 start = asyncio.get_event_loop().time()
+                deadline.check("enrichment")
                 logger.debug(
                     "[enrich] start _id=%s url=%s type=%s",
                     item.get("_id"),
@@ -259,8 +349,11 @@ class SearchFacebook(BaseTool, BaseScraper):
                 )
 
                 async with sem:
+                    fetch_timeout = deadline.timeout(cap=timeout_sec)
+                    if fetch_timeout <= 0:
+                        raise DeadlineExceeded("enrichment")
                     data = await asyncio.wait_for(
-                        onepage.fetch_page(url, job_id), timeout=timeout_sec
+                        onepage.fetch_page(url, job_id), timeout=fetch_timeout
                     )
 
                 # self.event_publisher.publish(
@@ -296,6 +389,9 @@ class SearchFacebook(BaseTool, BaseScraper):
                     desc_len,
                     item.get("listing_type", "unknown"),
                 )
+            except DeadlineExceeded:
+                deadline.cut("enrichment")
+                item["onepage"] = {"error": True, "reason": "deadline"}
             except Exception as e:
                 item["onepage"] = {"error": True, "reason": str(e)}
                 logger.exception(
@@ -305,26 +401,98 @@ class SearchFacebook(BaseTool, BaseScraper):
                     item.get("listing_type", "unknown"),
                     e,
                 )
+            # Un fetch en échec ne termine pas le job: l'annonce de base reste
+            # valide et part avec error=true
+            publish_enriched(item, position)
+            return item
 
+        # Collecte native async, page par page: l'enrichissement des premiers
+        # résultats démarre pendant que la pagination continue.
+        # Seules top_k annonces sont retournées: inutile de paginer au-delà
+        max_listings = top_k * max(self.collect_factor, 1) if top_k > 0 else None
+        # Recherche multi-lieux: les top_k ne sont connus qu'une fois tous les
+        # lieux collectés (classement stable), l'enrichissement attend
+        anchored = any("anchor" in tile for tile in tiles or [])
+        listings = []
+        tasks = []
+        try:
+            async for page in self.stream_listings(
+                lat,
+                lon,
+                minBudget,
+                maxBudget,
+                minBedrooms,
+                maxBedrooms,
+                user_id,
+                job_id,
+                tiles=tiles,
+                deadline=deadline,
+                max_listings=max_listings,
+            ):
+                start = len(listings)
+                listings.extend(page)
+                window = page[: max(top_k - start, 0)] if top_k > 0 else page
+                if window:
+                    # Annonces de base normalisées dès le parse GraphQL
+                    self.event_publisher.publish(
+                        job_id,
+                        "partial_results",
+                        {
+                            "offset": start,
+                            "listings": [self.normalize_item(x) for x in window],
+                        },
+                    )
+                for item in page:
+                    if anchored or len(tasks) >= max(top_k, 0):
+                        break
+                    tasks.append(asyncio.create_task(enrich(item, len(tasks))))
                 self.event_publisher.publish(
                     job_id,
-                    "error",
-                    {
-                        "status": "error",
-                        "message": "Erreur lors de la recherche d'appartement",
-                    },
+                    "progress",
+                    {"status": "processing", "message": f"{len(listings)} listings"},
                 )
-            return item
+        except DeadlineExceeded:
+            # Échéance pendant la collecte: on garde ce qui est déjà arrivé
+            deadline.cut("collection")
+            logger.info("[execute_async] échéance atteinte pendant la collecte")
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        logger.info("[execute_async] base listings récupérés: %d", len(listings))
+
+        # if progress:
+        #     progress("progress", {"count": len(listings)})
+
+        if not listings:
+            return []
+
+        if anchored:
+            listings = self.rank_listings(listings)
+            tasks = [
+                asyncio.create_task(enrich(item, position))
+                for position, item in enumerate(listings[: max(top_k, 0)])
+            ]
 
-        targets = listings[: top_k if top_k > 0 else 0]
         logger.info(
             "[execute_async] enrich targets: %s",
-            [t.get("_id") for t in targets],
+            [t.get("_id") for t in listings[: len(tasks)]],
         )
-        if targets:
-            enriched = await asyncio.gather(*(enrich(li) for li in targets))
-            listings[: len(enriched)] = enriched
-            logger.info("[execute_async] enrich terminé: %d items", len(enriched))
+        if tasks:
+            # Les annonces sont enrichies sur place: à l'échéance, celles dont
+            # le fetch n'est pas fini restent dans leur version de base
+            _, pending = await asyncio.wait(tasks, timeout=deadline.remaining())
+            if pending:
+                deadline.cut("enrichment")
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+            logger.info(
+                "[execute_async] enrich terminé: %d/%d items",
+                len(tasks) - len(pending),
+                len(tasks),
+            )
             self.event_publisher.publish(
                 job_id,
                 "progress",
@@ -365,19 +533,19 @@ class SearchFacebook(BaseTool, BaseScraper):
         )
         return normalized
 
-    def load_fb_headers(self, headers, session):
+    def load_fb_headers(self, headers, request_headers):
         # dict: simple
         if isinstance(headers, dict):
-            session.headers.update(headers)
+            request_headers.update(headers)
 
         # liste: [(k, v)] ou [{"name": k, "value": v}]
         elif isinstance(headers, list):
             for h in headers:
                 if isinstance(h, (list, tuple)) and len(h) == 2:
                     k, v = h
-                    session.headers[k] = v
+                    request_headers[k] = v
                 elif isinstance(h, dict) and "name" in h:
-                    session.headers[h["name"]] = h.get("value", "")
+                    request_headers[h["name"]] = h.get("value", "")
 
         else:
             raise TypeError("headers doit être un dict ou une liste")
@@ -404,15 +572,15 @@ class SearchFacebook(BaseTool, BaseScraper):
         }
 
         # override si besoin
-        session.headers.update(
+        request_headers.update(
             additional_headers
             # {"x-fb-friendly-name": "CometMarketplaceRealEstateMapStoryQuery"}
         )
 
         # 🆕 Log des headers chargés pour debug
-        print(f"[Headers] Headers chargés: {len(session.headers)} headers")
-        if "cookie" in session.headers:
-            cookie_header = session.headers["cookie"]
+        print(f"[Headers] Headers chargés: {len(request_headers)} headers")
+        if "cookie" in request_headers:
+            cookie_header = request_headers["cookie"]
             cookie_count = len(cookie_header.split(";"))
             print(f"[Headers] Cookies dans session: {cookie_count} cookies")
 
@@ -429,7 +597,7 @@ class SearchFacebook(BaseTool, BaseScraper):
         else:
             print("[Headers] ⚠️ Aucun cookie trouvé dans les headers de session")
 
-        return session
+        return request_headers
 
     def load_headers(self, headers):
         # Cette méthode charge les en-têtes HTTP dans la session
@@ -470,7 +638,7 @@ class SearchFacebook(BaseTool, BaseScraper):
     def init_session(
         self,
         user_id,
-        session,
+        request_headers,
         lat,
         lon,
         minBudget,
@@ -478,6 +646,7 @@ class SearchFacebook(BaseTool, BaseScraper):
         minBedrooms,
         maxBedrooms,
         job_id,
+        radius=None,
     ):
         logger.info("init_session")
 
@@ -515,7 +684,7 @@ class SearchFacebook(BaseTool, BaseScraper):
                     f"Erreur lors de l'obtention de la première requête : {e} header: {headers}\n"
                 )
 
-        self.load_fb_headers(headers, session)
+        self.load_fb_headers(headers, request_headers)
 
         # parse payload to normal format
         payload = self.parse_payload(payload)
@@ -524,10 +693,10 @@ class SearchFacebook(BaseTool, BaseScraper):
         # payload["doc_id"] = "29956693457255409"
         # payload["fb_api_req_friendly_name"] = "CometMarketplaceRealEstateMapStoryQuery"
         if payload.get("fb_api_req_friendly_name"):
-            session.headers["x-fb-friendly-name"] = payload["fb_api_req_friendly_name"]
+            request_headers["x-fb-friendly-name"] = payload["fb_api_req_friendly_name"]
 
         variables = json.loads(payload["variables"])
-        variables["radius"] = 4000
+        variables["radius"] = radius or self.search_radius
         variables["buyLocation"]["latitude"] = lat
         variables["buyLocation"]["longitude"] = lon
         variables["priceRange"] = [minBudget, maxBudget]
@@ -733,6 +902,10 @@ class SearchFacebook(BaseTool, BaseScraper):
                     "listing_type", "unknown"
                 ),  # Ajouter le type pour debug
             }
+            if "anchor" in item:
+                # Recherche multi-lieux: lieu le mieux classé qui l'a trouvée
+                normalized["anchor"] = item["anchor"]
+                normalized["anchors"] = item.get("anchors", [])
             logger.debug("[normalize_item] %s", normalized)
             return normalized
         except Exception as e:
@@ -874,19 +1047,341 @@ class SearchFacebook(BaseTool, BaseScraper):
 
         return page_info
 
+    async def _graphql_post(
+        self, payload, request_headers, proxy=None, budget=None, deadline=None
+    ):
+        """POST GraphQL sur le client httpx partagé (un par proxy)."""
+        if budget is not None and not await budget.acquire():
+            raise RequestBudgetExhausted("budget de requêtes épuisé")
+        timeout = http_pool.timeout
+        if deadline is not None:
+            timeout = deadline.timeout(cap=timeout)
+            if timeout <= 0:
+                raise DeadlineExceeded("graphql")
+        client = http_pool.get(proxy=proxy, verify=False)
+        return await client.post(
+            GRAPHQL_URL,
+            content=urllib.parse.urlencode(payload),
+            headers=request_headers,
+            timeout=timeout,
+        )
+
     async def scrape(self, lat, lon, query, user_id: str, job_id, progress=None):
+        """Collecte toutes les pages du feed dans la limite du budget."""
+        listings = []
+        async for page in self.iter_listings(lat, lon, query, user_id, job_id):
+            listings.extend(page)
+        return listings
+
+    async def iter_listings(
+        self,
+        lat,
+        lon,
+        query,
+        user_id: str,
+        job_id,
+        max_listings: int = None,
+        max_pages: int = None,
+        time_budget: float = None,
+        radius: int = None,
+        budget: RequestBudget = None,
+        retry_empty: bool = True,
+        deadline: Deadline = None,
+    ):
+        """
+        Générateur async: produit les annonces page par page en suivant
+        page_info.end_cursor, jusqu'au budget d'annonces, de pages ou de temps.
+        Avec `deadline`, la pagination s'arrête en gardant FB_ENRICH_RESERVE
+        secondes pour l'enrichissement.
+        L'appelant peut classer/enrichir dès la première page.
+        """
+        max_listings = max_listings or self.feed_max_listings
+        max_pages = max_pages or self.feed_max_pages
+        time_budget = time_budget or self.feed_time_budget
+        started = time.monotonic()
+
+        response_data, listings, payload, request_headers, proxy = (
+            await self._fetch_first_page(
+                lat,
+                lon,
+                query,
+                user_id,
+                job_id,
+                radius=radius,
+                budget=budget,
+                retry_empty=retry_empty,
+                deadline=deadline,
+            )
+        )
+
+        seen_ids = set()
+        total = 0
+        page = 1
+        while True:
+            fresh = []
+            for listing in listings:
+                if listing.get("_id") in seen_ids:
+                    continue
+                seen_ids.add(listing.get("_id"))
+                fresh.append(listing)
+            fresh = fresh[: max_listings - total]
+
+            if fresh:
+                total += len(fresh)
+                self.event_publisher.publish(
+                    job_id,
+                    "progress",
+                    {
+                        "stage": "page",
+                        "message": f"Page {page}: {total} annonces",
+                        "page": page,
+                        "count": total,
+                    },
+                )
+                yield fresh
+            elif page > 1:
+                logger.info("[iter_listings] page %d sans nouvelle annonce", page)
+                break
+
+            page_info = self._feed_page_info(response_data)
+            cursor = page_info.get("end_cursor")
+            if total >= max_listings:
+                logger.info("[iter_listings] budget annonces atteint (%d)", total)
+                break
+            if not page_info.get("has_next_page") or not cursor:
+                break
+            if page >= max_pages:
+                logger.info("[iter_listings] budget pages atteint (%d)", page)
+                break
+            if time.monotonic() - started >= time_budget:
+                logger.info("[iter_listings] budget temps atteint (%.1fs)", time_budget)
+                break
+            if deadline is not None and not deadline.allows(self.enrich_reserve):
+                logger.info("[iter_listings] échéance du job proche, pagination arrêtée")
+                deadline.cut("pagination")
+                break
+
+            variables = json.loads(payload["variables"])
+            variables["cursor"] = cursor
+            payload = dict(payload, variables=json.dumps(variables))
+            try:
+                resp_body = await self._graphql_post(
+                    payload, request_headers, proxy, budget, deadline
+                )
+                response_data = resp_body.json()
+            except DeadlineExceeded:
+                deadline.cut("pagination")
+                break
+            except Exception as e:
+                # Les pages déjà produites restent valides
+                logger.warning("[iter_listings] page %d en échec: %s", page + 1, e)
+                break
+            listings = self.add_feed_listings(response_data, job_id) or []
+            page += 1
+
+    async def iter_tiled_listings(
+        self,
+        tiles: list,
+        query,
+        user_id: str,
+        job_id,
+        budget: RequestBudget = None,
+        concurrency: int = None,
+        max_listings: int = None,
+        deadline: Deadline = None,
+    ):
+        """
+        Interroge plusieurs tuiles (voir utils.geo_tiling.plan_tiles) en
+        parallèle sous un budget de requêtes commun, et produit les annonces
+        fusionnées par _id au fur et à mesure que les pages arrivent.
+
+        Une tuile avec une clé "anchor" (lieu Google Places, rang
+        "anchor_rank") annote ses annonces: anchor, anchor_rank, anchor_position
+        (rang dans le feed de ce lieu) et la liste de tous les lieux qui l'ont
+        trouvée; un doublon garde le lieu le mieux classé.
+        max_listings s'applique alors à chaque lieu et non au total: l'ensemble
+        collecté ne dépend pas de l'ordre d'arrivée des tuiles (voir rank_listings).
+        """
+        budget = budget or RequestBudget(max_requests=self.tile_max_requests)
+        concurrency = concurrency or self.tile_concurrency
+        max_listings = max_listings or self.feed_max_listings
+        anchored = any("anchor" in tile for tile in tiles)
+        limit = max_listings * len(tiles) if anchored else max_listings
+        anchor_ranks = {
+            tile["anchor"]: tile.get("anchor_rank", 0)
+            for tile in tiles
+            if "anchor" in tile
+        }
+
+        queue: asyncio.Queue = asyncio.Queue()
+        sem = asyncio.Semaphore(concurrency)
+        # Erreurs des tuiles (hors budget/échéance), dans l'ordre d'arrivée
+        errors = []
+
+        async def run_tile(tile: dict):
+            async with sem:
+                try:
+                    if budget.exhausted:
+                        return
+                    async for page in self.iter_listings(
+                        tile["lat"],
+                        tile["lon"],
+                        query,
+                        user_id,
+                        job_id,
+                        max_listings=max_listings,
+                        max_pages=self.tile_max_pages,
+                        radius=tile.get("radius_m"),
+                        budget=budget,
+                        retry_empty=False,
+                        deadline=deadline,
+                    ):
+                        await queue.put((tile, page))
+                except RequestBudgetExhausted:
+                    logger.info("[iter_tiled_listings] budget épuisé, tuile ignorée")
+                except DeadlineExceeded:
+                    deadline.cut("tiles")
+                except Exception as e:
+                    errors.append(e)
+                    logger.warning(
+                        "[iter_tiled_listings] tuile (%.4f, %.4f) en échec: %s",
+                        tile["lat"],
+                        tile["lon"],
+                        e,
+                    )
+                finally:
+                    # Fin de tuile (None): le consommateur compte les tuiles restantes
+                    queue.put_nowait(None)
+
+        tasks = [asyncio.create_task(run_tile(tile)) for tile in tiles]
+        running = len(tasks)
+
+        seen = {}
+        positions = {}
+        total = 0
+        pages = 0
+        try:
+            while total < limit and running:
+                if deadline is None:
+                    page = await queue.get()
+                else:
+                    try:
+                        page = await asyncio.wait_for(
+                            queue.get(), timeout=deadline.remaining()
+                        )
+                    except asyncio.TimeoutError:
+                        deadline.cut("tiles")
+                        break
+                if page is None:
+                    running -= 1
+                    continue
+                tile, page = page
+                pages += 1
+                fresh = []
+                for listing in page:
+                    position = positions.get(id(tile), 0)
+                    positions[id(tile)] = position + 1
+                    known = seen.get(listing.get("_id"))
+                    if known is not None:
+                        # Déjà produite: l'objet est partagé, on met à jour ses lieux
+                        if "anchor" in tile:
+                            self._merge_anchor(known, tile, position, anchor_ranks)
+                        continue
+                    if "anchor" in tile:
+                        self._merge_anchor(listing, tile, position, anchor_ranks)
+                    seen[listing.get("_id")] = listing
+                    fresh.append(listing)
+                fresh = fresh[: limit - total]
+                if fresh:
+                    total += len(fresh)
+                    yield fresh
+            if not pages and errors:
+                # Aucune page et au moins une tuile en erreur (session, GraphQL,
+                # proxy): échec du scraping, pas une recherche sans annonce
+                raise errors[0]
+        finally:
+            # Sortie anticipée (plafond, échéance, appelant parti): les tuiles
+            # encore en vol sont annulées et attendues avant de rendre la main
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info(
+                "[iter_tiled_listings] %d tuiles, %d annonces uniques, budget=%s",
+                len(tiles),
+                total,
+                budget.stats(),
+            )
+
+    def _merge_anchor(
+        self, listing: dict, tile: dict, position: int, anchor_ranks: dict
+    ) -> None:
+        """Ajoute le lieu d'ancrage de la tuile à l'annonce (le mieux classé gagne)."""
+        rank = tile.get("anchor_rank", 0)
+        anchors = listing.setdefault("anchors", [])
+        if tile["anchor"] not in anchors:
+            anchors.append(tile["anchor"])
+            anchors.sort(key=lambda name: anchor_ranks.get(name, 0))
+        current = (listing.get("anchor_rank"), listing.get("anchor_position"))
+        if "anchor" not in listing or (rank, position) < current:
+            listing["anchor"] = tile["anchor"]
+            listing["anchor_rank"] = rank
+            listing["anchor_position"] = position
+
+    @staticmethod
+    def rank_listings(listings: list) -> list:
+        """
+        Ordre stable des annonces multi-lieux: rang du lieu, rang dans le feed
+        de ce lieu, puis _id. Sans lieu d'ancrage, l'ordre d'arrivée est gardé.
+        """
+        return [
+            listing
+            for _, listing in sorted(
+                enumerate(listings),
+                key=lambda pair: (
+                    pair[1].get("anchor_rank", 0),
+                    pair[1].get("anchor_position", pair[0]),
+                    str(pair[1].get("_id", "")),
+                ),
+            )
+        ]
+
+    def _feed_page_info(self, body) -> dict:
+        """page_info du feed marketplace ({} si absent)."""
+        try:
+            stories = body["data"]["viewer"]["marketplace_feed_stories"]
+            return stories.get("page_info") or {}
+        except (KeyError, TypeError, AttributeError):
+            return {}
+
+    async def _fetch_first_page(
+        self,
+        lat,
+        lon,
+        query,
+        user_id: str,
+        job_id,
+        radius=None,
+        budget=None,
+        retry_empty=True,
+        deadline=None,
+    ):
+        """
+        Première page GraphQL avec les tentatives et backoff existants.
+        Avec `deadline`, chaque attente est bornée au temps restant: une
+        tentative qui ne tiendrait pas lève DeadlineExceeded.
+        Retourne (réponse, annonces, payload, headers, proxy) pour paginer ensuite.
+        """
+        deadline = deadline or Deadline.after(float("inf"))
         print("Initialisation de fb_graphql_call...")
 
+        listings = []
         for attempt in range(self.max_retries):
+            deadline.check("graphql")
             try:
-                # Créer une nouvelle session pour chaque tentative
-                session = requests.Session()
-
-                proxies = {
-                    "http": os.getenv("PROXIES_URL"),
-                    "https": os.getenv("PROXIES_URL"),
-                }
-                session.proxies.update(proxies)
+                # Headers propres à chaque tentative; la connexion (keep-alive,
+                # TLS, proxy) est celle du client partagé par le processus
+                request_headers = httpx.Headers()
+                proxy = os.getenv("PROXIES_URL") or None
                 self.event_publisher.publish(
                     job_id,
                     "progress",
@@ -897,17 +1392,17 @@ class SearchFacebook(BaseTool, BaseScraper):
                     },
                 )
                 print("proxies updated... done")
-                session.verify = False
                 print("query: ", query)
                 minBudget = query["minBudget"] or 0
                 maxBudget = query["maxBudget"] or 0
                 minBedrooms = query["minBedrooms"] or 0
                 maxBedrooms = query["maxBedrooms"] or 0
 
-                # Initialiser la session Facebook
-                headers, payload, variables = self.init_session(
+                # Initialiser la session Facebook (lecture Mongo bloquante: hors loop)
+                headers, payload, variables = await asyncio.to_thread(
+                    self.init_session,
                     user_id,
-                    session,
+                    request_headers,
                     lat,
                     lon,
                     minBudget,
@@ -915,6 +1410,7 @@ class SearchFacebook(BaseTool, BaseScraper):
                     minBedrooms,
                     maxBedrooms,
                     job_id,
+                    radius,
                 )
 
                 if headers is None or payload is None:
@@ -944,7 +1440,7 @@ class SearchFacebook(BaseTool, BaseScraper):
                             },
                         )
                         logger.info(f"Nouvelle tentative dans {sleep_time} secondes...")
-                        time.sleep(sleep_time)
+                        await deadline.sleep(sleep_time, "graphql_retry")
                         continue
                     else:
                         raise RuntimeError(
@@ -952,9 +1448,8 @@ class SearchFacebook(BaseTool, BaseScraper):
                         )
 
                 # Faire la requête POST initiale
-                resp_body = session.post(
-                    "https://www.facebook.com/api/graphql/",
-                    data=urllib.parse.urlencode(payload),
+                resp_body = await self._graphql_post(
+                    payload, request_headers, proxy, budget, deadline
                 )
                 self.event_publisher.publish(
                     job_id,
@@ -986,14 +1481,13 @@ class SearchFacebook(BaseTool, BaseScraper):
                         )
 
                         # Réessayer la requête
-                        resp_body = session.post(
-                            "https://www.facebook.com/api/graphql/",
-                            data=urllib.parse.urlencode(payload),
+                        resp_body = await self._graphql_post(
+                            payload, request_headers, proxy, budget, deadline
                         )
                         retry_count += 1
 
                         # Petit délai entre les tentatives internes
-                        time.sleep(2)
+                        await deadline.sleep(2, "graphql_retry")
 
                     # Vérifier si on a finalement obtenu les bonnes données
                     if (
@@ -1028,7 +1522,7 @@ class SearchFacebook(BaseTool, BaseScraper):
                             },
                         )
 
-                        listings = self.add_feed_listings(response_data, job_id)
+                        listings = self.add_feed_listings(response_data, job_id) or []
                         self.event_publisher.publish(
                             job_id,
                             "progress",
@@ -1040,16 +1534,23 @@ class SearchFacebook(BaseTool, BaseScraper):
                     else:
                         logger.info("⚠️ Type de données non reconnu")
 
-                    if not listings and attempt < self.max_retries - 1:
+                    if (
+                        not listings
+                        and retry_empty
+                        and attempt < self.max_retries - 1
+                        and deadline.allows(self.retry_delay)
+                    ):
                         logger.info(
                             f"Aucune annonce trouvée (tentative {attempt+1}), "
                             f"nouvelle tentative dans {self.retry_delay}s"
                         )
-                        time.sleep(self.retry_delay)
+                        await asyncio.sleep(self.retry_delay)
                         continue
                     logger.info(f"Listings récupérés: {len(listings)}")
-                    return listings
+                    return response_data, listings, payload, request_headers, proxy
 
+                except (RequestBudgetExhausted, DeadlineExceeded):
+                    raise
                 except Exception as e:
                     self.event_publisher.publish(
                         job_id,
@@ -1063,12 +1564,14 @@ class SearchFacebook(BaseTool, BaseScraper):
                     logger.info(f"Erreur lors de la vérification des données: {e}")
                     raise
 
+            except (RequestBudgetExhausted, DeadlineExceeded):
+                raise
             except KeyError as e:
                 logger.error(f"Clé manquante dans la session pour user {user_id}: {e}")
                 if attempt < self.max_retries - 1:
                     sleep_time = self.retry_delay + (attempt + 1) + random.uniform(1, 5)
                     logger.info(f"Nouvelle tentative dans {sleep_time} secondes...")
-                    time.sleep(sleep_time)
+                    await deadline.sleep(sleep_time, "graphql_retry")
                 else:
                     raise RuntimeError(f"Invalid session data: missing key {e}")
 
@@ -1085,7 +1588,7 @@ class SearchFacebook(BaseTool, BaseScraper):
                     )
                     sleep_time = self.retry_delay + (attempt + 1) + random.uniform(1, 5)
                     print(f"Nouvelle tentative dans {sleep_time} secondes...")
-                    time.sleep(sleep_time)
+                    await deadline.sleep(sleep_time, "graphql_retry")
 
                 else:
                     print("Nombre maximum de tentatives atteint")
@@ -1099,7 +1602,7 @@ class SearchFacebook(BaseTool, BaseScraper):
             # Délai entre les tentatives principales
             if attempt < self.max_retries - 1:
                 print("Attente 5 secondes avant la prochaine tentative...")
-                time.sleep(5)
+                await deadline.sleep(5, "graphql_retry")
 
         # Si on arrive ici, toutes les tentatives ont échoué
         raise RuntimeError("Toutes les tentatives de fb_graphql_call ont échoué")
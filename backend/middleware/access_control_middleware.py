@@ -36,6 +36,7 @@ class AccessControlMiddleware:
         user = await self.users.find_one({"_id": oid}, {"hasAccess": 1, "usage": 1})
         if not user:
             return False, {"reason": "user_not_found"}
+        self._cache[user_id] = (bool(user.get("hasAccess")), time.time())
 
         # Premium = illimité
         if user.get("hasAccess"):
@@ -80,6 +81,23 @@ class AccessControlMiddleware:
 
         return False, {"reason": "concurrent_limit_reached"}
 
+    async def is_premium(self, user_id: str) -> bool:
+        """
+        hasAccess de l'utilisateur, depuis le cache rempli par check_access
+        (valable _cache_ttl secondes), sinon lu dans Mongo.
+        """
+        cached = self._cache.get(user_id)
+        if cached and time.time() - cached[1] < self._cache_ttl:
+            return cached[0]
+        try:
+            oid = ObjectId(user_id)
+        except Exception:
+            return False
+        user = await self.users.find_one({"_id": oid}, {"hasAccess": 1})
+        premium = bool(user and user.get("hasAccess"))
+        self._cache[user_id] = (premium, time.time())
+        return premium
+
 
 # Instance globale
 access_control = AccessControlMiddleware()
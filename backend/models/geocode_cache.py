@@ -0,0 +1,27 @@
+"""Geocode cache model for database operations."""
+
+from datetime import datetime
+from typing import Optional, Dict, Any
+from database_manager import mongo_manager
+
+
+class GeocodeCacheModel:
+    """Model for persisting Google Places lookups in MongoDB."""
+
+    def __init__(self):
+        self.db = mongo_manager.get_sync_db()
+        self.collection = self.db["geocode_cache"]
+        self.collection.create_index("query", unique=True)
+
+    def get(self, query: str) -> Optional[Dict[str, Any]]:
+        """Get the cached Places response for a normalized query."""
+        doc = self.collection.find_one({"query": query}, {"_id": 0, "result": 1})
+        return doc["result"] if doc else None
+
+    def save(self, query: str, result: Dict[str, Any]) -> None:
+        """Upsert the Places response for a normalized query."""
+        self.collection.update_one(
+            {"query": query},
+            {"$set": {"result": result, "updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
@@ -51,6 +51,12 @@ class GraphState(BaseModel):
     others: Dict[str, RangeFilter] = Field(
         default_factory=dict, description="Other preferences"
     )
+    summary: str = Field(
+        default="", description="Rolling summary of the turns dropped from the window"
+    )
+    summarized_count: int = Field(
+        default=0, description="Number of messages already folded into the summary"
+    )
 
     @field_validator("session_id")
     @classmethod
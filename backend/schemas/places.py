@@ -0,0 +1,104 @@
+"""This file contains the Google Places (Text Search) response schema."""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+# Model field -> Places API field mask path
+PLACE_FIELD_MASKS: Dict[str, str] = {
+    "place_id": "places.id",
+    "display_name": "places.displayName",
+    "formatted_address": "places.formattedAddress",
+    "location": "places.location",
+    "types": "places.types",
+}
+
+DEFAULT_PLACE_FIELDS = ("display_name", "location")
+
+
+def field_mask(fields: Optional[Iterable[str]] = None) -> str:
+    """Build the X-Goog-FieldMask header for the requested model fields.
+
+    Args:
+        fields: Place model field names. Defaults to display name and location.
+
+    Returns:
+        str: Comma separated field mask.
+
+    Raises:
+        ValueError: If a field has no Places API equivalent.
+    """
+    fields = tuple(fields or DEFAULT_PLACE_FIELDS)
+    unknown = [f for f in fields if f not in PLACE_FIELD_MASKS]
+    if unknown:
+        raise ValueError(f"Unknown place fields: {unknown}")
+    return ",".join(PLACE_FIELD_MASKS[f] for f in fields)
+
+
+class PlaceLocation(BaseModel):
+    """Latitude/longitude of a place."""
+
+    latitude: float = Field(..., description="Latitude in degrees")
+    longitude: float = Field(..., description="Longitude in degrees")
+
+
+class Place(BaseModel):
+    """A place returned by Text Search. Fields outside the field mask stay None."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    place_id: Optional[str] = Field(default=None, alias="id", description="Places ID")
+    display_name: Optional[str] = Field(
+        default=None, alias="displayName", description="Localized place name"
+    )
+    formatted_address: Optional[str] = Field(
+        default=None, alias="formattedAddress", description="Full address"
+    )
+    location: Optional[PlaceLocation] = Field(default=None, description="Coordinates")
+    types: List[str] = Field(default_factory=list, description="Place types")
+
+    @field_validator("display_name", mode="before")
+    @classmethod
+    def unwrap_display_name(cls, value: Any) -> Any:
+        """displayName comes as {"text": ..., "languageCode": ...}."""
+        if isinstance(value, dict):
+            return value.get("text")
+        return value
+
+
+class PlacesResponse(BaseModel):
+    """Parsed Text Search response."""
+
+    query: str = Field(default="", description="Text query that was sent")
+    places: List[Place] = Field(default_factory=list, description="Matching places")
+    source: str = Field(
+        default="api", description="Where the answer came from: api, cache or offline"
+    )
+
+    @classmethod
+    def from_api(cls, data: Optional[Dict[str, Any]], query: str = "", source: str = "api"):
+        """Parse a raw Places API (or cached) payload."""
+        return cls(query=query, places=(data or {}).get("places", []), source=source)
+
+    @property
+    def located(self) -> List[Place]:
+        """Places that carry coordinates."""
+        return [p for p in self.places if p.location is not None]
+
+    def to_api(self) -> Dict[str, Any]:
+        """Raw payload in the Places API shape (what GooglePlaces.execute returns)."""
+        places = []
+        for place in self.places:
+            raw: Dict[str, Any] = {}
+            if place.place_id is not None:
+                raw["id"] = place.place_id
+            if place.display_name is not None:
+                raw["displayName"] = {"text": place.display_name}
+            if place.formatted_address is not None:
+                raw["formattedAddress"] = place.formatted_address
+            if place.location is not None:
+                raw["location"] = place.location.model_dump()
+            if place.types:
+                raw["types"] = place.types
+            places.append(raw)
+        return {"places": places}
@@ -0,0 +1,139 @@
+"""
+Benchmark du codec de cache (utils/codec.py) face au format actuel:
+taille en Redis et débit d'encodage/décodage, pour une entrée de cache
+(liste d'annonces) et un résultat de job RQ (pickle par défaut).
+
+Usage: python scripts/benchmark_codec.py [--listings 20 100 400] [--rounds 50]
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import random
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import codec
+
+
+def fake_listing(i: int) -> dict:
+    """Annonce au format de SearchFacebook.normalize_item."""
+    listing_id = str(10**15 + random.randint(0, 10**14))
+    return {
+        "id": listing_id,
+        "title": random.choice(
+            ["4 1/2 à louer", "Appartement lumineux", "Grand 5 1/2 rénové", "Studio meublé"]
+        )
+        + f" - {random.choice(['Plateau', 'Rosemont', 'Verdun', 'Villeray'])}",
+        "price": f"{random.randint(900, 3200)} $",
+        "bedrooms": random.randint(0, 4),
+        "bathrooms": random.randint(1, 2),
+        "url": f"https://www.facebook.com/marketplace/item/{listing_id}/",
+        "images": [
+            f"https://scontent.xx.fbcdn.net/v/t45.5328-4/{random.getrandbits(64):x}_n.jpg"
+            for _ in range(random.randint(1, 6))
+        ],
+        "description": (
+            "Beau logement près du métro, chauffé et éclairé, libre le 1er juillet. "
+            * random.randint(0, 4)
+        ).strip()
+        or None,
+        "source": "facebook",
+        "listing_type": random.choice(["feed", "map"]),
+    }
+
+
+def measure(encode, decode, rounds: int):
+    """(taille, MB/s encodage, MB/s décodage), débit rapporté au JSON d'origine."""
+    data = encode()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        encode()
+    encode_s = (time.perf_counter() - start) / rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        decode(data)
+    decode_s = (time.perf_counter() - start) / rounds
+    return len(data), encode_s, decode_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--listings", type=int, nargs="+", default=[20, 100, 400])
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    random.seed(42)
+
+    print(
+        f"msgpack: {'oui' if codec.msgpack else 'non'} | "
+        f"zstandard: {'oui' if codec.zstandard else 'non'}\n"
+    )
+    header = (
+        f"{'annonces':>8} {'format':<28} {'octets':>9} {'ratio':>6} "
+        f"{'enc MB/s':>9} {'dec MB/s':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    formats = [(codec.FORMAT_JSON, "json")]
+    if codec.msgpack:
+        formats.insert(0, (codec.FORMAT_MSGPACK, "msgpack"))
+    compressions = [(codec.COMPRESSION_NONE, ""), (codec.COMPRESSION_ZLIB, "+zlib")]
+    if codec.zstandard:
+        compressions.append((codec.COMPRESSION_ZSTD, "+zstd"))
+
+    for count in args.listings:
+        listings = [fake_listing(i) for i in range(count)]
+        envelope = {"cached_at": time.time(), "listings": listings}
+        job_result = {
+            "status": "success",
+            "listings": listings,
+            "count": count,
+            "processing_time": 12.3,
+            "coordinates": {"lat": 45.5, "lon": -73.56},
+            "partial": False,
+        }
+        baseline = len(json.dumps(envelope).encode())
+        mb = baseline / 1e6
+
+        cases = [
+            (
+                "actuel: json (cache)",
+                lambda: json.dumps(envelope).encode(),
+                json.loads,
+            ),
+            (
+                "actuel: pickle (résultat RQ)",
+                lambda: pickle.dumps(job_result, pickle.HIGHEST_PROTOCOL),
+                pickle.loads,
+            ),
+        ]
+        for fmt, fmt_name in formats:
+            for compression, comp_name in compressions:
+                cases.append(
+                    (
+                        f"codec: {fmt_name}{comp_name}",
+                        lambda f=fmt, c=compression: codec.encode(
+                            listings,
+                            meta={"cached_at": envelope["cached_at"]},
+                            fmt=f,
+                            compression=c,
+                        ),
+                        codec.decode,
+                    )
+                )
+
+        for label, encode, decode in cases:
+            size, encode_s, decode_s = measure(encode, decode, args.rounds)
+            print(
+                f"{count:>8} {label:<28} {size:>9} {size / baseline:>6.2f} "
+                f"{mb / encode_s:>9.1f} {mb / decode_s:>9.1f}"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
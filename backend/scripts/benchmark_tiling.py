@@ -0,0 +1,80 @@
+"""
+Benchmark du découpage géographique: couverture de la zone vs nombre de
+requêtes GraphQL (une tuile = au moins une requête).
+
+Usage: python scripts/benchmark_tiling.py [--radius 4000] [--samples 80]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.geo_tiling import coverage_ratio, plan_tiles
+
+REGIONS = {
+    # (min_lat, min_lon, max_lat, max_lon)
+    "plateau-mont-royal": {"bbox": (45.507, -73.603, 45.545, -73.563)},
+    "rosemont": {"bbox": (45.535, -73.620, 45.585, -73.545)},
+    "ile-de-montreal": {"bbox": (45.410, -73.975, 45.705, -73.475)},
+    "centre-ville (polygone)": {
+        "polygon": [
+            (45.4950, -73.5800),
+            (45.5080, -73.5900),
+            (45.5150, -73.5650),
+            (45.5060, -73.5500),
+            (45.4960, -73.5580),
+        ]
+    },
+}
+
+
+def single_point(region: dict, radius_m: float) -> list:
+    """Comportement actuel: un seul cercle au centre de la zone."""
+    tiles = plan_tiles(radius_m=radius_m, max_tiles=1, **region)
+    return tiles[:1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--radius", type=float, default=4000)
+    parser.add_argument("--samples", type=int, default=80)
+    args = parser.parse_args()
+
+    header = f"{'zone':<26} {'stratégie':<18} {'requêtes':>8} {'couverture':>10} {'plan (ms)':>10}"
+    print(header)
+    print("-" * len(header))
+
+    for name, region in REGIONS.items():
+        strategies = [("point unique", lambda: single_point(region, args.radius))]
+        for overlap in (0.0, 0.1, 0.2, 0.3):
+            strategies.append(
+                (
+                    f"tuiles overlap={overlap:.1f}",
+                    lambda o=overlap: plan_tiles(
+                        radius_m=args.radius, overlap=o, **region
+                    ),
+                )
+            )
+        strategies.append(
+            (
+                "tuiles max=10",
+                lambda: plan_tiles(radius_m=args.radius, max_tiles=10, **region),
+            )
+        )
+
+        for label, plan in strategies:
+            start = time.perf_counter()
+            tiles = plan()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            coverage = coverage_ratio(tiles, samples=args.samples, **region)
+            print(
+                f"{name:<26} {label:<18} {len(tiles):>8} {coverage:>9.1%} {elapsed_ms:>10.2f}"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
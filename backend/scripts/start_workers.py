@@ -1,27 +1,150 @@
 import os
 import sys
 import json
+import math
 import time
 import signal
 import multiprocessing
 multiprocessing.set_start_method('spawn', force=True)
 
 import subprocess
-from typing import List
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
 import psutil
+import redis
 from dotenv import load_dotenv
+from rq import Worker
+from rq.utils import utcparse
 
 load_dotenv()
 os.environ['OBJC_DISABLE_INITIALIZE_FORK_SAFETY'] = 'YES'
 
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKER_SCRIPT = os.path.join(BACKEND_DIR, "workers", "scraping_workers.py")
+
+sys.path.append(BACKEND_DIR)
+
+from utils.process import process_tree_rss_mb
+from workers.recycling import RECYCLES_KEY, stats_key
+from services.redis_janitor import RedisJanitor
+from services.priority_queues import TierTracker, scraping_queue_names
+
+
+class AutoscaleConfig:
+    """Bornes et seuils de l'autoscaling (variables d'environnement)."""
+
+    def __init__(self):
+        self.min_workers = int(os.getenv("WORKER_MIN", 1))
+        self.max_workers = max(
+            self.min_workers, int(os.getenv("WORKER_MAX", os.getenv("NUM_WORKERS", 5)))
+        )
+        # Jobs en attente acceptables par worker avant d'en ajouter
+        self.jobs_per_worker = float(os.getenv("AUTOSCALE_JOBS_PER_WORKER", 2))
+        # Âge max du plus vieux job en attente (s) avant d'en ajouter
+        self.max_job_age = float(os.getenv("AUTOSCALE_MAX_JOB_AGE", 30))
+        # Queues vides depuis N secondes => on retire un worker
+        self.idle_period = float(os.getenv("AUTOSCALE_IDLE_PERIOD", 60))
+        self.max_step = int(os.getenv("AUTOSCALE_MAX_STEP", 2))
+        self.cooldown = float(os.getenv("AUTOSCALE_COOLDOWN", 15))
+        self.interval = float(os.getenv("AUTOSCALE_INTERVAL", 5))
+        # Au-delà: pas de nouveau worker; mémoire critique: on en retire un
+        self.max_cpu = float(os.getenv("AUTOSCALE_MAX_CPU", 85))
+        self.max_memory = float(os.getenv("AUTOSCALE_MAX_MEMORY", 85))
+        self.critical_memory = float(os.getenv("AUTOSCALE_CRITICAL_MEMORY", 93))
+        # Temps laissé à un worker pour finir son job en cours (job = 200s max)
+        self.drain_timeout = float(os.getenv("WORKER_DRAIN_TIMEOUT", 210))
+        # Le worker se recycle seul entre deux jobs à WORKER_MAX_RSS_MB;
+        # au-delà de ce plafond (job qui s'emballe) le superviseur le draine
+        self.hard_rss_mb = float(
+            os.getenv("WORKER_HARD_RSS_MB", 1.5 * float(os.getenv("WORKER_MAX_RSS_MB", 2500)))
+        )
+        # Relance d'un worker planté: backoff exponentiel, remis à zéro
+        # quand un worker a tenu WORKER_STABLE_UPTIME secondes
+        self.respawn_backoff = float(os.getenv("WORKER_RESPAWN_BACKOFF", 2))
+        self.respawn_backoff_max = float(os.getenv("WORKER_RESPAWN_BACKOFF_MAX", 60))
+        self.stable_uptime = float(os.getenv("WORKER_STABLE_UPTIME", 120))
+        # Jobs traités en parallèle par un worker (WORKER_MODE=async)
+        if os.getenv("WORKER_MODE", "rq") == "async":
+            self.worker_capacity = int(os.getenv("ASYNC_RUNNER_CONCURRENCY", 10))
+        else:
+            self.worker_capacity = 1
+
+
+def decide_worker_count(
+    current: int,
+    depth: int,
+    oldest_age: float,
+    idle_for: float,
+    cpu: float,
+    memory: float,
+    config: AutoscaleConfig,
+) -> Tuple[int, str]:
+    """
+    Nombre de workers visé selon la charge des queues et de la machine.
+    Retourne (cible, raison); cible == current si rien à faire.
+    """
+    low, high = config.min_workers, config.max_workers
+    if current < low:
+        return low, "minimum"
+    if current > high:
+        return high, "maximum"
+
+    if memory >= config.critical_memory and current > low:
+        return current - 1, f"mémoire critique ({memory:.0f}%)"
+
+    backlog_per_worker = config.jobs_per_worker * config.worker_capacity
+    needed = math.ceil(depth / backlog_per_worker) if depth else 0
+    if depth and (needed > current or oldest_age > config.max_job_age):
+        if cpu >= config.max_cpu or memory >= config.max_memory:
+            return current, f"saturation machine (cpu {cpu:.0f}%, mémoire {memory:.0f}%)"
+        step = max(1, min(config.max_step, needed - current))
+        target = min(high, current + step)
+        if target > current:
+            return target, f"{depth} jobs en attente, plus vieux {oldest_age:.0f}s"
+        return current, "maximum atteint"
+
+    if not depth and idle_for >= config.idle_period and current > low:
+        return current - 1, f"queues vides depuis {idle_for:.0f}s"
+
+    return current, "stable"
+
 
 class WorkerManager:
-    def __init__(self, num_workers: int, redis_url: str):
-        self.num_workers = num_workers
+    def __init__(self, num_workers: int, redis_url: str, config: Optional[AutoscaleConfig] = None):
+        self.config = config or AutoscaleConfig()
+        self.num_workers = min(max(num_workers, self.config.min_workers), self.config.max_workers)
         self.redis_url = redis_url
-        self.processes = []
+        self.queue_names = os.getenv(
+            "WORKER_QUEUES", ",".join(scraping_queue_names() + ["fb_session"])
+        ).split(",")
+        self.redis_client = redis.from_url(redis_url, decode_responses=True)
+        # Connexion binaire pour les registres RQ
+        self.rq_connection = redis.from_url(redis_url)
+
+        self.processes: Dict[int, subprocess.Popen] = {}
+        self.started_at: Dict[int, float] = {}
+        # worker_id -> (processus, échéance, raison du recyclage si à remplacer)
+        self.draining: Dict[int, Tuple[subprocess.Popen, float, Optional[str]]] = {}
+        self.next_worker_id = 0
         self.shutdown_requested = False
 
+        # Relances de workers plantés (échéances monotones)
+        self.pending_respawns: List[float] = []
+        self.crash_streak = 0
+        self.recycle_counts: Dict[str, int] = {}
+
+        self.last_scale_at = 0.0
+        self.idle_since: Optional[float] = None
+
+        # Maintenance Redis (SCAN incrémental), toutes les JANITOR_INTERVAL secondes
+        self.janitor = RedisJanitor(self.redis_client, self.rq_connection)
+        self.janitor_interval = float(os.getenv("JANITOR_INTERVAL", 60))
+        self.last_janitor_at = time.monotonic()
+        self.janitor_totals = {"runs": 0, "deleted": 0, "bytes": 0}
+
+        # Jobs en cours et attente en queue par niveau de priorité
+        self.tier_tracker = TierTracker(self.rq_connection)
+
     def start_worker(self, worker_id: int, redis_url: str) -> subprocess.Popen:
         """
         Démarre un processus worker RQ
@@ -30,83 +153,335 @@ class WorkerManager:
         env = os.environ.copy()
         env["WORKER_ID"] = str(worker_id)
         env["REDIS_URL"] = redis_url
+        env["WORKER_QUEUES"] = ",".join(self.queue_names)
 
-        # Démarrer le worker dans un processus séparé
+        # Démarrer le worker dans son propre groupe de processus: le SIGKILL
+        # final emporte aussi ses navigateurs sans toucher au manager
         process = subprocess.Popen(
-            [sys.executable, "workers/scraping_workers.py"],
+            [sys.executable, WORKER_SCRIPT],
             env=env,
-            #preexec_fn=os.setsid,
+            cwd=BACKEND_DIR,
+            start_new_session=True,
         )
 
         print(f"Worker {worker_id} démarré avec PID {process.pid}")
         return process
 
-    def stop_worker(self, process: subprocess.Popen, timeout: int = 10):
+    def drain_worker(self, worker_id: int, recycle_reason: Optional[str] = None) -> None:
         """
-        Arrete un worker avec timeout et force si nécessaire
+        Demande un arrêt à chaud (SIGTERM au worker seul): le job en cours se
+        termine, le processus est tué s'il dépasse WORKER_DRAIN_TIMEOUT.
+        Avec recycle_reason, un worker neuf le remplace une fois arrêté.
         """
+        process = self.processes.pop(worker_id)
+        self.started_at.pop(worker_id, None)
         try:
-            # Envoyer un SIGTERM au groupe de processus
-            os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+            process.send_signal(signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        self.draining[worker_id] = (
+            process,
+            time.monotonic() + self.config.drain_timeout,
+            recycle_reason,
+        )
+        print(f"Worker {worker_id} (PID {process.pid}) en cours d'arrêt")
 
-            # Attendre avec timeout
+    def reap_draining(self) -> None:
+        """Retire les workers arrêtés, force ceux qui dépassent le délai."""
+        now = time.monotonic()
+        for worker_id, (process, deadline, recycle_reason) in list(self.draining.items()):
+            if process.poll() is not None:
+                print(f"Worker {worker_id} (PID {process.pid}) arrêté proprement")
+            elif now >= deadline:
+                print(f"Worker {worker_id} (PID {process.pid}) non arrêté à temps. Forçage...")
+                self.kill_worker(process)
+            else:
+                continue
+            del self.draining[worker_id]
+            self.forget_stats(process.pid)
+            if recycle_reason and not self.shutdown_requested:
+                self.record_recycle(worker_id, recycle_reason)
+                self.add_worker()
+
+    def kill_worker(self, process: subprocess.Popen) -> None:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        process.wait()
+
+    def stop_worker(self, process: subprocess.Popen, timeout: Optional[float] = None):
+        """
+        Arrete un worker avec timeout et force si nécessaire
+        """
+        timeout = self.config.drain_timeout if timeout is None else timeout
+        try:
+            process.send_signal(signal.SIGTERM)
             process.wait(timeout=timeout)
             print(f"Worker {process.pid} arrêté proprement")
         except subprocess.TimeoutExpired:
             print(f"Worker {process.pid} non arrêté proprement. Forçage...")
-            os.killpg(os.getpgid(process.pid), signal.SIGKILL)
-            process.wait()
+            self.kill_worker(process)
             print(f"Worker {process.pid} arrêté avec SIGKILL")
         except ProcessLookupError:
             print(f"Worker {process.pid} non trouvé. Il a peut-être déjà été arrêté.")
 
+    def add_worker(self) -> None:
+        worker_id = self.next_worker_id
+        self.next_worker_id += 1
+        self.processes[worker_id] = self.start_worker(worker_id, self.redis_url)
+        self.started_at[worker_id] = time.monotonic()
+
+    def record_recycle(self, worker_id: int, reason: str) -> None:
+        """Compte un recyclage par raison (local + hash Redis worker:recycles)."""
+        self.recycle_counts[reason] = self.recycle_counts.get(reason, 0) + 1
+        print(f"Worker {worker_id} recyclé ({reason})")
+        try:
+            self.redis_client.hincrby(RECYCLES_KEY, reason, 1)
+        except redis.RedisError:
+            pass
+
+    def forget_stats(self, pid: int) -> Optional[str]:
+        """Lit puis supprime worker:stats:{pid}; retourne la raison annoncée."""
+        try:
+            with self.redis_client.pipeline(transaction=False) as pipeline:
+                pipeline.hget(stats_key(pid), "recycle_reason")
+                pipeline.delete(stats_key(pid))
+                reason, _ = pipeline.execute()
+            return reason or None
+        except redis.RedisError:
+            return None
+
     def start_all_workers(self):
-        """Démarre tous les workers"""
+        """Démarre les workers initiaux"""
         print(f"Démarrage de {self.num_workers} workers RQ...")
         print(f"Redis URL: {self.redis_url}")
+        print(
+            f"Queues: {','.join(self.queue_names)} | "
+            f"bornes: {self.config.min_workers}-{self.config.max_workers}"
+        )
 
-        for i in range(self.num_workers):
+        for _ in range(self.num_workers):
             if self.shutdown_requested:
                 break
-            process = self.start_worker(i, self.redis_url)
-            self.processes.append(process)
+            self.add_worker()
             time.sleep(1)
 
-        print(f"Tous les workers démarrés. Surveillance en cours...")
+        print(f"Workers démarrés. Autoscaling en cours...")
 
     def stop_all_workers(self):
-        """Arrête tous les workers proprement"""
+        """Arrête tous les workers proprement (SIGTERM à tous, puis attente)"""
         print("Arrêt de tous les workers...")
+        self.shutdown_requested = True
+        self.pending_respawns.clear()
 
-        for process in self.processes:
-            if process.poll() is None:  # Si le processus tourne encore
-                self.stop_worker(process)
+        for worker_id in list(self.processes):
+            self.drain_worker(worker_id)
+
+        while self.draining:
+            self.reap_draining()
+            time.sleep(0.5)
 
-        self.processes.clear()
         print("Tous les workers arrêtés")
+        print(f"Bilan: {json.dumps(self.stats())}")
 
     def signal_handler(self, signum, frame):
-        """Gestionnaire de signal robuste"""
+        """Demande l'arrêt: la boucle principale draine les workers"""
         print(f"\nSignal {signum} reçu. Arrêt en cours...")
         self.shutdown_requested = True
-        self.stop_all_workers()
-        sys.exit(0)
+
+    def queue_metrics(self) -> Tuple[int, float]:
+        """Profondeur totale des queues surveillées et âge (s) du plus vieux job."""
+        with self.redis_client.pipeline(transaction=False) as pipeline:
+            for name in self.queue_names:
+                pipeline.llen(f"rq:queue:{name}")
+                pipeline.lindex(f"rq:queue:{name}", 0)
+            raw = pipeline.execute()
+        depth = sum(raw[0::2])
+        oldest_ids = [job_id for job_id in raw[1::2] if job_id]
+        if not oldest_ids:
+            return depth, 0.0
+
+        with self.redis_client.pipeline(transaction=False) as pipeline:
+            for job_id in oldest_ids:
+                pipeline.hget(f"rq:job:{job_id}", "enqueued_at")
+            enqueued = [utcparse(v) for v in pipeline.execute() if v]
+        if not enqueued:
+            return depth, 0.0
+        now = datetime.now(timezone.utc)
+        return depth, max((now - t.replace(tzinfo=timezone.utc)).total_seconds() for t in enqueued)
+
+    def idle_worker_ids(self) -> List[int]:
+        """Workers sans job en cours (état RQ), à retirer en priorité."""
+        try:
+            idle_pids = {
+                w.pid
+                for w in Worker.all(connection=self.rq_connection)
+                if w.get_state() == "idle"
+            }
+        except Exception:
+            return []
+        return [wid for wid, p in self.processes.items() if p.pid in idle_pids]
+
+    def check_workers(self) -> None:
+        """
+        Remplace les workers sortis: tout de suite s'ils se sont recyclés
+        (raison publiée dans worker:stats:{pid}), avec backoff s'ils ont planté.
+        Draine ceux dont l'arbre de processus dépasse WORKER_HARD_RSS_MB.
+        """
+        now = time.monotonic()
+        for worker_id, process in list(self.processes.items()):
+            code = process.poll()
+            if code is None:
+                rss_mb = process_tree_rss_mb(process.pid)
+                if rss_mb >= self.config.hard_rss_mb:
+                    print(f"Worker {worker_id} (PID {process.pid}) à {rss_mb:.0f} Mo")
+                    self.drain_worker(worker_id, recycle_reason="rss_hard")
+                continue
+
+            del self.processes[worker_id]
+            uptime = now - self.started_at.pop(worker_id, now)
+            reason = self.forget_stats(process.pid)
+            if reason:
+                self.record_recycle(worker_id, reason)
+                self.add_worker()
+                continue
+
+            print(f"Worker {worker_id} (PID {process.pid}) terminé (code {code})")
+            if uptime >= self.config.stable_uptime:
+                self.crash_streak = 0
+            delay = min(
+                self.config.respawn_backoff_max,
+                self.config.respawn_backoff * 2 ** self.crash_streak,
+            )
+            self.crash_streak += 1
+            self.record_recycle(worker_id, "crash")
+            print(f"Relance dans {delay:.0f}s")
+            self.pending_respawns.append(now + delay)
+
+        due = [t for t in self.pending_respawns if t <= now]
+        self.pending_respawns = [t for t in self.pending_respawns if t > now]
+        for _ in due:
+            self.add_worker()
+
+    def autoscale(self) -> None:
+        """Un pas d'autoscaling: mesure, décide, applique."""
+        now = time.monotonic()
+        try:
+            depth, oldest_age = self.queue_metrics()
+        except redis.RedisError as e:
+            print(f"Métriques Redis indisponibles: {e}")
+            return
+
+        if depth:
+            self.idle_since = None
+        elif self.idle_since is None:
+            self.idle_since = now
+        idle_for = now - self.idle_since if self.idle_since is not None else 0.0
+
+        # Les relances en attente et les remplacements comptent déjà
+        replacing = sum(1 for _, _, r in self.draining.values() if r)
+        current = len(self.processes) + len(self.pending_respawns) + replacing
+        target, reason = decide_worker_count(
+            current,
+            depth,
+            oldest_age,
+            idle_for,
+            psutil.cpu_percent(interval=None),
+            psutil.virtual_memory().percent,
+            self.config,
+        )
+        if target == current:
+            return
+        # Le minimum se rétablit tout de suite, le reste attend le cooldown
+        if current >= self.config.min_workers and now - self.last_scale_at < self.config.cooldown:
+            return
+
+        print(f"Autoscaling {current} -> {target} workers ({reason})")
+        self.last_scale_at = now
+        if target > current:
+            for _ in range(target - current):
+                self.add_worker()
+        else:
+            excess = current - target
+            # Annuler d'abord les relances en attente
+            cancelled = min(excess, len(self.pending_respawns))
+            self.pending_respawns = self.pending_respawns[cancelled:]
+            excess -= cancelled
+            idle = self.idle_worker_ids()
+            # Les plus récents d'abord s'il n'y a pas assez de workers inactifs
+            candidates = idle + [wid for wid in sorted(self.processes, reverse=True) if wid not in idle]
+            for worker_id in candidates[:excess]:
+                self.drain_worker(worker_id)
+            if not depth:
+                # Repartir de zéro pour le prochain retrait
+                self.idle_since = now
+
+    def run_janitor(self) -> None:
+        """Passage du janitor Redis si l'intervalle est écoulé."""
+        if not self.janitor_interval:
+            return
+        now = time.monotonic()
+        if now - self.last_janitor_at < self.janitor_interval:
+            return
+        self.last_janitor_at = now
+        try:
+            report = self.janitor.run_once()
+        except redis.RedisError as e:
+            print(f"⚠️ Janitor Redis en échec: {e}")
+            return
+        if report.get("skipped"):
+            return
+        self.janitor_totals["runs"] += 1
+        self.janitor_totals["deleted"] += report["deleted"]
+        self.janitor_totals["bytes"] += report["bytes"]
+        if report["deleted"]:
+            print(
+                f"🧹 Janitor: {report['deleted']} clés orphelines supprimées "
+                f"({report['bytes']} octets) sur {report['scanned']}"
+            )
+
+    def tier_stats(self) -> dict:
+        """Jobs en cours et attente en queue (p50/p95, secondes) par niveau."""
+        try:
+            running = self.tier_tracker.running()
+            waits = self.tier_tracker.wait_stats()
+        except redis.RedisError as e:
+            return {"error": str(e)}
+        return {tier: dict(waits[tier], running=running[tier]) for tier in waits}
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self.processes),
+            "draining": len(self.draining),
+            "pending_respawns": len(self.pending_respawns),
+            "recycles": dict(self.recycle_counts),
+            "janitor": dict(self.janitor_totals),
+            "tiers": self.tier_stats(),
+            "pids": [p.pid for p in self.processes.values()],
+        }
 
     def run(self):
         """Point d'entrée principal avec gestion robuste des signaux"""
         # Configuration des signaux
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
+        psutil.cpu_percent(interval=None)  # première mesure = référence
 
         try:
             self.start_all_workers()
 
-            # Surveillance simple (sans redémarrage automatique)
             while not self.shutdown_requested:
-                time.sleep(1)
+                self.check_workers()
+                self.reap_draining()
+                self.autoscale()
+                self.run_janitor()
+                time.sleep(self.config.interval)
+
+            self.stop_all_workers()
 
         except KeyboardInterrupt:
-            self.signal_handler(signal.SIGINT, None)
+            self.stop_all_workers()
         except Exception as e:
             print(f"Erreur: {e}")
             self.stop_all_workers()
@@ -23,6 +23,9 @@ import asyncio
 import redis
 from rq import Queue
 from workers.fb_session_worker import create_fb_session_job
+from services.job_event_hub import job_event_hub
+from utils.codec import rq_serializer
+from contextlib import asynccontextmanager
 from langchain_core.callbacks.manager import AsyncCallbackManager
 from langchain_core.callbacks.base import AsyncCallbackHandler
 from bson import ObjectId  # pour sérialiser les ObjectId
@@ -33,7 +36,23 @@ logger = logging.getLogger(__name__)
 
 agent = IanGraph()
 
-app = FastAPI()
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", 15))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Démarre/arrête les ressources partagées du processus API."""
+    await job_event_hub.start()
+    # Graph compilé + checkpointer construits avant la première requête
+    await agent.startup()
+    try:
+        yield
+    finally:
+        await agent.shutdown()
+        await job_event_hub.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 # Gestionnaire d'exceptions global
@@ -130,38 +149,30 @@ def read_root():
 
 
 @app.get("/events/jobs/{job_id}")
-async def job_events(job_id: str):
+async def job_events(
+    job_id: str, request: Request, last_event_id: Optional[str] = None
+):
     """
-    SSE: écoute les événements du job via Redis Pub/Sub.
-    Le worker publie sur: sse:job:{job_id}
+    SSE: rejoue les événements du job (stream Redis) puis suit le direct via
+    le hub Pub/Sub du processus. Le worker publie sur: sse:job:{job_id}
+    Reprise: header Last-Event-ID (reconnexion EventSource) ou ?last_event_id=
     """
     try:
-        # connexion à redis
-        redis_url = os.getenv("REDIS_URL")
-        r = redis.from_url(redis_url, decode_responses=True)
-
-        # Abonnement au channel
-        pubsub = r.pubsub()
-        channel = f"sse:job:{job_id}"
-        pubsub.subscribe(channel)
+        resume_from = request.headers.get("last-event-id") or last_event_id
 
         async def event_generator():
-            try:
-                while True:  # Boucle infinie pour écouter les événements
-                    # ecoute les messages de redis
-                    message = await asyncio.to_thread(pubsub.get_message, timeout=1.0)
-
-                    if message and message.get("type") == "message":
-                        data = message.get("data", "")
-                        yield f"data: {data}\n\n"
-                    await asyncio.sleep(0.05)
-            finally:
-                try:
-                    
-                    pubsub.unsubscribe(channel)
-                    pubsub.close()
-                except Exception as e:
-                    pass
+            async for item in job_event_hub.events(
+                job_id, resume_from, keepalive=SSE_KEEPALIVE_SECONDS
+            ):
+                if item is None:
+                    # commentaire SSE pour garder la connexion ouverte
+                    yield ": keep-alive\n\n"
+                    continue
+                event_id, data = item
+                if event_id:
+                    yield f"id: {event_id}\ndata: {data}\n\n"
+                else:
+                    yield f"data: {data}\n\n"
 
         return StreamingResponse(
             event_generator(),
@@ -169,13 +180,19 @@ async def job_events(job_id: str):
             headers={
                 "Cache-Control": "no-cache, no-transform",
                 "Connection": "keep-alive",
-    },
-)
+            },
+        )
     except Exception as e:
         logger.error(f"Erreur lors de l'initialisation de job_events: {e}")
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
 
 
+@app.get("/events/stats")
+async def job_events_stats():
+    """Métriques du hub SSE (clients connectés, messages distribués/perdus)."""
+    return job_event_hub.stats()
+
+
 @app.get("/user/info")
 async def get_user_info(req: Request):
     """Récupère les informations de l'utilisateur authentifié"""
@@ -201,7 +218,7 @@ async def enqueue_fb_session(user_id: str):
     """
     redis_url = os.getenv("REDIS_URL")
     conn = redis.from_url(redis_url, decode_responses=True)
-    queue = Queue("fb_session", connection=conn)
+    queue = Queue("fb_session", connection=conn, serializer=rq_serializer())
     job = queue.enqueue(create_fb_session_job, user_id)
     return {"enqueued": True, "job_id": job.id}
 
@@ -1,3 +1,12 @@
-from .search_service import SearchService
+# SearchService est chargé à la demande: agents.tools importe des
+# sous-modules de services (browser_pool, http_pool) et search_service
+# importe agents.tools, un import ici créerait un cycle.
+__all__ = ["SearchService"]
 
-__all__ = ["SearchService"]
\ No newline at end of file
+
+def __getattr__(name):
+    if name == "SearchService":
+        from .search_service import SearchService
+
+        return SearchService
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,248 @@
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from crawl4ai import AsyncWebCrawler
+from crawl4ai import BrowserConfig
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from utils.process import process_tree_rss_mb
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36"
+
+
+def default_browser_config() -> BrowserConfig:
+    """Configuration Chromium partagée par tous les crawlers du pool."""
+    return BrowserConfig(
+        verbose=True,
+        headless=True,
+        user_agent=DEFAULT_USER_AGENT,
+        extra_args=[
+            "--disable-blink-features=AutomationControlled",
+            "--disable-dev-shm-usage",
+            "--no-sandbox",
+        ],
+    )
+
+
+# Messages Playwright d'un navigateur inutilisable (crawl4ai les relaie
+# parfois dans une exception générique)
+_BROWSER_GONE_MARKERS = (
+    "target page, context or browser has been closed",
+    "target closed",
+    "browser has been closed",
+    "browser has disconnected",
+)
+
+
+def is_browser_error(error: BaseException) -> bool:
+    """
+    Vrai si l'erreur laisse le navigateur inutilisable (déconnecté, cible
+    fermée). Un timeout de page ou une erreur de parsing ne compte pas.
+    """
+    if isinstance(error, (PlaywrightTimeoutError, asyncio.TimeoutError)):
+        return False
+    message = str(error).lower()
+    return any(marker in message for marker in _BROWSER_GONE_MARKERS)
+
+
+class _PooledBrowser:
+    """Un Chromium démarré (AsyncWebCrawler) et ses compteurs d'usage."""
+
+    def __init__(self, crawler: AsyncWebCrawler):
+        self.crawler = crawler
+        self.created_at = time.time()
+        self.pages_served = 0
+        self.in_use = 0
+        self.retiring = False
+
+
+class BrowserPool:
+    """
+    Pool de navigateurs Chromium (crawl4ai) partagé par processus worker.
+
+    - garde les navigateurs chauds entre les fetchs (crawl4ai réutilise ses
+      contextes tant que la config de run ne change pas)
+    - plafonne le nombre total de navigateurs et de pages simultanées
+    - recycle un navigateur après N pages ou si le RSS dépasse la limite
+
+    Les objets Playwright sont liés à l'event loop qui les a créés : si le pool
+    est utilisé depuis une autre loop, les anciens navigateurs sont abandonnés
+    et le pool repart de zéro. Appeler close() avant de fermer la loop.
+    """
+
+    def __init__(
+        self,
+        max_browsers: Optional[int] = None,
+        max_pages_per_browser: Optional[int] = None,
+        max_concurrent_pages: Optional[int] = None,
+        max_rss_mb: Optional[int] = None,
+    ):
+        self.max_browsers = max_browsers or int(os.getenv("BROWSER_POOL_SIZE", 2))
+        self.max_pages_per_browser = max_pages_per_browser or int(
+            os.getenv("BROWSER_MAX_PAGES", 50)
+        )
+        self.max_concurrent_pages = max_concurrent_pages or int(
+            os.getenv("BROWSER_MAX_CONCURRENT_PAGES", 3)
+        )
+        self.max_rss_mb = max_rss_mb or int(os.getenv("BROWSER_MAX_RSS_MB", 1500))
+
+        self._browsers: List[_PooledBrowser] = []
+        self._starting = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._cond: Optional[asyncio.Condition] = None
+
+        # Métriques
+        self.launches = 0
+        self.recycles = 0
+        self.pages_served = 0
+
+    def _bind_loop(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._browsers:
+                logger.warning(
+                    "[BrowserPool] event loop changée, %d navigateurs abandonnés",
+                    len(self._browsers),
+                )
+            self._browsers = []
+            self._starting = 0
+            self._loop = loop
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    def _pick(self) -> Optional[_PooledBrowser]:
+        available = [
+            b
+            for b in self._browsers
+            if not b.retiring and b.in_use < self.max_concurrent_pages
+        ]
+        if not available:
+            return None
+        return min(available, key=lambda b: b.in_use)
+
+    async def _launch(self) -> _PooledBrowser:
+        crawler = AsyncWebCrawler(config=default_browser_config())
+        await crawler.start()
+        self.launches += 1
+        logger.info("[BrowserPool] nouveau navigateur démarré (total=%d)", self.launches)
+        return _PooledBrowser(crawler)
+
+    async def _retire(self, browser: _PooledBrowser, reason: str) -> None:
+        cond = self._bind_loop()
+        async with cond:
+            if browser in self._browsers:
+                self._browsers.remove(browser)
+            # libère une place pour un nouveau lancement
+            cond.notify_all()
+        self.recycles += 1
+        logger.info(
+            "[BrowserPool] recyclage navigateur raison=%s pages=%d",
+            reason,
+            browser.pages_served,
+        )
+        try:
+            await browser.crawler.close()
+        except Exception as e:
+            logger.warning("[BrowserPool] erreur fermeture navigateur: %s", e)
+
+    async def _acquire(self) -> _PooledBrowser:
+        cond = self._bind_loop()
+        async with cond:
+            while True:
+                browser = self._pick()
+                if browser is not None:
+                    browser.in_use += 1
+                    return browser
+                if len(self._browsers) + self._starting < self.max_browsers:
+                    self._starting += 1
+                    break
+                await cond.wait()
+
+        # Lancement hors du verrou: un démarrage Chromium prend plusieurs secondes
+        try:
+            browser = await self._launch()
+        except Exception:
+            async with cond:
+                self._starting -= 1
+                cond.notify_all()
+            raise
+
+        async with cond:
+            self._starting -= 1
+            browser.in_use += 1
+            self._browsers.append(browser)
+            cond.notify_all()
+        return browser
+
+    async def _release(self, browser: _PooledBrowser, failed: bool) -> None:
+        cond = self._bind_loop()
+        reason = None
+        async with cond:
+            browser.in_use -= 1
+            browser.pages_served += 1
+            self.pages_served += 1
+            if failed:
+                reason = "error"
+            elif browser.pages_served >= self.max_pages_per_browser:
+                reason = "max_pages"
+            elif self.max_rss_mb and process_tree_rss_mb() > self.max_rss_mb:
+                reason = "rss"
+            if reason:
+                browser.retiring = True
+            close_now = browser.retiring and browser.in_use == 0
+            cond.notify_all()
+
+        if close_now:
+            await self._retire(browser, reason or "retiring")
+
+    @asynccontextmanager
+    async def checkout(self) -> AsyncIterator[AsyncWebCrawler]:
+        """
+        Emprunte un crawler démarré pour la durée du bloc.
+        Usage: async with browser_pool.checkout() as crawler: await crawler.arun(...)
+        """
+        browser = await self._acquire()
+        failed = False
+        try:
+            yield browser.crawler
+        except Exception as e:
+            # Seul un navigateur déconnecté/fermé est retiré: un timeout de page
+            # ou une erreur du code appelant ne touche pas aux autres fetchs
+            failed = is_browser_error(e)
+            raise
+        finally:
+            await self._release(browser, failed)
+
+    async def close(self) -> None:
+        """Ferme tous les navigateurs de la loop courante."""
+        if self._loop is not asyncio.get_running_loop():
+            self._browsers = []
+            return
+        browsers, self._browsers = self._browsers, []
+        for browser in browsers:
+            try:
+                await browser.crawler.close()
+            except Exception as e:
+                logger.warning("[BrowserPool] erreur fermeture navigateur: %s", e)
+        logger.info("[BrowserPool] %d navigateurs fermés", len(browsers))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "browsers": len(self._browsers),
+            "in_use": sum(b.in_use for b in self._browsers),
+            "launches": self.launches,
+            "recycles": self.recycles,
+            "pages_served": self.pages_served,
+            "rss_mb": round(process_tree_rss_mb(), 1),
+        }
+
+
+# Instance globale (une par processus worker)
+browser_pool = BrowserPool()
@@ -0,0 +1,83 @@
+import os
+import asyncio
+import logging
+import importlib.util
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+# HTTP/2 seulement si le paquet h2 est installé (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class HttpClientPool:
+    """
+    Clients httpx.AsyncClient partagés par processus, un par proxy.
+
+    Chaque client garde ses connexions keep-alive (HTTP/2 si possible) d'un
+    appel à l'autre: plus de handshake TLS/proxy à chaque requête ou retry.
+    Comme le pool de navigateurs, les clients sont liés à l'event loop qui
+    les a créés; appeler aclose() avant de fermer la loop.
+    """
+
+    def __init__(self):
+        self.max_connections = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", 50))
+        self.max_keepalive = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", 20))
+        self.timeout = float(os.getenv("HTTP_POOL_TIMEOUT", 20))
+
+        self._clients: Dict[Tuple[Optional[str], bool], httpx.AsyncClient] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self, proxy: Optional[str] = None, verify: bool = True) -> httpx.AsyncClient:
+        """Retourne le client partagé pour ce proxy (None = connexion directe)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._clients:
+                logger.warning(
+                    "[HttpClientPool] event loop changée, %d clients abandonnés",
+                    len(self._clients),
+                )
+            self._clients = {}
+            self._loop = loop
+
+        key = (proxy, verify)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                proxy=proxy,
+                verify=verify,
+                http2=HTTP2_AVAILABLE,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                ),
+            )
+            self._clients[key] = client
+            logger.info(
+                "[HttpClientPool] nouveau client proxy=%s http2=%s",
+                "oui" if proxy else "non",
+                HTTP2_AVAILABLE,
+            )
+        return client
+
+    async def aclose(self) -> None:
+        """Ferme les clients de la loop courante."""
+        clients, self._clients = self._clients, {}
+        if self._loop is not asyncio.get_running_loop():
+            return
+        for client in clients.values():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning("[HttpClientPool] erreur fermeture client: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"clients": len(self._clients), "http2": HTTP2_AVAILABLE}
+
+
+# Instance globale (une par processus)
+http_pool = HttpClientPool()
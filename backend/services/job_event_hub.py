@@ -0,0 +1,196 @@
+import os
+import json
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+import redis.asyncio as aioredis
+
+from utils.event_publisher import CHANNEL_PREFIX, stream_key, with_event_id
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_stream_id(event_id: str) -> Tuple[int, int]:
+    """'1700000000000-3' -> (1700000000000, 3) pour comparer deux ids."""
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+class JobEventHub:
+    """
+    Multiplexeur SSE: un seul abonnement Redis (PSUBSCRIBE sse:job:*) par
+    processus API, redistribué vers une queue bornée par client connecté.
+
+    Remplace la connexion + pubsub synchrones par client, qui occupaient
+    un thread du pool à chaque onglet ouvert.
+    """
+
+    def __init__(self, queue_size: Optional[int] = None):
+        self.redis_url = os.getenv("REDIS_URL")
+        self.queue_size = queue_size or int(os.getenv("SSE_QUEUE_SIZE", 100))
+
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        self._client: Optional[aioredis.Redis] = None
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+
+        # Métriques
+        self.messages_dispatched = 0
+        self.messages_dropped = 0
+
+    async def start(self) -> None:
+        """Ouvre l'abonnement pattern et lance la tâche de lecture."""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._task is not None and not self._task.done():
+                return
+            self._client = aioredis.from_url(self.redis_url, decode_responses=True)
+            self._pubsub = self._client.pubsub()
+            await self._pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+            self._task = asyncio.create_task(self._reader())
+            logger.info("[JobEventHub] abonné à %s*", CHANNEL_PREFIX)
+
+    async def stop(self) -> None:
+        """Arrête la lecture et ferme la connexion Redis."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            if self._pubsub is not None:
+                await self._pubsub.punsubscribe()
+                await self._pubsub.close()
+            if self._client is not None:
+                await self._client.close()
+        except Exception as e:
+            logger.warning("[JobEventHub] erreur à la fermeture: %s", e)
+        self._pubsub = None
+        self._client = None
+
+    async def _reader(self) -> None:
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    self._dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # redis-py se reconnecte et se réabonne au prochain appel
+                logger.error("[JobEventHub] erreur de lecture pubsub: %s", e)
+                await asyncio.sleep(1)
+
+    def _dispatch(self, channel: str, data: str) -> None:
+        job_id = channel[len(CHANNEL_PREFIX) :]
+        for queue in self._listeners.get(job_id, ()):
+            if queue.full():
+                # Client trop lent: on sacrifie le plus ancien événement
+                try:
+                    queue.get_nowait()
+                    self.messages_dropped += 1
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(data)
+            self.messages_dispatched += 1
+
+    @asynccontextmanager
+    async def subscribe(self, job_id: str) -> AsyncIterator[asyncio.Queue]:
+        """
+        Inscrit un client SSE sur les événements d'un job.
+        La queue reçoit les messages bruts publiés sur sse:job:{job_id}.
+        """
+        await self.start()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._listeners.setdefault(job_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            listeners = self._listeners.get(job_id)
+            if listeners is not None:
+                listeners.discard(queue)
+                if not listeners:
+                    del self._listeners[job_id]
+
+    async def replay(
+        self, job_id: str, last_event_id: Optional[str] = None
+    ) -> List[Tuple[str, str]]:
+        """
+        Relit le stream du job après last_event_id (exclu), ou depuis le début.
+        Retourne [(event_id, message_json)].
+        """
+        await self.start()
+        start = f"({last_event_id}" if last_event_id else "-"
+        try:
+            entries = await self._client.xrange(stream_key(job_id), min=start)
+        except Exception as e:
+            logger.warning("[JobEventHub] replay impossible pour %s: %s", job_id, e)
+            return []
+        return [
+            (entry_id, with_event_id(entry_id, fields.get("data", "{}")))
+            for entry_id, fields in entries
+        ]
+
+    async def events(
+        self,
+        job_id: str,
+        last_event_id: Optional[str] = None,
+        keepalive: float = 15.0,
+    ) -> AsyncIterator[Optional[Tuple[Optional[str], str]]]:
+        """
+        Rejoue l'historique du job puis suit le direct, sans doublon.
+        Produit (event_id, message_json), ou None quand rien n'est arrivé
+        pendant `keepalive` secondes.
+        """
+        cursor = None
+        if last_event_id:
+            try:
+                cursor = _parse_stream_id(last_event_id)
+            except ValueError:
+                # id invalide: on rejoue tout l'historique
+                last_event_id = None
+
+        async with self.subscribe(job_id) as queue:
+            # Abonné AVANT la relecture: rien ne se perd entre les deux
+            for event_id, data in await self.replay(job_id, last_event_id):
+                cursor = _parse_stream_id(event_id)
+                yield event_id, data
+
+            while True:
+                try:
+                    data = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+
+                try:
+                    event_id = json.loads(data).get("id")
+                except (TypeError, ValueError, AttributeError):
+                    event_id = None
+
+                if event_id:
+                    parsed = _parse_stream_id(event_id)
+                    if cursor is not None and parsed <= cursor:
+                        continue  # déjà envoyé pendant la relecture
+                    cursor = parsed
+                yield event_id, data
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected_clients": sum(len(q) for q in self._listeners.values()),
+            "jobs_watched": len(self._listeners),
+            "messages_dispatched": self.messages_dispatched,
+            "messages_dropped": self.messages_dropped,
+            "running": self._task is not None and not self._task.done(),
+        }
+
+
+# Instance globale (une par processus API)
+job_event_hub = JobEventHub()
@@ -0,0 +1,214 @@
+import os
+import time
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+
+# Niveaux de priorité des jobs de scraping, du plus prioritaire au moins prioritaire
+TIERS = ("high", "default", "prefetch")
+DEFAULT_TIER = "default"
+# Ancienne queue unique: encore vidée (jobs enqueue avant le déploiement), au niveau default
+LEGACY_QUEUE = "scraping"
+
+RUNNING_KEY_PREFIX = "queue:running:"
+WAIT_KEY_PREFIX = "queue:wait:"
+
+
+def queue_name(tier: str) -> str:
+    """scraping:{tier}; niveau inconnu => default."""
+    return f"{LEGACY_QUEUE}:{tier if tier in TIERS else DEFAULT_TIER}"
+
+
+def scraping_queue_names() -> List[str]:
+    """Queues de scraping à écouter, legacy comprise."""
+    return [queue_name(tier) for tier in TIERS] + [LEGACY_QUEUE]
+
+
+def tier_of_queue(name: str) -> Optional[str]:
+    """Niveau d'une queue de scraping, None pour une autre queue (fb_session...)."""
+    if name == LEGACY_QUEUE:
+        return DEFAULT_TIER
+    prefix = f"{LEGACY_QUEUE}:"
+    if name.startswith(prefix) and name[len(prefix) :] in TIERS:
+        return name[len(prefix) :]
+    return None
+
+
+def tier_for_user(premium: Optional[bool]) -> str:
+    """Utilisateur premium (hasAccess) => high, sinon default."""
+    return "high" if premium else DEFAULT_TIER
+
+
+def _parse_tier_map(value: str, default: Dict[str, int]) -> Dict[str, int]:
+    """"high:6,default:3,prefetch:1" -> {"high": 6, ...} (entrées invalides ignorées)."""
+    result = dict(default)
+    for item in (value or "").split(","):
+        tier, _, number = item.partition(":")
+        tier = tier.strip()
+        if tier in TIERS and number.strip().isdigit():
+            result[tier] = int(number)
+    return result
+
+
+def load_weights() -> Dict[str, int]:
+    return _parse_tier_map(
+        os.getenv("QUEUE_WEIGHTS", ""), {"high": 6, "default": 3, "prefetch": 1}
+    )
+
+
+def load_caps() -> Dict[str, int]:
+    """Jobs simultanés max par niveau sur tout le parc (0 = illimité)."""
+    return _parse_tier_map(
+        os.getenv("QUEUE_CAPS", ""), {"high": 0, "default": 0, "prefetch": 2}
+    )
+
+
+class WeightedQueueOrder:
+    """
+    Ordre d'écoute des queues, recalculé avant chaque dequeue.
+
+    Round-robin pondéré lissé (QUEUE_WEIGHTS, 6/3/1 par défaut): sur 10
+    dequeues en concurrence, high passe en tête 6 fois, default 3 fois,
+    prefetch une fois. Les autres niveaux suivent par poids décroissant:
+    un worker ne reste jamais inactif si une queue a du travail. Les niveaux
+    saturés (QUEUE_CAPS) sont retirés de l'ordre. Les queues qui ne sont pas
+    des queues de scraping (fb_session...) restent à la fin, dans leur ordre.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, int]] = None):
+        self.weights = weights or load_weights()
+        self._current = {tier: 0 for tier in TIERS}
+
+    def next_tier(self, tiers: Iterable[str]) -> Optional[str]:
+        """Niveau en tête pour ce tour (smooth weighted round-robin)."""
+        tiers = [t for t in tiers if self.weights.get(t, 0) > 0]
+        if not tiers:
+            return None
+        total = 0
+        for tier in tiers:
+            self._current[tier] += self.weights[tier]
+            total += self.weights[tier]
+        best = max(tiers, key=lambda t: (self._current[t], -TIERS.index(t)))
+        self._current[best] -= total
+        return best
+
+    def order(self, names: List[str], blocked: Optional[Set[str]] = None) -> List[str]:
+        """Noms de queues dans l'ordre d'écoute pour le prochain dequeue."""
+        blocked = blocked or set()
+        by_tier: Dict[str, List[str]] = {}
+        others = []
+        for name in names:
+            tier = tier_of_queue(name)
+            if tier is None:
+                others.append(name)
+            elif tier not in blocked:
+                by_tier.setdefault(tier, []).append(name)
+
+        first = self.next_tier(by_tier)
+        rest = sorted(
+            (t for t in by_tier if t != first),
+            key=lambda t: (-self.weights.get(t, 0), TIERS.index(t)),
+        )
+        ordered = []
+        for tier in ([first] if first else []) + rest:
+            # scraping:default avant la queue legacy
+            ordered += sorted(by_tier[tier], key=lambda n: n == LEGACY_QUEUE)
+        return ordered + others
+
+
+class TierTracker:
+    """
+    Suivi partagé (Redis) des jobs par niveau:
+    - jobs en cours (zset queue:running:{tier}, pour QUEUE_CAPS); les entrées
+      plus vieilles que JOB_TIMEOUT (worker mort) ne comptent plus
+    - attente en queue (liste queue:wait:{tier} des QUEUE_WAIT_SAMPLES
+      dernières attentes en ms), pour les p50/p95 par niveau
+    Redis indisponible: rien n'est bloqué, les métriques sont perdues.
+    """
+
+    def __init__(self, connection: redis.Redis, caps: Optional[Dict[str, int]] = None):
+        self.connection = connection
+        self.caps = caps if caps is not None else load_caps()
+        self.max_job_age = int(os.getenv("JOB_TIMEOUT", 200)) + 60
+        self.samples = int(os.getenv("QUEUE_WAIT_SAMPLES", 1000))
+
+    def job_started(
+        self, tier: str, job_id: str, enqueued_at: Optional[datetime] = None
+    ) -> Optional[float]:
+        """Enregistre le démarrage d'un job; retourne son attente en secondes."""
+        wait = None
+        if enqueued_at is not None:
+            if enqueued_at.tzinfo is None:
+                enqueued_at = enqueued_at.replace(tzinfo=timezone.utc)
+            wait = max(0.0, (datetime.now(timezone.utc) - enqueued_at).total_seconds())
+        try:
+            with self.connection.pipeline(transaction=False) as pipeline:
+                pipeline.zadd(f"{RUNNING_KEY_PREFIX}{tier}", {job_id: time.time()})
+                if wait is not None:
+                    pipeline.lpush(f"{WAIT_KEY_PREFIX}{tier}", int(wait * 1000))
+                    pipeline.ltrim(f"{WAIT_KEY_PREFIX}{tier}", 0, self.samples - 1)
+                pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"[TierTracker] démarrage non enregistré: {e}")
+        return wait
+
+    def job_finished(self, tier: str, job_id: str) -> None:
+        try:
+            self.connection.zrem(f"{RUNNING_KEY_PREFIX}{tier}", job_id)
+        except redis.RedisError as e:
+            logger.warning(f"[TierTracker] fin non enregistrée: {e}")
+
+    def saturated_tiers(self) -> Set[str]:
+        """Niveaux ayant atteint leur plafond de jobs simultanés (plafond souple)."""
+        capped = [tier for tier in TIERS if self.caps.get(tier)]
+        if not capped:
+            return set()
+        since = time.time() - self.max_job_age
+        try:
+            with self.connection.pipeline(transaction=False) as pipeline:
+                for tier in capped:
+                    pipeline.zcount(f"{RUNNING_KEY_PREFIX}{tier}", since, "+inf")
+                counts = pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"[TierTracker] plafonds non lus: {e}")
+            return set()
+        return {tier for tier, count in zip(capped, counts) if count >= self.caps[tier]}
+
+    def running(self) -> Dict[str, int]:
+        since = time.time() - self.max_job_age
+        with self.connection.pipeline(transaction=False) as pipeline:
+            for tier in TIERS:
+                pipeline.zremrangebyscore(f"{RUNNING_KEY_PREFIX}{tier}", "-inf", since)
+                pipeline.zcard(f"{RUNNING_KEY_PREFIX}{tier}")
+            raw = pipeline.execute()
+        return dict(zip(TIERS, raw[1::2]))
+
+    def wait_stats(self) -> Dict[str, Dict[str, float]]:
+        """{tier: {"count", "p50", "p95", "max"}} en secondes, sur les dernières attentes."""
+        with self.connection.pipeline(transaction=False) as pipeline:
+            for tier in TIERS:
+                pipeline.lrange(f"{WAIT_KEY_PREFIX}{tier}", 0, -1)
+            raw = pipeline.execute()
+        return {tier: wait_summary(values) for tier, values in zip(TIERS, raw)}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    index = min(len(values) - 1, max(0, int(round(q * (len(values) - 1)))))
+    return values[index]
+
+
+def wait_summary(samples_ms: Iterable) -> Dict[str, float]:
+    values = sorted(int(v) / 1000 for v in samples_ms)
+    if not values:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "count": len(values),
+        "p50": round(_percentile(values, 0.5), 3),
+        "p95": round(_percentile(values, 0.95), 3),
+        "max": round(values[-1], 3),
+    }
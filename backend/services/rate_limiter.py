@@ -0,0 +1,205 @@
+import os
+import math
+import uuid
+import logging
+from typing import Any, Dict, List, Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+
+KEY_PREFIX = "rate_limit:"
+
+# Les deux scripts vérifient TOUTES les clés avant d'en consommer une: une
+# requête refusée pour l'IP ne coûte rien au quota de l'utilisateur.
+# L'horloge est celle de Redis (TIME): pas de dérive entre instances API.
+# Retour: {autorisé (0/1), restant (min des clés), retry_after en ms, index de la clé bloquante}
+
+# KEYS: un hash par identité (tokens, ts). ARGV[1]: coût, puis (rate/s, burst) par clé
+_TOKEN_BUCKET_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local cost = tonumber(ARGV[1])
+local tokens = {}
+local remaining = -1
+local retry = 0
+local blocked = 0
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[2 * i]) / 1000
+  local burst = tonumber(ARGV[2 * i + 1])
+  local state = redis.call('HMGET', key, 'tokens', 'ts')
+  local level = tonumber(state[1]) or burst
+  local ts = tonumber(state[2]) or now
+  level = math.min(burst, level + math.max(0, now - ts) * rate)
+  tokens[i] = level
+  if level < cost then
+    local wait = math.ceil((cost - level) / rate)
+    if wait > retry then
+      retry = wait
+      blocked = i
+    end
+  end
+  local left = math.floor(level - cost)
+  if remaining < 0 or left < remaining then
+    remaining = left
+  end
+end
+if blocked > 0 then
+  return {0, 0, retry, blocked}
+end
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[2 * i]) / 1000
+  local burst = tonumber(ARGV[2 * i + 1])
+  redis.call('HSET', key, 'tokens', tokens[i] - cost, 'ts', now)
+  redis.call('PEXPIRE', key, math.ceil(burst / rate))
+end
+return {1, math.max(remaining, 0), 0, 0}
+"""
+
+# KEYS: un zset d'horodatages par identité. ARGV[1]: fenêtre (ms), ARGV[2]: membre unique,
+# puis la limite de chaque clé
+_SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local window = tonumber(ARGV[1])
+local remaining = -1
+local retry = 0
+local blocked = 0
+for i, key in ipairs(KEYS) do
+  local limit = tonumber(ARGV[2 + i])
+  redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+  local count = redis.call('ZCARD', key)
+  if count >= limit then
+    local first = redis.call('ZRANGE', key, count - limit, count - limit, 'WITHSCORES')
+    local wait = math.max(1, tonumber(first[2]) + window - now)
+    if wait > retry then
+      retry = wait
+      blocked = i
+    end
+  end
+  local left = limit - count - 1
+  if remaining < 0 or left < remaining then
+    remaining = left
+  end
+end
+if blocked > 0 then
+  return {0, 0, retry, blocked}
+end
+for i, key in ipairs(KEYS) do
+  redis.call('ZADD', key, now, ARGV[2])
+  redis.call('PEXPIRE', key, window)
+end
+return {1, math.max(remaining, 0), 0, 0}
+"""
+
+
+class RateLimiter:
+    """
+    Rate limiting atomique côté Redis (un seul aller-retour par requête), par
+    utilisateur et par IP.
+
+    Modes (RATE_LIMIT_MODE):
+    - sliding_window: au plus N requêtes sur les `window` dernières secondes
+    - token_bucket: N requêtes en rafale, puis N/window par seconde
+
+    Redis indisponible: la requête passe (on ne bloque pas la recherche).
+    """
+
+    MODES = ("sliding_window", "token_bucket")
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        self.mode = os.getenv("RATE_LIMIT_MODE", "sliding_window")
+        if self.mode not in self.MODES:
+            logger.warning(f"[RateLimiter] mode inconnu {self.mode}, sliding_window")
+            self.mode = "sliding_window"
+        self.window = float(os.getenv("RATE_LIMIT_WINDOW", 60))
+        self.limits = {
+            "ip": int(os.getenv("RATE_LIMIT_IP_REQUESTS", 100)),
+            "user": int(os.getenv("RATE_LIMIT_USER_REQUESTS", 30)),
+        }
+
+        self.redis_client = redis_client or redis.from_url(
+            os.getenv("REDIS_URL", ""), decode_responses=True
+        )
+        self._scripts = {
+            "token_bucket": self.redis_client.register_script(_TOKEN_BUCKET_SCRIPT),
+            "sliding_window": self.redis_client.register_script(_SLIDING_WINDOW_SCRIPT),
+        }
+
+        # Métriques
+        self.allowed = 0
+        self.limited = 0
+        self.errors = 0
+
+    def key_for(self, scope: str, identity: str) -> str:
+        return f"{KEY_PREFIX}{self.mode}:{scope}:{identity}"
+
+    def _args(self, scopes: List[str]) -> List[Any]:
+        if self.mode == "token_bucket":
+            args: List[Any] = [1]
+            for scope in scopes:
+                limit = self.limits[scope]
+                args += [limit / self.window, limit]
+            return args
+        return [int(self.window * 1000), uuid.uuid4().hex] + [
+            self.limits[scope] for scope in scopes
+        ]
+
+    def check(
+        self, user_id: Optional[str] = None, user_ip: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Consomme une requête pour l'utilisateur et l'IP (identités vides ignorées).
+
+        Retourne {"allowed", "remaining", "retry_after" (secondes), "scope"}.
+        """
+        identities = [
+            (scope, identity)
+            for scope, identity in (("user", user_id), ("ip", user_ip))
+            if identity and self.limits[scope] > 0
+        ]
+        if not identities:
+            return {"allowed": True, "remaining": None, "retry_after": 0, "scope": None}
+
+        scopes = [scope for scope, _ in identities]
+        keys = [self.key_for(scope, identity) for scope, identity in identities]
+        try:
+            allowed, remaining, retry_ms, blocked = self._scripts[self.mode](
+                keys=keys, args=self._args(scopes)
+            )
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning(f"[RateLimiter] Redis indisponible, requête autorisée: {e}")
+            return {"allowed": True, "remaining": None, "retry_after": 0, "scope": None}
+
+        if allowed:
+            self.allowed += 1
+            return {
+                "allowed": True,
+                "remaining": int(remaining),
+                "retry_after": 0,
+                "scope": None,
+            }
+
+        self.limited += 1
+        scope, identity = identities[int(blocked) - 1]
+        retry_after = max(1, math.ceil(int(retry_ms) / 1000))
+        logger.warning(
+            f"[RateLimiter] limite {scope} atteinte pour {identity} "
+            f"(retry_after={retry_after}s)"
+        )
+        return {
+            "allowed": False,
+            "remaining": 0,
+            "retry_after": retry_after,
+            "scope": scope,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "errors": self.errors,
+        }
@@ -0,0 +1,167 @@
+import os
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+
+# Statuts RQ d'un job encore vivant: son marqueur single-flight doit rester
+IN_FLIGHT_STATUSES = {"queued", "started", "deferred", "scheduled"}
+
+CURSOR_KEY = "janitor:cursor"
+LOCK_KEY = "janitor:lock"
+
+# Supprime le marqueur seulement s'il désigne toujours le même job
+# (un nouvel appelant a pu le reprendre entre la lecture et la suppression)
+_DELETE_IF_EQUALS = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('UNLINK', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisJanitor:
+    """
+    Maintenance incrémentale des clés Redis de la recherche, sans KEYS.
+
+    Chaque passage parcourt au plus JANITOR_MAX_KEYS clés par motif avec
+    SCAN (lots de JANITOR_BATCH), puis reprend au curseur mémorisé au
+    passage suivant. Un verrou évite deux passages simultanés: sûr à lancer
+    chaque minute sur un Redis chargé.
+
+    Orphelins supprimés (UNLINK):
+    - job:*             marqueur dont le job RQ n'existe plus ou est terminé
+    - search_results:*  entrée de cache sans TTL (ancien format)
+    - rate_limit:*      compteur sans TTL (ancien INCR)
+    - sse:stream:*      historique SSE sans TTL
+    """
+
+    PATTERNS = ("job:*", "search_results:*", "rate_limit:*", "sse:stream:*")
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        rq_connection: Optional[redis.Redis] = None,
+    ):
+        redis_url = os.getenv("REDIS_URL", "")
+        self.redis_client = redis_client or redis.from_url(
+            redis_url, decode_responses=True
+        )
+        self.rq_connection = rq_connection or redis.from_url(redis_url)
+        self.batch = int(os.getenv("JANITOR_BATCH", 200))
+        self.max_keys = int(os.getenv("JANITOR_MAX_KEYS", 5000))
+        # Pause entre deux lots pour laisser passer le trafic
+        self.pause = int(os.getenv("JANITOR_PAUSE_MS", 5)) / 1000
+        # Un marqueur plus jeune que ça peut précéder son enqueue: on n'y touche pas
+        self.marker_grace = int(os.getenv("JANITOR_MARKER_GRACE", 30))
+        self.marker_ttl = int(os.getenv("JOB_TIMEOUT", 200)) + 60
+        # Filet de sécurité si le processus meurt en plein passage
+        self.lock_ttl = int(os.getenv("JANITOR_LOCK_TTL", 300))
+        self._delete_if_equals = self.redis_client.register_script(_DELETE_IF_EQUALS)
+
+    def run_once(self) -> Dict[str, Any]:
+        """
+        Un passage sur tous les motifs. Retourne le rapport
+        {"scanned", "deleted", "bytes", "patterns": {...}, "duration_ms"},
+        ou {"skipped": True} si un autre passage est en cours.
+        """
+        start = time.monotonic()
+        if not self.redis_client.set(LOCK_KEY, os.getpid(), nx=True, ex=self.lock_ttl):
+            return {"skipped": True}
+
+        report: Dict[str, Any] = {"scanned": 0, "deleted": 0, "bytes": 0, "patterns": {}}
+        try:
+            for pattern in self.PATTERNS:
+                stats = self._sweep(pattern)
+                report["patterns"][pattern] = stats
+                for field in ("scanned", "deleted", "bytes"):
+                    report[field] += stats[field]
+        finally:
+            self.redis_client.delete(LOCK_KEY)
+
+        report["duration_ms"] = int((time.monotonic() - start) * 1000)
+        logger.info(
+            f"[RedisJanitor] {report['scanned']} clés parcourues, "
+            f"{report['deleted']} supprimées ({report['bytes']} octets) "
+            f"en {report['duration_ms']} ms"
+        )
+        return report
+
+    def _sweep(self, pattern: str) -> Dict[str, Any]:
+        """Avance le SCAN d'un motif d'au plus max_keys clés."""
+        cursor = int(self.redis_client.hget(CURSOR_KEY, pattern) or 0)
+        stats = {"scanned": 0, "deleted": 0, "bytes": 0, "wrapped": False}
+
+        while stats["scanned"] < self.max_keys:
+            cursor, keys = self.redis_client.scan(cursor, match=pattern, count=self.batch)
+            if keys:
+                stats["scanned"] += len(keys)
+                deleted, freed = self._reconcile(pattern, keys)
+                stats["deleted"] += deleted
+                stats["bytes"] += freed
+            if cursor == 0:
+                stats["wrapped"] = True
+                break
+            if self.pause:
+                time.sleep(self.pause)
+
+        self.redis_client.hset(CURSOR_KEY, pattern, cursor)
+        return stats
+
+    def _reconcile(self, pattern: str, keys: List[str]) -> Tuple[int, int]:
+        """Supprime les orphelins d'un lot. Retourne (supprimés, octets libérés)."""
+        with self.redis_client.pipeline(transaction=False) as pipeline:
+            for key in keys:
+                pipeline.ttl(key)
+                pipeline.memory_usage(key)
+                if pattern == "job:*":
+                    pipeline.get(key)
+            raw = pipeline.execute(raise_on_error=False)
+
+        step = 3 if pattern == "job:*" else 2
+        entries = [raw[i : i + step] for i in range(0, len(raw), step)]
+
+        if pattern != "job:*":
+            # TTL -1: clé persistante qui ne devrait pas l'être; -2: déjà expirée
+            orphans = [
+                (key, entry[1]) for key, entry in zip(keys, entries) if entry[0] == -1
+            ]
+            if not orphans:
+                return 0, 0
+            deleted = self.redis_client.unlink(*[key for key, _ in orphans])
+            return deleted, sum(_size(size) for _, size in orphans)
+
+        # Marqueurs single-flight: réconciliés avec l'état réel du job RQ
+        candidates = []
+        for key, (ttl, size, job_id) in zip(keys, entries):
+            if not isinstance(job_id, str) or ttl == -2:
+                continue
+            if ttl > 0 and ttl > self.marker_ttl - self.marker_grace:
+                continue
+            candidates.append((key, size, job_id))
+        if not candidates:
+            return 0, 0
+
+        with self.rq_connection.pipeline(transaction=False) as pipeline:
+            for _, _, job_id in candidates:
+                pipeline.hget(f"rq:job:{job_id}", "status")
+            statuses = pipeline.execute()
+
+        deleted = freed = 0
+        for (key, size, job_id), status in zip(candidates, statuses):
+            status = status.decode() if isinstance(status, bytes) else status
+            if status in IN_FLIGHT_STATUSES:
+                continue
+            if self._delete_if_equals(keys=[key], args=[job_id]):
+                deleted += 1
+                freed += _size(size)
+        return deleted, freed
+
+
+def _size(value: Any) -> int:
+    """MEMORY USAGE peut échouer (clé expirée entre-temps): 0 octet."""
+    return value if isinstance(value, int) else 0
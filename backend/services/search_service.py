@@ -1,18 +1,26 @@
 import os
+import time
 import asyncio
 import json
 import hashlib
 import logging
-from typing import Optional, Dict, Any, List
-from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+from datetime import datetime, timedelta, timezone
 from redis import Redis
 import redis
 from rq import Queue, get_current_job
-from rq.job import Job
+from rq.job import Job, JobStatus
+from rq.exceptions import NoSuchJobError
 
 from config.redisConfig import RedisConfig
+from utils.event_publisher import stream_key
+from utils.deadline import DEADLINE_PARAM
+from utils import codec
+from services.rate_limiter import RateLimiter
+from services.redis_janitor import RedisJanitor
+from services.priority_queues import DEFAULT_TIER, TIERS, queue_name
 from agents.tools.searchFacebook import SearchFacebook
-from agents.tools.googlePlaces import GooglePlaces
+from agents.tools.googlePlaces import GooglePlaces, PlacesError
 from dotenv import load_dotenv 
 
 load_dotenv()
@@ -21,6 +29,18 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 
 
+# Messages renvoyés au LLM pour une recherche servie par le cache négatif
+NEGATIVE_MESSAGES = {
+    "no_listings": "Aucune annonce ne correspond à ces critères. "
+    "Proposez d'élargir le budget, le nombre de chambres ou la zone.",
+    "place_not_found": "Lieu introuvable. Demandez à l'utilisateur de préciser "
+    "la ville ou le quartier.",
+    "places_unavailable": "Service de géolocalisation momentanément indisponible. "
+    "Réessayez dans quelques instants.",
+    "scrape_failed": "La recherche a échoué. Réessayez dans quelques instants.",
+}
+
+
 class SearchService:
     """Service de recherche avec cache Redis et queue RQ"""
 
@@ -29,15 +49,50 @@ class SearchService:
         self.redis_url =  os.getenv("REDIS_URL")
         self.redis_client = redis.from_url(self.redis_url, decode_responses=True)
 
+        # RQ stocke des données binaires: connexion sans decode_responses.
+        # Payloads et résultats des jobs passent par le codec (utils/codec.py)
+        self.rq_connection = redis.from_url(self.redis_url)
+        self.rq_serializer = codec.rq_serializer()
+        # Le cache de résultats est binaire lui aussi (codec): même connexion
+        self.cache_client = self.rq_connection
+
         # Configuration des queues
-        self.scraping_queue = Queue("scraping", connection=self.redis_client)
+        # Une queue par niveau de priorité (scraping:high/default/prefetch)
+        self.scraping_queues = {
+            tier: Queue(
+                queue_name(tier),
+                connection=self.rq_connection,
+                serializer=self.rq_serializer,
+            )
+            for tier in TIERS
+        }
         self.cache_ttl = int(os.getenv("CACHE_TTL", 300))  # 5 minutes
+        # Fenêtre pendant laquelle un résultat expiré est encore servi (stale-while-revalidate)
+        self.stale_ttl = int(os.getenv("CACHE_STALE_TTL", 1800))  # 30 minutes
         self.max_job_attempts = int(os.getenv("MAX_JOB_ATTEMPTS", 3))
         self.job_timeout = int(os.getenv("JOB_TIMEOUT", 200))
+        # Échéance de bout en bout du job (depuis l'enqueue), sous JOB_TIMEOUT
+        self.job_deadline = float(os.getenv("JOB_DEADLINE", self.job_timeout - 10))
+        # Au-delà de job_timeout + cette marge sans signe de vie, un job
+        # "started"/"queued" est considéré comme mort (worker tué)
+        self.job_stale_grace = int(os.getenv("JOB_STALE_GRACE", 60))
+        # Cache négatif (recherche sans résultat ou en échec): TTL courts par raison
+        self.negative_ttls = {
+            "no_listings": int(os.getenv("NEGATIVE_CACHE_TTL_NO_LISTINGS", 600)),
+            "place_not_found": int(os.getenv("NEGATIVE_CACHE_TTL_PLACE", 3600)),
+            "places_unavailable": int(os.getenv("NEGATIVE_CACHE_TTL_ERROR", 30)),
+            "scrape_failed": int(os.getenv("NEGATIVE_CACHE_TTL_ERROR", 30)),
+        }
+
+        # Rate limiting atomique (script Lua), par utilisateur et par IP
+        self.rate_limiter = RateLimiter(self.redis_client)
 
-        # Rate limiting
-        self.rate_limit_window = 60  # 1 minute
-        self.max_requests_per_window = 100  # 100 requêtes par minute par IP
+        # Vérification du lieu (Google Places) avant la mise en queue
+        self.places_prevalidate = os.getenv("PLACES_PREVALIDATE", "1") == "1"
+        self.places_prevalidate_timeout = float(
+            os.getenv("PLACES_PREVALIDATE_TIMEOUT", 3)
+        )
+        self.google_places = GooglePlaces()
 
     def _generate_cache_key(self, search_params: Dict[str, Any]) -> str:
         """
@@ -59,118 +114,415 @@ class SearchService:
             "location_near": sorted([str(x).lower().strip() for x in location_near]),
             "enrich_top_k": int(search_params.get("enrich_top_k", 4)),
         }
+        # Zone de recherche étendue: seulement si fournie, pour garder les
+        # clés existantes inchangées
+        if search_params.get("bbox"):
+            normalized["bbox"] = [round(float(v), 4) for v in search_params["bbox"]]
+        if search_params.get("polygon"):
+            normalized["polygon"] = [
+                [round(float(lat), 4), round(float(lon), 4)]
+                for lat, lon in search_params["polygon"]
+            ]
+        if search_params.get("max_anchors"):
+            normalized["max_anchors"] = int(search_params["max_anchors"])
 
         # Hash SHA-256 pour une clé unique et sécurisée
         params_str = json.dumps(normalized, sort_keys=True)
         return f"search_results:{hashlib.sha256(params_str.encode()).hexdigest()}"
 
-    def _check_rate_limit(self, user_ip: str) -> bool:
+    def _write_cache(
+        self, cache_key: str, listings: List[dict], partial: bool = False
+    ) -> None:
+        """
+        Écrit les résultats d'une recherche dans le cache.
+        L'enveloppe garde la date d'écriture pour distinguer frais / périmé;
+        la clé vit cache_ttl + stale_ttl secondes.
+        Un résultat partiel (échéance atteinte) est écrit déjà périmé: il est
+        servi tout de suite mais déclenche un rafraîchissement.
+        """
+        cached_at = time.time() - (self.cache_ttl if partial else 0)
+        meta = {"cached_at": cached_at}
+        if partial:
+            meta["partial"] = True
+        # Binaire compact (msgpack + zstd); la date reste lisible sans décoder les annonces
+        value = codec.encode(listings, meta=meta)
+        with self.cache_client.pipeline(transaction=False) as pipeline:
+            pipeline.setex(cache_key, self.cache_ttl + self.stale_ttl, value)
+            # Un résultat remplace une éventuelle entrée négative
+            pipeline.delete(self._negative_key(cache_key))
+            pipeline.execute()
+
+    @staticmethod
+    def _negative_key(cache_key: str) -> str:
+        return f"negative:{cache_key}"
+
+    def _write_negative(
+        self,
+        cache_key: str,
+        reason: str,
+        details: Optional[Dict[str, Any]] = None,
+        overwrite: bool = True,
+    ) -> bool:
         """
-        Vérifie le rate limiting par IP.
-        PROTECTION contre le spam et la surcharge.
+        Mémorise qu'une recherche n'a rien donné (reason: no_listings,
+        place_not_found, places_unavailable, scrape_failed), pour répondre
+        aux tentatives identiques sans relancer de job pendant le TTL de la raison.
+        overwrite=False: ne remplace pas une raison plus précise déjà écrite.
         """
-        key = f"rate_limit:{user_ip}"
-        current_count = self.redis_client.get(key)
+        ttl = self.negative_ttls.get(reason, self.negative_ttls["scrape_failed"])
+        if ttl <= 0:
+            return False
+        entry = {"reason": reason, "cached_at": time.time(), "details": details or {}}
+        return bool(
+            self.redis_client.set(
+                self._negative_key(cache_key),
+                json.dumps(entry, default=str),
+                ex=ttl,
+                nx=not overwrite,
+            )
+        )
+
+    def _read_negative(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Entrée négative et son TTL restant (retry_after), ou None."""
+        key = self._negative_key(cache_key)
+        with self.redis_client.pipeline(transaction=False) as pipeline:
+            pipeline.get(key)
+            pipeline.ttl(key)
+            raw, ttl = pipeline.execute()
+        if not raw:
+            return None
+        try:
+            entry = json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+        entry["retry_after"] = max(int(ttl or 0), 1)
+        return entry
 
-        if current_count is None:
-            # Première requête dans la fenêtre
-            self.redis_client.setex(key, self.rate_limit_window, 1)
-            return True
+    def _read_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Lit une entrée du cache.
+        Retourne {"data", "cached_at", "stale"} ou None si absente/illisible.
+        """
+        raw = self.cache_client.get(cache_key)
+        if not raw:
+            return None
+        try:
+            if codec.is_encoded(raw):
+                meta = codec.peek_meta(raw)
+                envelope = dict(meta, listings=codec.decode(raw))
+            else:
+                # Ancien format: JSON texte
+                envelope = json.loads(raw)
+        except Exception as e:
+            # Corps corrompu (zstd, msgpack...): traité comme absent
+            logger.warning(f"Entrée de cache illisible: {cache_key} ({e})")
+            return None
+
+        if isinstance(envelope, list):
+            # Ancien format (liste brute sans date): considéré comme périmé
+            return {"data": envelope, "cached_at": None, "stale": True}
+
+        cached_at = envelope.get("cached_at") or 0
+        age = time.time() - cached_at
+        return {
+            "data": envelope.get("listings", []),
+            "cached_at": datetime.fromtimestamp(cached_at).isoformat(),
+            "stale": age >= self.cache_ttl,
+        }
 
-        current_count = int(current_count)
-        if current_count >= self.max_requests_per_window:
-            logger.warning(f"Rate limit dépassé pour IP: {user_ip}")
+    def _job_id_for(self, cache_key: str) -> str:
+        """
+        Id RQ déterministe pour une recherche normalisée.
+        Toutes les requêtes identiques partagent le même job et le même canal SSE.
+        """
+        return f"search_{cache_key.split(':', 1)[-1][:32]}"
+
+    def _enqueue_scraping_job(
+        self,
+        search_params: Dict[str, Any],
+        user_id: str,
+        job_id: str,
+        tier: str = DEFAULT_TIER,
+    ) -> Job:
+        """Ajoute un job de scraping à la queue RQ de son niveau, avec son échéance."""
+        search_params = dict(
+            search_params, **{DEADLINE_PARAM: time.time() + self.job_deadline}
+        )
+        queue = self.scraping_queues.get(tier, self.scraping_queues[DEFAULT_TIER])
+        return queue.enqueue(
+            "workers.scraping_workers.scrape_listings_job",
+            args=(search_params, user_id),
+            job_id=job_id,
+            job_timeout=self.job_timeout,
+            # retry=self.max_job_attempts,
+            retry_backoff=60,  # Retry après 1 minute
+            result_ttl=300,  # Garder le résultat 5 minutes
+            failure_ttl=60,  # Garder l'échec 1 minute
+        )
+
+    def _job_in_flight(self, job_id: str) -> Optional[bool]:
+        """
+        True si le job est en attente ou en cours, False s'il est terminé,
+        None s'il n'existe pas (encore) dans RQ.
+        Un job actif mais sans signe de vie depuis plus de job_timeout (worker
+        tué en cours de route) est supprimé et compte comme terminé.
+        """
+        try:
+            job = Job.fetch(
+                job_id, connection=self.rq_connection, serializer=self.rq_serializer
+            )
+        except NoSuchJobError:
+            return None
+        status = job.get_status(refresh=False)
+        if status not in (
+            JobStatus.QUEUED,
+            JobStatus.STARTED,
+            JobStatus.DEFERRED,
+            JobStatus.SCHEDULED,
+        ):
+            return False
+        if self._is_stale(job, status):
+            logger.warning(f"Job {job_id} sans signe de vie ({status}), supprimé")
+            try:
+                job.delete(remove_from_queue=True)
+            except redis.RedisError as e:
+                logger.warning(f"Suppression du job {job_id} impossible: {e}")
             return False
-
-        # Incrémenter le compteur
-        self.redis_client.incr(key)
         return True
 
+    def _is_stale(self, job: Job, status: JobStatus) -> bool:
+        """
+        Job zombie: démarré sans heartbeat récent, ou en attente depuis plus
+        longtemps que son échéance (il serait abandonné par le worker).
+        """
+        if status == JobStatus.STARTED:
+            seen = [t for t in (job.last_heartbeat, job.started_at) if t]
+            limit = (job.timeout or self.job_timeout) + self.job_stale_grace
+        elif status == JobStatus.QUEUED:
+            seen = [job.enqueued_at] if job.enqueued_at else []
+            limit = self.job_timeout + self.job_stale_grace
+        else:
+            return False
+        if not seen:
+            return False
+        age = (datetime.now(timezone.utc) - max(seen)).total_seconds()
+        return age > limit
+
+    def _claim_or_attach(
+        self,
+        search_params: Dict[str, Any],
+        user_id: str,
+        cache_key: str,
+        tier: str = DEFAULT_TIER,
+    ) -> Tuple[str, bool]:
+        """
+        Single-flight: un seul job par recherche normalisée.
+        Retourne (job_id, attached); attached=True si la requête se greffe
+        sur un job déjà en cours au lieu d'en créer un nouveau.
+        """
+        job_key = f"job:{cache_key}"
+        job_id = self._job_id_for(cache_key)
+
+        for _ in range(2):
+            # Le marqueur sert de verrou: seul le premier appelant enqueue
+            if self.redis_client.set(
+                job_key, job_id, nx=True, ex=self.job_timeout + 60
+            ):
+                if self._job_in_flight(job_id):
+                    # Marqueur perdu mais job toujours actif (et vivant): ne pas
+                    # l'enqueue deux fois
+                    return job_id, True
+                try:
+                    # L'id est réutilisé d'une exécution à l'autre: repartir d'un
+                    # historique SSE vide pour ne pas rejouer l'ancien run
+                    self.redis_client.delete(stream_key(job_id))
+                    self._enqueue_scraping_job(search_params, user_id, job_id, tier)
+                except Exception:
+                    self.redis_client.delete(job_key)
+                    raise
+                logger.info(f"Nouveau job créé: {job_id} pour {cache_key}")
+                return job_id, False
+
+            existing_id = self.redis_client.get(job_key)
+            # Un marqueur sans job RQ correspond à un enqueue en train de se faire
+            if existing_id and self._job_in_flight(existing_id) is not False:
+                logger.info(f"Requête rattachée au job en cours {existing_id}")
+                return existing_id, True
+
+            # Job terminé, échoué ou mort mais marqueur resté: on le libère et on réessaie
+            self.redis_client.delete(job_key)
+
+        raise RuntimeError(f"Impossible de réserver le job pour {cache_key}")
+
+    def _promote(self, job_id: str, tier: str) -> bool:
+        """
+        Job encore en attente dans une queue moins prioritaire que `tier`
+        (recherche identique lancée par un utilisateur gratuit ou un
+        rafraîchissement): déplacé en tête de la queue du niveau demandé.
+        """
+        target = self.scraping_queues[tier]
+        try:
+            for lower in TIERS[TIERS.index(tier) + 1 :]:
+                if self.rq_connection.lrem(self.scraping_queues[lower].key, 1, job_id):
+                    with self.rq_connection.pipeline() as pipeline:
+                        pipeline.hset(Job.key_for(job_id), "origin", target.name)
+                        target.push_job_id(job_id, pipeline=pipeline, at_front=True)
+                        pipeline.execute()
+                    logger.info(f"Job {job_id} promu de {lower} vers {tier}")
+                    return True
+        except redis.RedisError as e:
+            logger.warning(f"Promotion du job {job_id} impossible: {e}")
+        return False
+
+    def _refresh_in_background(
+        self, search_params: Dict[str, Any], user_id: str, cache_key: str
+    ) -> Optional[str]:
+        """
+        Lance un seul job de rafraîchissement pour une entrée périmée
+        (ou retourne celui déjà en cours), en priorité basse (prefetch):
+        l'utilisateur a déjà sa réponse.
+        """
+        try:
+            job_id, attached = self._claim_or_attach(
+                search_params, user_id, cache_key, tier="prefetch"
+            )
+            if not attached:
+                logger.info(f"Rafraîchissement lancé: {job_id} pour {cache_key}")
+            return job_id
+        except Exception as e:
+            logger.error(f"Erreur lors du rafraîchissement de {cache_key}: {e}")
+            return None
+
+    def _check_rate_limit(
+        self, user_ip: Optional[str], user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Vérifie le rate limiting par utilisateur et par IP (un seul appel
+        Redis, atomique: pas de dépassement sous les rafales de retries du LLM).
+        Retourne {"allowed", "remaining", "retry_after", "scope"}.
+        """
+        return self.rate_limiter.check(user_id=user_id, user_ip=user_ip)
+
+    async def _prevalidate_location(
+        self, search_params: Dict[str, Any], cache_key: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Lieu introuvable: inutile de lancer un job de scraping. Retourne la
+        réponse no_results (et l'écrit au cache négatif), sinon None.
+        La réponse Places est mise en cache: le worker la relira sans nouvel appel.
+        """
+        # Zone explicite (bbox/polygone): pas de lieu à résoudre
+        if (
+            not self.places_prevalidate
+            or search_params.get("bbox")
+            or search_params.get("polygon")
+        ):
+            return None
+        city = search_params.get("city", "")
+        location_near = search_params.get("location_near")
+        try:
+            places = await self.google_places.search_async(
+                city, location_near, timeout=self.places_prevalidate_timeout
+            )
+        except PlacesError as e:
+            # Google Places indisponible: le worker réessaiera
+            logger.warning(f"Pré-validation du lieu impossible: {e}")
+            return None
+        if places.located:
+            return None
+
+        logger.info(f"Lieu introuvable: {places.query}")
+        details = {"city": city, "location_near": location_near}
+        self._write_negative(cache_key, "place_not_found", details)
+        return {
+            "status": "no_results",
+            "reason": "place_not_found",
+            "message": NEGATIVE_MESSAGES["place_not_found"],
+            "details": details,
+            "retry_after": self.negative_ttls["place_not_found"],
+        }
+
     async def search_listings(
-        self, search_params: Dict[str, Any], user_ip: str, user_id: str
+        self,
+        search_params: Dict[str, Any],
+        user_ip: str,
+        user_id: str,
+        tier: str = DEFAULT_TIER,
     ) -> Dict[str, Any]:
         """
         Recherche principale avec cache et queue.
         NON-BLOQUANT pour FastAPI - retourne immédiatement.
+        `tier` choisit la queue du job (high pour les utilisateurs premium).
         """
 
         # 1. Vérifier le rate limiting
-        # if not self._check_rate_limit(user_ip):
-        #     return {
-        #         "status": "rate_limited",
-        #         "message": "Trop de requêtes. Réessayez dans 1 minute.",
-        #         "retry_after": 60,
-        #     }
-
-        # 2. Vérifier le cache Redis
+        limit = self._check_rate_limit(user_ip, user_id)
+        if not limit["allowed"]:
+            return {
+                "status": "rate_limited",
+                "message": f"Trop de requêtes. Réessayez dans {limit['retry_after']} secondes.",
+                "retry_after": limit["retry_after"],
+            }
+
+        # 2. Vérifier le cache Redis (read-through)
         cache_key = self._generate_cache_key(search_params)
-        logger.info(f"apres cache hit")
-        # cached_result = self.redis_client.get(cache_key)
-
-        # if cached_result:
-        #     logger.info(f"Cache hit pour {cache_key}")
-        #     return {
-        #         "status": "cached",
-        #         "data": json.loads(cached_result),
-        #         "cached_at": datetime.now().isoformat(),
-        #     }
-
-        # # 3. Vérifier si un job est déjà en cours
-        job_key = f"job:{cache_key}"
-        # existing_job_id = self.redis_client.get(job_key)
-
-        # if existing_job_id:
-            # Job en cours, retourner le statut
-            # try:
-            #     job = Job.fetch(existing_job_id, connection=self.redis_client)
-            #     if job.is_finished:
-            #         # Job terminé, récupérer le résultat
-            #         result = job.result
-            #         if result:
-            #             # Mettre en cache et nettoyer
-            #             self.redis_client.setex(
-            #                 cache_key, self.cache_ttl, json.dumps(result)
-            #             )
-            #             self.redis_client.delete(job_key)
-            #             return {"status": "completed", "data": result}
-            #         else:
-            #             # Job échoué, nettoyer et relancer
-            #             self.redis_client.delete(job_key)
-            #     elif job.is_failed:
-            #         # Job échoué, nettoyer et relancer
-            #         self.redis_client.delete(job_key)
-            #     else:
-            #         # Job en cours
-            #         return {
-            #             "status": "processing",
-            #             "job_id": existing_job_id,
-            #             "estimated_wait": "10-30 secondes",
-            #         }
-            # except Exception as e:
-            #     logger.error(f"Erreur lors de la récupération du job: {e}")
-            #     self.redis_client.delete(job_key)
-
-        # 4. Créer un nouveau job de scraping
+        cached = self._read_cache(cache_key)
+
+        if cached:
+            result = {
+                "status": "cached",
+                "data": cached["data"],
+                "cached_at": cached["cached_at"],
+                "stale": cached["stale"],
+            }
+            if cached["stale"]:
+                # Servir l'entrée périmée tout de suite, rafraîchir en arrière-plan
+                logger.info(f"Cache périmé pour {cache_key}, rafraîchissement")
+                result["refresh_job_id"] = self._refresh_in_background(
+                    search_params, user_id, cache_key
+                )
+            else:
+                logger.info(f"Cache hit pour {cache_key}")
+            return result
+
+        # 3. Recherche identique récemment vide ou en échec: réponse immédiate
+        negative = self._read_negative(cache_key)
+        if negative:
+            logger.info(f"Cache négatif ({negative['reason']}) pour {cache_key}")
+            return {
+                "status": "no_results",
+                "reason": negative["reason"],
+                "message": NEGATIVE_MESSAGES.get(
+                    negative["reason"], NEGATIVE_MESSAGES["scrape_failed"]
+                ),
+                "details": negative.get("details", {}),
+                "retry_after": negative["retry_after"],
+            }
+
+        # 4. Lieu introuvable: réponse immédiate, sans job
+        not_found = await self._prevalidate_location(search_params, cache_key)
+        if not_found:
+            return not_found
+
+        # 5. Créer le job de scraping, ou se rattacher à celui déjà en cours
         try:
-            # Ajouter le job à la queue RQ
-            job = self.scraping_queue.enqueue(
-                "workers.scraping_workers.scrape_listings_job",
-                args=(search_params, user_id),
-                job_timeout=self.job_timeout,
-                # retry=self.max_job_attempts,
-                retry_backoff=60,  # Retry après 1 minute
-                result_ttl=300,  # Garder le résultat 5 minutes
-                failure_ttl=60,  # Garder l'échec 1 minute
+            job_id, attached = self._claim_or_attach(
+                search_params, user_id, cache_key, tier
             )
 
-            # Marquer qu'un job est en cours pour cette recherche
-            self.redis_client.setex(job_key, self.job_timeout + 60, job.id)
-
-            logger.info(f"Nouveau job créé: {job.id} pour {cache_key}")
+            if attached:
+                if tier != TIERS[-1]:
+                    self._promote(job_id, tier)
+                return {
+                    "status": "processing",
+                    "job_id": job_id,
+                    "estimated_wait": "10-30 secondes",
+                    "message": "Une recherche identique est déjà en cours.",
+                }
 
             return {
                 "status": "queued",
-                "job_id": job.id,
+                "job_id": job_id,
                 "estimated_wait": "10-30 secondes",
                 "message": "Recherche en cours. Utilisez le job_id pour vérifier le statut.",
             }
@@ -189,7 +541,9 @@ class SearchService:
         Permet au frontend de poller le statut.
         """
         try:
-            job = Job.fetch(job_id, connection=self.redis_client)
+            job = Job.fetch(
+                job_id, connection=self.rq_connection, serializer=self.rq_serializer
+            )
 
             if job.is_finished:
                 result = job.result
@@ -223,19 +577,13 @@ class SearchService:
             logger.error(f"Erreur lors de la vérification du job {job_id}: {e}")
             return {"status": "error", "error": str(e)}
 
-    def cleanup_expired_jobs(self):
+    def cleanup_expired_jobs(self) -> Dict[str, Any]:
         """
-        Nettoie les jobs expirés et les clés de cache.
-        Maintenance pour éviter l'accumulation de données.
+        Nettoie les marqueurs de job orphelins et les clés sans TTL.
+        Maintenance incrémentale (SCAN), voir services/redis_janitor.py.
         """
         try:
-            # Nettoyer les clés de job expirées
-            job_keys = self.redis_client.keys("job:*")
-            for key in job_keys:
-                if not self.redis_client.exists(key):
-                    self.redis_client.delete(key)
-
-            logger.info(f"Nettoyage terminé. {len(job_keys)} clés vérifiées.")
-
+            return RedisJanitor(self.redis_client, self.rq_connection).run_once()
         except Exception as e:
             logger.error(f"Erreur lors du nettoyage: {e}")
+            return {"error": str(e)}
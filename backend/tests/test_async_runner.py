@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+
+import pytest
+import redis
+from rq.job import Job, JobStatus
+
+fakeredis = pytest.importorskip("fakeredis")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workers.async_runner import AsyncJobRunner
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    connection = fakeredis.FakeRedis()
+    monkeypatch.setattr(redis, "from_url", lambda *args, **kwargs: connection)
+    runner = AsyncJobRunner(queue_names=["scraping:default"], job_timeout=200)
+    runner.dequeue_timeout = 1
+    return runner
+
+
+def _enqueue(runner) -> Job:
+    return runner.queues[0].enqueue("os.getpid", job_id="search_test", job_timeout=200)
+
+
+def _registry(runner):
+    return runner.queues[0].started_job_registry
+
+
+def test_dequeued_job_is_registered_as_started(runner):
+    _enqueue(runner)
+    job, _ = runner._dequeue()
+    assert job.get_status() == JobStatus.STARTED
+    assert job.last_heartbeat is not None
+    assert job.id in _registry(runner).get_job_ids()
+
+
+def test_finished_job_leaves_started_registry(runner):
+    _enqueue(runner)
+    job, _ = runner._dequeue()
+    runner._mark_finished(job, {"status": "success"})
+    assert job.id not in _registry(runner).get_job_ids()
+    assert Job.fetch(job.id, connection=runner.connection).get_status() == JobStatus.FINISHED
+
+
+def test_failed_job_leaves_started_registry(runner):
+    _enqueue(runner)
+    job, _ = runner._dequeue()
+    runner._mark_failed(job, "boom")
+    assert job.id not in _registry(runner).get_job_ids()
+    assert job.id in runner.queues[0].failed_job_registry.get_job_ids()
+
+
+def test_abandoned_job_is_failed_by_registry_cleanup(runner):
+    _enqueue(runner)
+    job, _ = runner._dequeue()
+    # Processus mort: plus de heartbeat au-delà du TTL
+    _registry(runner).cleanup(timestamp=time.time() + runner.heartbeat_ttl + 1)
+    assert Job.fetch(job.id, connection=runner.connection).get_status() == JobStatus.FAILED
+
+
+def _expiry(runner) -> float:
+    registry = _registry(runner)
+    return registry.connection.zrange(registry.key, 0, 0, withscores=True)[0][1]
+
+
+def test_heartbeat_keeps_running_job_alive(runner):
+    _enqueue(runner)
+    runner._dequeue()
+    first = _expiry(runner)
+    time.sleep(1.1)
+    runner._send_heartbeats()
+    assert _expiry(runner) > first
@@ -0,0 +1,59 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.browser_pool import BrowserPool, _PooledBrowser
+
+
+class _Crawler:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def _pool():
+    pool = BrowserPool()
+    pool.max_rss_mb = 0
+
+    async def launch():
+        return _PooledBrowser(_Crawler())
+
+    pool._launch = launch
+    return pool
+
+
+async def _fail_inside(pool, error):
+    with pytest.raises(type(error)):
+        async with pool.checkout() as crawler:
+            raise error
+    return crawler
+
+
+def test_page_error_keeps_browser():
+    async def run():
+        pool = _pool()
+        for error in (asyncio.TimeoutError(), ValueError("parse")):
+            crawler = await _fail_inside(pool, error)
+            assert not crawler.closed
+        assert len(pool._browsers) == 1 and pool.recycles == 0
+
+    asyncio.run(run())
+
+
+def test_closed_browser_is_retired():
+    async def run():
+        pool = _pool()
+        error = RuntimeError("Page.goto: Target page, context or browser has been closed")
+        crawler = await _fail_inside(pool, error)
+        assert crawler.closed
+        assert len(pool._browsers) == 0 and pool.recycles == 1
+
+    asyncio.run(run())
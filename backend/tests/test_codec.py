@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import pickle
+from datetime import datetime
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import codec
+
+LISTINGS = [
+    {
+        "id": str(1000 + i),
+        "title": "Grand 4 1/2 rénové",
+        "price": "1 450 $",
+        "bedrooms": 2,
+        "images": ["https://scontent.xx.fbcdn.net/a.jpg"] * 3,
+        "description": "Chauffé, éclairé. " * 10,
+    }
+    for i in range(50)
+]
+
+
+def test_roundtrip_every_format_and_compression():
+    formats = [codec.FORMAT_JSON] + ([codec.FORMAT_MSGPACK] if codec.msgpack else [])
+    compressions = [codec.COMPRESSION_NONE, codec.COMPRESSION_ZLIB]
+    if codec.zstandard:
+        compressions.append(codec.COMPRESSION_ZSTD)
+    for fmt in formats:
+        for compression in compressions:
+            data = codec.encode(LISTINGS, fmt=fmt, compression=compression)
+            assert codec.is_encoded(data)
+            assert codec.decode(data) == LISTINGS
+
+
+def test_smaller_than_json():
+    assert len(codec.encode(LISTINGS)) < len(json.dumps(LISTINGS).encode()) / 3
+
+
+def test_meta_is_readable_without_body():
+    data = codec.encode(LISTINGS, meta={"cached_at": 1700000000.5, "partial": True})
+    assert codec.peek_meta(data) == {"cached_at": 1700000000.5, "partial": True}
+    assert codec.peek_meta(codec.encode([])) == {}
+
+
+def test_small_values_are_not_compressed():
+    data = codec.encode({"a": 1})
+    assert data[3] >> 4 == codec.COMPRESSION_NONE
+
+
+def test_legacy_values_still_decode():
+    assert codec.decode(json.dumps(LISTINGS)) == LISTINGS
+    assert codec.decode(json.dumps(LISTINGS).encode()) == LISTINGS
+    assert codec.decode(pickle.dumps({"status": "success"})) == {"status": "success"}
+
+
+def test_rq_serializer_falls_back_to_pickle():
+    payload = {"ended_at": datetime(2024, 1, 1), "listings": LISTINGS}
+    data = codec.CodecSerializer.dumps(payload)
+    assert data[3] & 0x0F == codec.FORMAT_PICKLE
+    assert codec.CodecSerializer.loads(data) == payload
+    try:
+        codec.encode(payload)
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("TypeError attendu sans allow_pickle")
+
+
+@pytest.mark.parametrize("fmt", ["json", "msgpack"])
+def test_rq_serializer_keeps_tuples_and_int_keys(monkeypatch, fmt):
+    if fmt == "msgpack" and codec.msgpack is None:
+        pytest.skip("msgpack absent")
+    monkeypatch.setattr(codec, "FORMAT", codec._FORMATS[fmt])
+    payload = ("workers.scrape", None, ({"city": "Montreal"}, "user"), {1: (2, 3)})
+    data = codec.CodecSerializer.dumps(payload)
+    assert data[3] & 0x0F == codec.FORMAT_PICKLE
+    assert codec.CodecSerializer.loads(data) == payload
+    # Un résultat représentable tel quel garde le format compact
+    result = {"status": "success", "listings": LISTINGS, "coordinates": {"lat": 45.5}}
+    assert codec.CodecSerializer.dumps(result)[3] & 0x0F == codec._FORMATS[fmt]
+
+
+def test_unknown_version_is_rejected():
+    data = bytearray(codec.encode(LISTINGS))
+    data[2] = 99
+    try:
+        codec.decode(bytes(data))
+    except codec.CodecError:
+        pass
+    else:
+        raise AssertionError("CodecError attendu")
@@ -0,0 +1,110 @@
+import os
+import sys
+import asyncio
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.graph import build_context_window, split_turns
+
+SYSTEM = "You are a helpful assistant."
+
+
+def _tool_turn(n, payload_size=2000):
+    """Un tour complet: question, appel d'outil, résultat, réponse."""
+    call_id = f"call_{n}"
+    listings = [{"id": str(i), "title": "x" * 50} for i in range(payload_size // 60)]
+    return [
+        HumanMessage(content=f"question {n}"),
+        AIMessage(
+            content="",
+            tool_calls=[{"name": "search", "args": {"city": "Montreal"}, "id": call_id}],
+        ),
+        ToolMessage(
+            content=json.dumps({"status": "success", "listings": listings}),
+            tool_call_id=call_id,
+        ),
+        AIMessage(content=f"réponse {n}"),
+    ]
+
+
+def _history(turns):
+    return [message for n in range(turns) for message in _tool_turn(n)]
+
+
+def test_split_turns_starts_on_human_messages():
+    assert split_turns(_history(3)) == [0, 4, 8]
+
+
+def test_turns_are_never_split():
+    for max_tokens in range(60, 600, 20):
+        window = build_context_window(_history(6), SYSTEM, max_tokens=max_tokens)[1:]
+        assert isinstance(window[0], HumanMessage)
+        for i, message in enumerate(window):
+            if isinstance(message, AIMessage) and message.tool_calls:
+                # L'appel d'outil garde toujours son résultat juste après
+                assert isinstance(window[i + 1], ToolMessage)
+                assert window[i + 1].tool_call_id == message.tool_calls[0]["id"]
+
+
+def test_latest_human_message_is_kept_over_budget():
+    history = _history(2) + [HumanMessage(content="très longue question " * 500)]
+    window = build_context_window(history, SYSTEM, max_tokens=50)
+    assert window[-1] is history[-1]
+    assert isinstance(window[0], SystemMessage)
+
+
+def test_summary_follows_system_prompt():
+    window = build_context_window(_history(1), SYSTEM, summary="budget 1500$")
+    assert window[0].content == SYSTEM
+    assert isinstance(window[1], SystemMessage) and "budget 1500$" in window[1].content
+    assert isinstance(window[2], HumanMessage)
+
+
+def test_older_tool_output_is_truncated():
+    history = _history(2)
+    window = build_context_window(history, SYSTEM, max_tokens=100000, tool_max_chars=100)
+    tools = [m for m in window if isinstance(m, ToolMessage)]
+    assert len(tools[0].content) <= 101
+    # Le dernier tour garde son résultat complet
+    assert tools[-1].content == history[-2].content
+
+
+class _LLM:
+    def __init__(self, reply=None):
+        self.reply = reply
+        self.inputs = []
+
+    async def ainvoke(self, messages, config=None):
+        self.inputs.append(messages)
+        if self.reply is None:
+            raise RuntimeError("quota OpenAI")
+        return AIMessage(content=self.reply)
+
+
+def _chat(summary_reply):
+    from agents.graph import HISTORY_KEEP_TURNS, HISTORY_SUMMARY_BATCH, IanGraph
+    from schemas.graph import GraphState
+
+    graph = IanGraph.__new__(IanGraph)
+    graph.llm = _LLM("ok")
+    graph.summary_llm = _LLM(summary_reply)
+    history = [
+        message
+        for n in range(HISTORY_KEEP_TURNS + HISTORY_SUMMARY_BATCH)
+        for message in (HumanMessage(content=f"q{n}"), AIMessage(content=f"r{n}"))
+    ] + [HumanMessage(content="dernière question")]
+    state = GraphState(messages=history, session_id="s", summary="ancien")
+    return asyncio.run(graph._chat(state))
+
+
+def test_failed_summary_keeps_turns():
+    result = _chat(summary_reply=None)
+    assert result["summary"] == "ancien" and result["summarized_count"] == 0
+
+
+def test_summary_advances_count():
+    result = _chat(summary_reply="nouveau")
+    assert result["summary"] == "nouveau" and result["summarized_count"] > 0
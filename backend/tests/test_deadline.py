@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.deadline import DEADLINE_PARAM, Deadline, DeadlineExceeded
+
+
+def test_from_params_reads_enqueue_deadline():
+    expires_at = time.time() + 42
+    deadline = Deadline.from_params({"city": "montreal", DEADLINE_PARAM: expires_at})
+    assert deadline.expires_at == expires_at
+    assert 40 < deadline.remaining() <= 42
+
+
+def test_from_params_default():
+    deadline = Deadline.from_params({}, default_seconds=5)
+    assert 4 < deadline.remaining() <= 5
+
+
+def test_timeout_is_capped_and_reserved():
+    deadline = Deadline.after(30)
+    assert deadline.timeout(cap=10) == 10
+    assert 19 < deadline.timeout(reserve=10) <= 20
+    assert Deadline.after(-1).timeout(cap=10) == 0
+
+
+def test_sleep_refuses_to_overrun():
+    deadline = Deadline.after(0.5)
+    try:
+        asyncio.run(deadline.sleep(2, "retry"))
+    except DeadlineExceeded as e:
+        assert str(e) == "retry"
+    else:
+        raise AssertionError("DeadlineExceeded attendu")
+
+
+def test_cut_marks_partial():
+    deadline = Deadline.after(10)
+    assert not deadline.partial
+    deadline.cut("enrichment")
+    deadline.cut("enrichment")
+    assert deadline.partial and deadline.cut_stages == ["enrichment"]
@@ -0,0 +1,50 @@
+import os
+import sys
+import asyncio
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.geo_tiling import coverage_ratio, haversine_m, plan_tiles
+from utils.request_budget import RequestBudget
+
+MONTREAL = (45.410, -73.975, 45.705, -73.475)
+
+
+def test_small_area_is_one_tile():
+    tiles = plan_tiles(bbox=(45.51, -73.60, 45.54, -73.56), radius_m=4000)
+    assert len(tiles) == 1
+
+
+def test_bbox_fully_covered():
+    tiles = plan_tiles(bbox=MONTREAL, radius_m=4000, overlap=0.1)
+    assert len(tiles) > 1
+    assert coverage_ratio(tiles, bbox=MONTREAL, samples=40) == 1.0
+
+
+def test_polygon_covered_with_fewer_tiles_than_its_bbox():
+    triangle = [(45.41, -73.975), (45.705, -73.975), (45.41, -73.475)]
+    tiles = plan_tiles(polygon=triangle, radius_m=4000)
+    assert coverage_ratio(tiles, polygon=triangle, samples=40) == 1.0
+    assert len(tiles) < len(plan_tiles(bbox=MONTREAL, radius_m=4000))
+
+
+def test_max_tiles_keeps_center():
+    tiles = plan_tiles(bbox=MONTREAL, radius_m=4000, max_tiles=5)
+    assert len(tiles) == 5
+    center = ((MONTREAL[0] + MONTREAL[2]) / 2, (MONTREAL[1] + MONTREAL[3]) / 2)
+    assert min(haversine_m(t["lat"], t["lon"], *center) for t in tiles) < 4000
+
+
+def test_request_budget_rate_and_cap():
+    budget = RequestBudget(rate=20, burst=2, max_requests=5)
+
+    async def run():
+        start = time.monotonic()
+        results = await asyncio.gather(*(budget.acquire() for _ in range(6)))
+        return results, time.monotonic() - start
+
+    results, elapsed = asyncio.run(run())
+    assert results.count(True) == 5 and results.count(False) == 1
+    # 2 jetons immédiats puis 3 à 20/s
+    assert elapsed >= 0.14
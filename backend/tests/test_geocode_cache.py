@@ -0,0 +1,30 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.geocode_cache import GeocodeCache, normalize_query
+
+
+def test_bare_city_resolves_offline():
+    cache = GeocodeCache()
+    result = cache.get("  Montréal, QC ", [])
+    place = result["places"][0]
+    assert place["displayName"]["text"] == "Montreal"
+    assert round(place["location"]["latitude"], 2) == 45.5
+    assert cache.stats()["offline_hits"] == 1
+
+
+def test_city_with_location_near_needs_lookup():
+    cache = GeocodeCache()
+    cache._redis = None
+    os.environ.pop("REDIS_URL", None)
+    assert cache.get("Montreal", ["metro Jean-Talon"]) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_normalized_query_ignores_case_accents_and_order():
+    assert normalize_query("Montréal", ["Métro Berri", "parc"]) == normalize_query(
+        "montreal ", ["PARC", "metro  berri"]
+    )
+    assert normalize_query("Montreal", ["a"]) != normalize_query("Montreal", ["b"])
@@ -0,0 +1,43 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Chaque module est importé en premier dans un interpréteur neuf: un cycle
+# d'import n'apparaît que selon l'ordre de chargement
+@pytest.mark.parametrize(
+    "module",
+    [
+        "workers.scraping_workers",
+        "workers.async_runner",
+        "agents.tools",
+        "agents.tools.googlePlaces",
+        "agents.tools.onePage",
+        "services.search_service",
+    ],
+)
+def test_module_imports_first(module):
+    result = subprocess.run(
+        [sys.executable, "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_worker_entrypoint_imports():
+    # CMD de Dockerfile.worker
+    result = subprocess.run(
+        [sys.executable, "-c", "from workers.scraping_workers import start_worker"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
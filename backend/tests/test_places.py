@@ -0,0 +1,87 @@
+import os
+import sys
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schemas.places import PlacesResponse, field_mask
+from agents.tools.googlePlaces import GooglePlaces, PlacesError
+
+RAW = {
+    "places": [
+        {
+            "displayName": {"text": "Gare Centrale", "languageCode": "fr"},
+            "location": {"latitude": 45.5, "longitude": -73.56},
+        },
+        {"displayName": {"text": "Sans coordonnées"}},
+    ]
+}
+
+
+def test_response_parses_field_mask_subset():
+    response = PlacesResponse.from_api(RAW, query="gare in montreal")
+    assert response.places[0].display_name == "Gare Centrale"
+    assert response.places[0].formatted_address is None
+    assert [p.display_name for p in response.located] == ["Gare Centrale"]
+    assert response.to_api()["places"][0] == {
+        "displayName": {"text": "Gare Centrale"},
+        "location": {"latitude": 45.5, "longitude": -73.56},
+    }
+
+
+def test_field_mask():
+    assert field_mask() == "places.displayName,places.location"
+    assert field_mask(["place_id"]) == "places.id"
+    try:
+        field_mask(["rating"])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("ValueError attendu")
+
+
+def _client(delay=0.05, result=RAW):
+    client = GooglePlaces()
+    calls = []
+
+    async def fetch(city, location_near, fields, cache):
+        calls.append(city)
+        await asyncio.sleep(delay)
+        return result
+
+    client._fetch = fetch
+    return client, calls
+
+
+def test_concurrent_identical_queries_are_coalesced():
+    client, calls = _client()
+
+    async def run():
+        return await asyncio.gather(
+            client.search_async("Laval", ["Gare"]),
+            client.search_async("laval", ["gare "]),
+            client.search_async("Laval", ["Gare"]),
+        )
+
+    results = asyncio.run(run())
+    assert calls == ["Laval"]
+    assert client.coalesced == 2
+    assert all(r.located for r in results)
+    assert client.stats()["inflight"] == 0
+
+
+def test_caller_timeout_does_not_cancel_shared_call():
+    client, calls = _client(delay=0.2)
+
+    async def run():
+        slow = asyncio.ensure_future(client.search_async("Laval", ["Gare"], timeout=1))
+        try:
+            await client.search_async("Laval", ["Gare"], timeout=0.01)
+        except PlacesError:
+            pass
+        else:
+            raise AssertionError("PlacesError attendu")
+        return await slow
+
+    assert asyncio.run(run()).located
+    assert len(calls) == 1
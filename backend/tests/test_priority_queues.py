@@ -0,0 +1,80 @@
+import os
+import sys
+from collections import Counter
+
+import pytest
+from rq import Queue
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.priority_queues import (
+    TierTracker,
+    WeightedQueueOrder,
+    queue_name,
+    scraping_queue_names,
+    tier_for_user,
+    tier_of_queue,
+    wait_summary,
+)
+
+QUEUES = scraping_queue_names() + ["fb_session"]
+
+
+def test_tier_mapping():
+    assert queue_name("high") == "scraping:high"
+    assert queue_name("gold") == "scraping:default"
+    assert tier_of_queue("scraping") == "default"
+    assert tier_of_queue("scraping:prefetch") == "prefetch"
+    assert tier_of_queue("fb_session") is None
+    assert tier_for_user(True) == "high" and tier_for_user(None) == "default"
+
+
+def test_weighted_heads_follow_weights():
+    order = WeightedQueueOrder({"high": 6, "default": 3, "prefetch": 1})
+    heads = Counter(order.order(QUEUES)[0] for _ in range(100))
+    assert heads == {"scraping:high": 60, "scraping:default": 30, "scraping:prefetch": 10}
+
+
+def test_order_is_work_conserving():
+    order = WeightedQueueOrder({"high": 6, "default": 3, "prefetch": 1})
+    for _ in range(10):
+        names = order.order(QUEUES)
+        assert sorted(names) == sorted(QUEUES)
+        assert names[-1] == "fb_session"
+        # la queue legacy suit scraping:default
+        assert names.index("scraping") == names.index("scraping:default") + 1
+
+
+def test_saturated_tier_is_skipped():
+    order = WeightedQueueOrder({"high": 6, "default": 3, "prefetch": 1})
+    for _ in range(10):
+        names = order.order(QUEUES, blocked={"prefetch"})
+        assert "scraping:prefetch" not in names and "scraping:high" in names
+
+
+def test_wait_summary():
+    summary = wait_summary([str(ms) for ms in range(0, 20000, 1000)])
+    assert summary["count"] == 20
+    assert summary["p50"] == 10.0 and summary["p95"] == 18.0 and summary["max"] == 19.0
+    assert wait_summary([])["count"] == 0
+
+
+def test_rq_worker_dequeues_by_weight():
+    fakeredis = pytest.importorskip("fakeredis")
+    from workers.scraping_workers import ScrapingRQWorker
+
+    connection = fakeredis.FakeRedis()
+    queues = [Queue(name, connection=connection) for name in scraping_queue_names()]
+    for queue in queues:
+        for _ in range(10):
+            queue.enqueue("os.getpid")
+    worker = ScrapingRQWorker(queues, connection=connection)
+    worker.queue_order = WeightedQueueOrder({"high": 6, "default": 3, "prefetch": 1})
+    worker.tier_tracker = TierTracker(connection, caps={})
+    worker.priority_poll = 1
+
+    # Boucle de dequeue de RQ: un seul tour de round-robin par job servi
+    served = Counter(
+        tier_of_queue(worker.dequeue_job_and_maintain_ttl(1)[1].name) for _ in range(10)
+    )
+    assert served == {"high": 6, "default": 3, "prefetch": 1}
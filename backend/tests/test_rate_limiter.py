@@ -0,0 +1,118 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import redis
+
+from services.rate_limiter import RateLimiter
+
+# Aucun serveur n'écoute sur ce port
+UNREACHABLE = "redis://127.0.0.1:1/0"
+
+
+def _limiter(mode):
+    os.environ["RATE_LIMIT_MODE"] = mode
+    os.environ["RATE_LIMIT_WINDOW"] = "60"
+    os.environ["RATE_LIMIT_USER_REQUESTS"] = "30"
+    os.environ["RATE_LIMIT_IP_REQUESTS"] = "120"
+    return RateLimiter(redis.from_url(UNREACHABLE, socket_connect_timeout=0.2))
+
+
+def test_script_arguments_per_mode():
+    sliding = _limiter("sliding_window")
+    args = sliding._args(["user", "ip"])
+    assert args[0] == 60000 and args[2:] == [30, 120]
+    assert args[1] != sliding._args(["user"])[1]  # membre unique par requête
+
+    bucket = _limiter("token_bucket")
+    assert bucket._args(["user", "ip"]) == [1, 0.5, 30, 2.0, 120]
+
+
+def test_keys_are_scoped_by_mode():
+    assert _limiter("token_bucket").key_for("ip", "1.2.3.4") == (
+        "rate_limit:token_bucket:ip:1.2.3.4"
+    )
+    assert _limiter("inconnu").mode == "sliding_window"
+
+
+def test_no_identity_is_not_limited():
+    result = _limiter("sliding_window").check(user_id=None, user_ip="")
+    assert result["allowed"] and result["retry_after"] == 0
+
+
+def test_redis_down_fails_open():
+    limiter = _limiter("token_bucket")
+    result = limiter.check(user_id="session-1", user_ip="1.2.3.4")
+    assert result["allowed"]
+    assert limiter.stats()["errors"] == 1
+
+
+@pytest.fixture
+def server():
+    # Scripts Lua exécutés pour de vrai: fakeredis avec lupa
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeServer()
+
+
+def _live_limiter(server, monkeypatch, mode, user=5, ip=100, window=60):
+    monkeypatch.setenv("RATE_LIMIT_MODE", mode)
+    monkeypatch.setenv("RATE_LIMIT_WINDOW", str(window))
+    monkeypatch.setenv("RATE_LIMIT_USER_REQUESTS", str(user))
+    monkeypatch.setenv("RATE_LIMIT_IP_REQUESTS", str(ip))
+    import fakeredis
+
+    return RateLimiter(fakeredis.FakeRedis(server=server, decode_responses=True))
+
+
+@pytest.mark.parametrize("mode", RateLimiter.MODES)
+def test_burst_never_overshoots(server, monkeypatch, mode):
+    limiter = _live_limiter(server, monkeypatch, mode, user=5)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(
+            pool.map(
+                lambda _: limiter.check(user_id="session-1", user_ip="1.2.3.4"),
+                range(20),
+            )
+        )
+    assert sum(r["allowed"] for r in results) == 5
+    assert limiter.stats()["limited"] == 15 and limiter.stats()["errors"] == 0
+
+
+@pytest.mark.parametrize("mode", RateLimiter.MODES)
+def test_ip_block_costs_no_user_quota(server, monkeypatch, mode):
+    limiter = _live_limiter(server, monkeypatch, mode, user=5, ip=2)
+    assert limiter.check(user_id="u", user_ip="1.1.1.1")["allowed"]
+    assert limiter.check(user_id="u", user_ip="1.1.1.1")["allowed"]
+    blocked = limiter.check(user_id="u", user_ip="1.1.1.1")
+    assert not blocked["allowed"] and blocked["scope"] == "ip"
+
+    # Les 3 requêtes restantes de l'utilisateur passent depuis une autre IP
+    allowed = [
+        limiter.check(user_id="u", user_ip=f"2.2.2.{i}")["allowed"] for i in range(4)
+    ]
+    assert allowed == [True, True, True, False]
+
+
+def test_sliding_window_retry_after(server, monkeypatch):
+    limiter = _live_limiter(server, monkeypatch, "sliding_window", user=2, window=60)
+    limiter.check(user_id="u")
+    limiter.check(user_id="u")
+    result = limiter.check(user_id="u")
+    # Libéré quand la plus ancienne requête sort de la fenêtre
+    assert not result["allowed"] and result["scope"] == "user"
+    assert 59 <= result["retry_after"] <= 60
+
+
+def test_token_bucket_retry_after(server, monkeypatch):
+    limiter = _live_limiter(server, monkeypatch, "token_bucket", user=2, window=60)
+    limiter.check(user_id="u")
+    limiter.check(user_id="u")
+    result = limiter.check(user_id="u")
+    # 2 jetons par 60 s: un jeton toutes les 30 s
+    assert not result["allowed"] and result["scope"] == "user"
+    assert 29 <= result["retry_after"] <= 30
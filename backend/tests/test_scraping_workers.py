@@ -0,0 +1,172 @@
+import os
+import sys
+import asyncio
+import threading
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.tools import searchFacebook
+from agents.tools.googlePlaces import PlacesError
+from agents.tools.searchFacebook import SearchFacebook
+from schemas.places import PlacesResponse
+from workers.scraping_workers import ScrapeError, ScrapingWorker
+
+PLACE = {
+    "displayName": {"text": "Montréal"},
+    "location": {"latitude": 45.5, "longitude": -73.6},
+}
+OTHER_PLACE = {
+    "displayName": {"text": "Laval"},
+    "location": {"latitude": 45.6, "longitude": -73.7},
+}
+PARAMS = {"city": "Montreal", "min_bedrooms": 1, "max_bedrooms": 2}
+
+
+class _Publisher:
+    def __init__(self):
+        self.events = []
+
+    def publish(self, job_id, event, payload):
+        self.events.append(event)
+
+
+class _SearchService:
+    def __init__(self):
+        self.negatives = {}
+        self.cached = None
+
+    def _generate_cache_key(self, params):
+        return "search:key"
+
+    def _write_cache(self, cache_key, listings, partial=False):
+        self.cached = listings
+
+    def _write_negative(self, cache_key, reason, details=None, overwrite=True):
+        if overwrite or cache_key not in self.negatives:
+            self.negatives[cache_key] = reason
+
+
+class _Redis:
+    def delete(self, *keys):
+        pass
+
+
+class _Places:
+    def __init__(self, places):
+        self.places = places
+
+    async def search_async(self, city, location_near=None, timeout=None):
+        if self.places is None:
+            raise PlacesError("quota dépassé")
+        return PlacesResponse.from_api({"places": self.places}, query=city)
+
+
+class _Scraper:
+    def __init__(self, listings):
+        self.listings = listings
+
+    async def execute_async(self, *args, **kwargs):
+        if isinstance(self.listings, Exception):
+            raise self.listings
+        return self.listings
+
+
+def _worker(places=(PLACE,), listings=()):
+    worker = ScrapingWorker.__new__(ScrapingWorker)
+    worker.redis_client = _Redis()
+    worker.search_service = _SearchService()
+    worker._event_publisher = _Publisher()
+    worker.google_places = _Places(None if places is None else list(places))
+    worker.facebook_scraper = _Scraper(
+        listings if isinstance(listings, Exception) else list(listings)
+    )
+    worker.check_user_session = lambda user_id, deadline=None: {}
+    worker.jobs_processed = 0
+    worker.jobs_failed = 0
+    worker._loop_lock = threading.Lock()
+    return worker
+
+
+def _run(worker):
+    async def run():
+        # Google Places passe par run_async: la loop du test sert de loop du worker
+        worker.attach_loop(asyncio.get_running_loop())
+        return await worker.scrape_listings_async(dict(PARAMS), "user-1", "job-1")
+
+    return asyncio.run(run())
+
+
+def _reason(worker):
+    return worker.search_service.negatives.get("search:key")
+
+
+def test_zero_listings_is_cached_as_no_listings():
+    worker = _worker(listings=[])
+    assert _run(worker)["count"] == 0
+    assert _reason(worker) == "no_listings"
+    assert worker._event_publisher.events[-1] == "completed"
+
+
+def test_unknown_place_is_cached_as_place_not_found():
+    worker = _worker(places=[])
+    with pytest.raises(Exception):
+        _run(worker)
+    assert _reason(worker) == "place_not_found"
+
+
+def test_places_error_is_cached_as_places_unavailable():
+    worker = _worker(places=None)
+    with pytest.raises(Exception):
+        _run(worker)
+    assert _reason(worker) == "places_unavailable"
+
+
+def test_scrape_error_is_cached_as_scrape_failed():
+    worker = _worker(listings=RuntimeError("GraphQL 500 via proxy"))
+    with pytest.raises(ScrapeError):
+        _run(worker)
+    assert _reason(worker) == "scrape_failed"
+    assert worker.jobs_failed == 1 and worker.search_service.cached is None
+    # Un échec ne se termine pas par un événement completed
+    assert "completed" not in worker._event_publisher.events
+    assert worker._event_publisher.events[-1] == "error"
+
+
+def test_listings_are_cached():
+    worker = _worker(listings=[{"_id": "1"}])
+    assert _run(worker)["count"] == 1
+    assert worker.search_service.cached == [{"_id": "1"}]
+    assert _reason(worker) is None
+
+
+def _failing_tiles_scraper():
+    """Vrai SearchFacebook dont chaque tuile échoue à la première page."""
+    scraper = SearchFacebook.__new__(SearchFacebook)
+    scraper.event_publisher = _Publisher()
+    scraper.feed_max_listings = 100
+    scraper.feed_max_pages = 3
+    scraper.feed_time_budget = 30
+    scraper.enrich_reserve = 0
+    scraper.collect_factor = 2
+    scraper.tile_max_pages = 1
+    scraper.tile_concurrency = 3
+    scraper.tile_max_requests = 120
+
+    async def fetch_first_page(*args, **kwargs):
+        raise RuntimeError("GraphQL 500 via proxy")
+
+    scraper._fetch_first_page = fetch_first_page
+    return scraper
+
+
+def test_every_tile_failing_is_cached_as_scrape_failed(monkeypatch):
+    monkeypatch.setattr(searchFacebook, "OnePage", lambda: None)
+    # Deux lieux: recherche multi-lieux (une tuile par lieu)
+    worker = _worker(places=[PLACE, OTHER_PLACE])
+    worker.facebook_scraper = _failing_tiles_scraper()
+    with pytest.raises(ScrapeError):
+        _run(worker)
+    assert _reason(worker) == "scrape_failed"
+    assert "completed" not in worker._event_publisher.events
@@ -0,0 +1,180 @@
+import os
+import sys
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.tools.searchFacebook import SearchFacebook
+
+
+class _Publisher:
+    def publish(self, *args, **kwargs):
+        pass
+
+
+class _Response:
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+def _page(ids, has_next=True):
+    body = {
+        "data": {
+            "viewer": {
+                "marketplace_feed_stories": {
+                    "page_info": {"has_next_page": has_next, "end_cursor": "next"}
+                }
+            }
+        }
+    }
+    return body, [{"_id": str(i)} for i in ids]
+
+
+def _scraper(page_size=5, pages=10):
+    """SearchFacebook dont le feed GraphQL est simulé (page_size annonces par page)."""
+    scraper = SearchFacebook.__new__(SearchFacebook)
+    scraper.feed_max_listings = 100
+    scraper.feed_max_pages = pages
+    scraper.feed_time_budget = 30
+    scraper.enrich_reserve = 0
+    scraper.collect_factor = 2
+    scraper.event_publisher = _Publisher()
+    scraper.requests = 0
+
+    async def fetch_first_page(lat, lon, query, user_id, job_id, **kwargs):
+        scraper.requests += 1
+        body, listings = _page(range(page_size))
+        return body, listings, {"variables": "{}"}, {}, None
+
+    async def graphql_post(payload, headers, proxy, budget, deadline):
+        start = scraper.requests * page_size
+        scraper.requests += 1
+        return _Response(_page(range(start, start + page_size))[0])
+
+    scraper._fetch_first_page = fetch_first_page
+    scraper._graphql_post = graphql_post
+    scraper.add_feed_listings = lambda body, job_id: _page(
+        range((scraper.requests - 1) * page_size, scraper.requests * page_size)
+    )[1]
+    return scraper
+
+
+async def _collect(scraper, **kwargs):
+    listings = []
+    async for page in scraper.stream_listings(
+        45.5, -73.6, 500, 1500, 1, 2, "user", "job", **kwargs
+    ):
+        listings.extend(page)
+    return listings
+
+
+def test_pagination_stops_at_max_listings():
+    scraper = _scraper(page_size=5)
+    listings = asyncio.run(_collect(scraper, max_listings=8))
+    assert [x["_id"] for x in listings] == [str(i) for i in range(8)]
+    assert scraper.requests == 2
+
+
+def test_pagination_default_budget():
+    scraper = _scraper(page_size=5, pages=3)
+    listings = asyncio.run(_collect(scraper))
+    assert len(listings) == 15 and scraper.requests == 3
+
+
+def test_tiles_are_awaited_on_early_exit():
+    scraper = _scraper()
+    scraper.tile_max_pages = 2
+    scraper.tile_concurrency = 3
+    scraper.tile_max_requests = 120
+
+    async def iter_listings(lat, lon, *args, **kwargs):
+        for page in range(2):
+            await asyncio.sleep(0.01 * lat)
+            yield [{"_id": f"{lat}-{page}-{i}"} for i in range(3)]
+
+    scraper.iter_listings = iter_listings
+    tiles = [{"lat": float(i), "lon": 0.0} for i in range(1, 4)]
+
+    async def run():
+        listings = []
+        async for page in scraper.iter_tiled_listings(
+            tiles, {}, "user", "job", max_listings=4
+        ):
+            listings.extend(page)
+        # Aucune tâche de tuile ne survit au générateur
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+        return listings
+
+    assert len(asyncio.run(run())) == 4
+
+
+def _anchored(delays):
+    """Trois lieux qui se recouvrent; delays: temps de réponse de chaque lieu."""
+    scraper = _scraper()
+    scraper.tile_max_pages = 1
+    scraper.tile_concurrency = 3
+    scraper.tile_max_requests = 120
+
+    async def iter_listings(lat, lon, *args, max_listings=None, **kwargs):
+        rank = int(lat)
+        await asyncio.sleep(delays[rank])
+        # chaque lieu partage deux annonces avec le suivant
+        ids = [f"l{rank * 2 + i}" for i in range(4)]
+        yield [{"_id": _id} for _id in ids[:max_listings]]
+
+    scraper.iter_listings = iter_listings
+    tiles = [
+        {"lat": float(rank), "lon": 0.0, "anchor": f"lieu {rank}", "anchor_rank": rank}
+        for rank in range(3)
+    ]
+
+    async def run():
+        listings = []
+        async for page in scraper.iter_tiled_listings(
+            tiles, {}, "user", "job", max_listings=4
+        ):
+            listings.extend(page)
+        return scraper.rank_listings(listings)
+
+    return asyncio.run(run())
+
+
+def test_anchored_results_do_not_depend_on_arrival_order():
+    fast_first = _anchored([0.0, 0.01, 0.02])
+    slow_first = _anchored([0.02, 0.01, 0.0])
+    summary = [(x["_id"], x["anchor"]) for x in fast_first]
+    assert summary == [(x["_id"], x["anchor"]) for x in slow_first]
+    assert summary[:4] == [
+        ("l0", "lieu 0"),
+        ("l1", "lieu 0"),
+        ("l2", "lieu 0"),
+        ("l3", "lieu 0"),
+    ]
+    assert [x["anchors"] for x in fast_first] == [x["anchors"] for x in slow_first]
+    assert fast_first[2]["anchors"] == ["lieu 0", "lieu 1"]
+
+
+def test_failed_tile_does_not_fail_the_search():
+    scraper = _scraper()
+    scraper.tile_max_pages = 1
+    scraper.tile_concurrency = 2
+    scraper.tile_max_requests = 120
+
+    async def iter_listings(lat, lon, *args, **kwargs):
+        if lat == 1.0:
+            raise RuntimeError("proxy refusé")
+        yield [{"_id": "a"}]
+
+    scraper.iter_listings = iter_listings
+    tiles = [{"lat": float(i), "lon": 0.0} for i in range(2)]
+
+    async def run():
+        listings = []
+        async for page in scraper.iter_tiled_listings(tiles, {}, "user", "job"):
+            listings.extend(page)
+        return listings
+
+    assert asyncio.run(run()) == [{"_id": "a"}]
@@ -0,0 +1,132 @@
+import os
+import sys
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import redis
+from rq.job import Job, JobStatus
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.search_service import SearchService
+from utils import codec
+from schemas.places import PlacesResponse
+
+
+def _service() -> SearchService:
+    service = SearchService.__new__(SearchService)
+    service.job_timeout = 200
+    service.job_stale_grace = 60
+    return service
+
+
+def _job(**fields) -> Job:
+    job = Job.create("workers.scraping_workers.scrape_listings_job", connection=redis.Redis())
+    job.timeout = 200
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return job
+
+
+def _ago(seconds: float) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(seconds=seconds)
+
+
+def test_started_job_with_recent_heartbeat_is_alive():
+    job = _job(started_at=_ago(250), last_heartbeat=_ago(10))
+    assert not _service()._is_stale(job, JobStatus.STARTED)
+
+
+def test_started_job_without_heartbeat_past_timeout_is_stale():
+    job = _job(started_at=_ago(300), last_heartbeat=_ago(300))
+    assert _service()._is_stale(job, JobStatus.STARTED)
+
+
+def test_queued_job_past_its_deadline_is_stale():
+    assert _service()._is_stale(_job(enqueued_at=_ago(400)), JobStatus.QUEUED)
+    assert not _service()._is_stale(_job(enqueued_at=_ago(30)), JobStatus.QUEUED)
+
+
+def test_deferred_job_is_never_stale():
+    assert not _service()._is_stale(_job(enqueued_at=_ago(4000)), JobStatus.DEFERRED)
+
+
+PLACE = {
+    "displayName": {"text": "Montréal"},
+    "location": {"latitude": 45.5, "longitude": -73.6},
+}
+PARAMS = {"city": "Montreal", "min_bedrooms": 1, "max_bedrooms": 2}
+
+
+class _Places:
+    def __init__(self, located):
+        self.calls = 0
+        self.located = located
+
+    async def search_async(self, city, location_near=None, timeout=None):
+        self.calls += 1
+        return PlacesResponse.from_api(
+            {"places": [PLACE]} if self.located else {}, query=city
+        )
+
+
+def _search_service(located=True, allowed=True, cached=None, negative=None):
+    service = _service()
+    service.places_prevalidate = True
+    service.places_prevalidate_timeout = 3
+    service.google_places = _Places(located)
+    service.negative_ttls = {"place_not_found": 3600}
+    service.negatives = []
+    service._check_rate_limit = lambda ip, user: {"allowed": allowed, "retry_after": 5}
+    service._read_cache = lambda key: cached
+    service._read_negative = lambda key: negative
+    service._write_negative = lambda key, reason, details=None: service.negatives.append(
+        reason
+    )
+    service._claim_or_attach = lambda params, user, key, tier: ("search_x", False)
+    return service
+
+
+def _search(service):
+    return asyncio.run(service.search_listings(dict(PARAMS), None, "user"))
+
+
+def test_prevalidation_runs_after_rate_limit_and_caches():
+    for service in (
+        _search_service(allowed=False),
+        _search_service(cached={"data": [], "cached_at": None, "stale": False}),
+        _search_service(negative={"reason": "no_listings", "retry_after": 10}),
+    ):
+        assert _search(service)["status"] in ("rate_limited", "cached", "no_results")
+        assert service.google_places.calls == 0
+
+
+def test_unknown_place_is_not_enqueued():
+    service = _search_service(located=False)
+    result = _search(service)
+    assert result["status"] == "no_results" and result["reason"] == "place_not_found"
+    assert service.negatives == ["place_not_found"]
+
+
+def test_known_place_is_enqueued():
+    service = _search_service(located=True)
+    assert _search(service)["status"] == "queued"
+    assert service.google_places.calls == 1
+
+
+class _Cache:
+    def __init__(self, raw):
+        self.raw = raw
+
+    def get(self, key):
+        return self.raw
+
+
+def test_corrupt_cache_entry_is_a_miss():
+    service = _service()
+    service.cache_ttl = 600
+    compression = codec.COMPRESSION_ZSTD if codec.zstandard else codec.COMPRESSION_ZLIB
+    raw = codec.encode([{"id": str(i)} for i in range(200)], compression=compression)
+    # Corps compressé tronqué: ZstdError/zlib.error, pas ValueError
+    service.cache_client = _Cache(raw[: len(raw) // 2])
+    assert service._read_cache("search:key") is None
@@ -1,9 +1,17 @@
 """This file contains the utilities for the application."""
 
 from .graph import (
+    build_context_window,
     dump_messages,
     prepare_messages,
+    split_turns,
 )
 from .event_publisher import EventPublisher
 
-__all__ = ["dump_messages", "prepare_messages","EventPublisher"]
+__all__ = [
+    "build_context_window",
+    "dump_messages",
+    "prepare_messages",
+    "split_turns",
+    "EventPublisher",
+]
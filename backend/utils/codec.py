@@ -0,0 +1,241 @@
+import os
+import json
+import zlib
+import pickle
+import struct
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Dépendances optionnelles: sans elles, json et zlib (stdlib) prennent le relais
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    zstandard = None
+
+
+# En-tête: MAGIC (2 octets) | version | format (4 bits bas) + compression (4 bits hauts)
+# | longueur des métadonnées (uint16) | métadonnées JSON | corps.
+# \x00 ne commence jamais une valeur JSON, ni un pickle (\x80): les anciennes
+# valeurs restent lisibles.
+MAGIC = b"\x00\xc0"
+VERSION = 1
+_HEADER = struct.Struct(">2sBBH")
+
+FORMAT_MSGPACK = 1
+FORMAT_JSON = 2
+FORMAT_PICKLE = 3
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZSTD = 1
+COMPRESSION_ZLIB = 2
+
+_FORMATS = {"msgpack": FORMAT_MSGPACK, "json": FORMAT_JSON}
+_COMPRESSIONS = {"zstd": COMPRESSION_ZSTD, "zlib": COMPRESSION_ZLIB, "none": COMPRESSION_NONE}
+
+
+class CodecError(ValueError):
+    """Valeur illisible (en-tête inconnu ou dépendance manquante)."""
+
+
+def _default_format() -> int:
+    name = os.getenv("CODEC_FORMAT", "msgpack" if msgpack else "json")
+    if name == "msgpack" and msgpack is None:
+        logger.warning("[codec] msgpack absent, format json")
+        name = "json"
+    return _FORMATS.get(name, FORMAT_JSON)
+
+
+def _default_compression() -> int:
+    name = os.getenv("CODEC_COMPRESSION", "zstd" if zstandard else "zlib")
+    if name == "zstd" and zstandard is None:
+        logger.warning("[codec] zstandard absent, compression zlib")
+        name = "zlib"
+    return _COMPRESSIONS.get(name, COMPRESSION_ZLIB)
+
+
+FORMAT = _default_format()
+COMPRESSION = _default_compression()
+# En dessous, compresser coûte plus que ça ne rapporte
+COMPRESS_MIN_BYTES = int(os.getenv("CODEC_COMPRESS_MIN", 512))
+ZSTD_LEVEL = int(os.getenv("CODEC_ZSTD_LEVEL", 3))
+ZLIB_LEVEL = int(os.getenv("CODEC_ZLIB_LEVEL", 6))
+
+# Les (dé)compresseurs zstd ne se partagent pas entre threads
+_local = threading.local()
+
+
+def _zstd_compressor():
+    if getattr(_local, "compressor", None) is None:
+        _local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return _local.compressor
+
+
+def _zstd_decompressor():
+    if getattr(_local, "decompressor", None) is None:
+        _local.decompressor = zstandard.ZstdDecompressor()
+    return _local.decompressor
+
+
+_SCALARS = (type(None), bool, int, float, str)
+
+
+def _is_exact(obj: Any, fmt: int) -> bool:
+    """
+    Vrai si obj ressort identique de msgpack/json: pas de tuple (relu en
+    liste), ni de clé non str en json (relue en str), ni de sous-classe.
+    """
+    kind = type(obj)
+    if kind in _SCALARS:
+        return True
+    if kind is list:
+        return all(_is_exact(item, fmt) for item in obj)
+    if kind is dict:
+        keys = (str,) if fmt == FORMAT_JSON else (str, int)
+        return all(
+            type(key) in keys and _is_exact(value, fmt) for key, value in obj.items()
+        )
+    return kind is bytes and fmt == FORMAT_MSGPACK
+
+
+def _serialize(obj: Any, fmt: int) -> bytes:
+    if fmt == FORMAT_MSGPACK:
+        return msgpack.packb(obj, use_bin_type=True)
+    if fmt == FORMAT_JSON:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _deserialize(body: bytes, fmt: int) -> Any:
+    if fmt == FORMAT_MSGPACK:
+        if msgpack is None:
+            raise CodecError("valeur msgpack mais msgpack n'est pas installé")
+        return msgpack.unpackb(body, raw=False, strict_map_key=False)
+    if fmt == FORMAT_JSON:
+        return json.loads(body)
+    if fmt == FORMAT_PICKLE:
+        return pickle.loads(body)
+    raise CodecError(f"format inconnu: {fmt}")
+
+
+def _compress(body: bytes, compression: int) -> bytes:
+    if compression == COMPRESSION_ZSTD:
+        return _zstd_compressor().compress(body)
+    if compression == COMPRESSION_ZLIB:
+        return zlib.compress(body, ZLIB_LEVEL)
+    return body
+
+
+def _decompress(body: bytes, compression: int) -> bytes:
+    if compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise CodecError("valeur zstd mais zstandard n'est pas installé")
+        return _zstd_decompressor().decompress(body)
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(body)
+    if compression == COMPRESSION_NONE:
+        return body
+    raise CodecError(f"compression inconnue: {compression}")
+
+
+def is_encoded(data: Any) -> bool:
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:2]) == MAGIC
+
+
+def encode(
+    obj: Any,
+    meta: Optional[Dict[str, Any]] = None,
+    fmt: Optional[int] = None,
+    compression: Optional[int] = None,
+    allow_pickle: bool = False,
+) -> bytes:
+    """
+    Sérialise `obj` (msgpack, sinon json) et le compresse (zstd, sinon zlib)
+    au-delà de CODEC_COMPRESS_MIN octets.
+
+    `meta`: petit dict JSON non compressé, lisible par peek_meta() sans
+    décoder le corps (ex: date d'écriture d'une entrée de cache).
+    allow_pickle: repli sur pickle pour les objets que msgpack/json ne
+    savent pas représenter à l'identique (payloads RQ: tuples, clés int...).
+    """
+    fmt = fmt or FORMAT
+    compression = COMPRESSION if compression is None else compression
+    if allow_pickle and not _is_exact(obj, fmt):
+        fmt = FORMAT_PICKLE
+    try:
+        body = _serialize(obj, fmt)
+    except (TypeError, ValueError, OverflowError):
+        if not allow_pickle:
+            raise
+        fmt = FORMAT_PICKLE
+        body = _serialize(obj, fmt)
+
+    if len(body) < COMPRESS_MIN_BYTES:
+        compression = COMPRESSION_NONE
+    body = _compress(body, compression)
+
+    meta_bytes = json.dumps(meta, separators=(",", ":")).encode() if meta else b""
+    header = _HEADER.pack(MAGIC, VERSION, fmt | (compression << 4), len(meta_bytes))
+    return header + meta_bytes + body
+
+
+def _parse(data: bytes):
+    if len(data) < _HEADER.size:
+        raise CodecError("valeur tronquée")
+    magic, version, flags, meta_len = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise CodecError("en-tête absent")
+    if version != VERSION:
+        raise CodecError(f"version de codec non supportée: {version}")
+    return flags & 0x0F, flags >> 4, _HEADER.size, meta_len
+
+
+def peek_meta(data: bytes) -> Dict[str, Any]:
+    """Métadonnées d'une valeur encodée, sans décompresser ni décoder le corps."""
+    _, _, start, meta_len = _parse(data)
+    if not meta_len:
+        return {}
+    return json.loads(data[start : start + meta_len])
+
+
+def decode(data: Any) -> Any:
+    """
+    Décode une valeur écrite par encode(). Les valeurs sans en-tête (anciens
+    formats) sont lues comme pickle (\\x80...) ou comme JSON.
+    """
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    if not is_encoded(data):
+        if isinstance(data, (bytes, bytearray)) and data[:1] == b"\x80":
+            return pickle.loads(data)
+        return json.loads(data)
+    fmt, compression, start, meta_len = _parse(data)
+    body = _decompress(data[start + meta_len :], compression)
+    return _deserialize(body, fmt)
+
+
+class CodecSerializer:
+    """
+    Sérialiseur RQ (dumps/loads) basé sur le codec: payloads et résultats
+    de jobs compacts. Lit aussi les jobs déjà écrits en pickle.
+    """
+
+    @staticmethod
+    def dumps(obj: Any) -> bytes:
+        return encode(obj, allow_pickle=True)
+
+    @staticmethod
+    def loads(data: bytes) -> Any:
+        return decode(data)
+
+
+def rq_serializer():
+    """Sérialiseur à passer aux Queue/Job/Worker RQ (RQ_CODEC=0: pickle par défaut de RQ)."""
+    return CodecSerializer if os.getenv("RQ_CODEC", "1") != "0" else None
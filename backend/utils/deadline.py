@@ -0,0 +1,84 @@
+import os
+import time
+import asyncio
+from typing import Any, List, Optional
+
+
+# Clé de search_params qui transporte l'échéance du job (timestamp epoch)
+DEADLINE_PARAM = "_deadline"
+
+
+class DeadlineExceeded(Exception):
+    """Le budget de temps du job est épuisé."""
+
+
+class Deadline:
+    """
+    Échéance absolue d'un job de scraping, créée à l'enqueue et transmise à
+    chaque étape (Google Places, session, GraphQL, pagination, enrichissement).
+
+    Stockée en temps epoch pour traverser la queue RQ; chaque étape borne
+    ses attentes et ses tentatives au temps restant. Les étapes qui coupent
+    leur travail faute de temps le signalent (`cut`), le job est alors
+    marqué partial.
+    """
+
+    def __init__(self, expires_at: float):
+        self.expires_at = float(expires_at)
+        self.cut_stages: List[str] = []
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.time() + seconds)
+
+    @classmethod
+    def from_params(
+        cls, search_params: dict, default_seconds: Optional[float] = None
+    ) -> "Deadline":
+        """Échéance portée par search_params, sinon JOB_DEADLINE secondes à partir de maintenant."""
+        value: Any = (search_params or {}).get(DEADLINE_PARAM)
+        if isinstance(value, Deadline):
+            return value
+        if value:
+            return cls(float(value))
+        if default_seconds is None:
+            default_seconds = float(os.getenv("JOB_DEADLINE", 190))
+        return cls.after(default_seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.time())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.cut_stages)
+
+    def timeout(self, cap: Optional[float] = None, reserve: float = 0.0) -> float:
+        """Délai à donner à une opération: temps restant moins `reserve`, borné par `cap`."""
+        left = max(0.0, self.remaining() - reserve)
+        return min(cap, left) if cap is not None else left
+
+    def allows(self, seconds: float) -> bool:
+        """Reste-t-il au moins `seconds` secondes ?"""
+        return self.remaining() > seconds
+
+    def check(self, stage: str = "") -> None:
+        if self.expired:
+            raise DeadlineExceeded(stage or "deadline")
+
+    def cut(self, stage: str) -> None:
+        """Une étape a rendu un résultat incomplet faute de temps."""
+        if stage not in self.cut_stages:
+            self.cut_stages.append(stage)
+
+    async def sleep(self, seconds: float, stage: str = "") -> None:
+        """Attente de retry: lève DeadlineExceeded si elle dépasserait l'échéance."""
+        if not self.allows(seconds):
+            raise DeadlineExceeded(stage or "retry")
+        await asyncio.sleep(seconds)
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.1f}s, cut={self.cut_stages})"
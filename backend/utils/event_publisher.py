@@ -1,11 +1,184 @@
 import os
 import json
+import atexit
 import logging
+import threading
+from typing import Dict, List, Optional, Tuple
 import redis
 
 logger = logging.getLogger(__name__)
 
 
+CHANNEL_PREFIX = "sse:job:"
+STREAM_PREFIX = "sse:stream:"
+
+# Événements qui ne passent jamais par le tampon: publiés tout de suite,
+# après vidage de ce qui précède pour garder l'ordre
+TERMINAL_EVENTS = ("completed", "error")
+
+# XADD dans le stream du job + PUBLISH temps réel en un seul aller-retour.
+# L'id du stream est injecté dans le message publié pour que le client SSE
+# puisse reprendre avec Last-Event-ID.
+_PUBLISH_SCRIPT = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[2], '*', 'data', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('PUBLISH', KEYS[2], '{"id":"' .. id .. '",' .. string.sub(ARGV[1], 2))
+return id
+"""
+
+
+def stream_key(job_id: str) -> str:
+    """Clé du stream Redis qui conserve les événements d'un job."""
+    return f"{STREAM_PREFIX}{job_id}"
+
+
+def with_event_id(event_id: str, data: str) -> str:
+    """Ajoute l'id du stream au message JSON (même format que le PUBLISH)."""
+    return '{"id":"%s",%s' % (event_id, data[1:])
+
+
+def encode_event(event: str, payload: dict) -> str:
+    """Message JSON publié pour un événement (sans id)."""
+    return json.dumps({"event": event, "payload": payload}, default=str)
+
+
+def _listing_found_message(event: str, message: str) -> Optional[str]:
+    """Texte d'un progress/listing_found, None pour tout autre événement."""
+    if event != "progress" or '"listing_found"' not in message:
+        return None
+    payload = json.loads(message)["payload"]
+    if payload.get("stage") != "listing_found":
+        return None
+    return payload.get("message", "")
+
+
+def coalesce_events(events: List[Tuple[str, str, str]]) -> List[Tuple[str, str, str]]:
+    """
+    Fusionne les rafales de progress/listing_found d'un même job en un seul
+    événement (placé à la position du dernier), les autres restent dans l'ordre.
+    Entrée/sortie: [(job_id, event, message_json)].
+    """
+    found: Dict[str, List[str]] = {}
+    last_index: Dict[str, int] = {}
+    for index, (job_id, event, message) in enumerate(events):
+        text = _listing_found_message(event, message)
+        if text is not None:
+            found.setdefault(job_id, []).append(text)
+            last_index[job_id] = index
+
+    if not any(len(batch) > 1 for batch in found.values()):
+        return events
+
+    merged = []
+    for index, (job_id, event, message) in enumerate(events):
+        if job_id not in found or _listing_found_message(event, message) is None:
+            merged.append((job_id, event, message))
+        elif index == last_index[job_id]:
+            batch = found[job_id]
+            if len(batch) > 1:
+                message = encode_event(
+                    event,
+                    {
+                        "stage": "listing_found",
+                        "message": f"{len(batch)} annonces repérées",
+                        "count": len(batch),
+                        "messages": batch,
+                    },
+                )
+            merged.append((job_id, event, message))
+    return merged
+
+
+class _EventBuffer:
+    """
+    Tampon d'événements partagé par toutes les instances d'EventPublisher du
+    processus (l'ordre entre publishers d'un même job est donc conservé).
+    Vidé par un thread de fond toutes les `interval` secondes ou dès
+    `batch_size` événements, en un seul pipeline Redis.
+    """
+
+    def __init__(self, publisher: "EventPublisher", batch_size: int, interval: float):
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.interval = interval
+
+        self._events: List[Tuple[str, str, str]] = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        # Métriques
+        self.flushes = 0
+        self.events_in = 0
+        self.events_out = 0
+
+    def add(self, job_id: str, event: str, message: str) -> None:
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="event-publisher", daemon=True
+                )
+                self._thread.start()
+            self._events.append((job_id, event, message))
+            self.events_in += 1
+            if len(self._events) >= self.batch_size:
+                self._cond.notify()
+
+    def flush(
+        self, extra: Optional[Tuple[str, str, str]] = None
+    ) -> List[Optional[str]]:
+        """Publie tout le tampon (puis `extra`) en un pipeline. Retourne les ids."""
+        with self._flush_lock:
+            with self._cond:
+                events, self._events = self._events, []
+            events = coalesce_events(events)
+            if extra is not None:
+                self.events_in += 1
+                events.append(extra)
+            if not events:
+                return []
+            self.flushes += 1
+            self.events_out += len(events)
+            return self.publisher._publish_many(events)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if len(self._events) < self.batch_size:
+                    self._cond.wait(timeout=self.interval)
+                if not self._events:
+                    continue
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"event buffer flush error: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._events),
+            "flushes": self.flushes,
+            "events_in": self.events_in,
+            "events_out": self.events_out,
+        }
+
+
+_shared_buffer: Optional[_EventBuffer] = None
+_shared_buffer_lock = threading.Lock()
+
+
+def _get_shared_buffer(publisher: "EventPublisher") -> _EventBuffer:
+    global _shared_buffer
+    with _shared_buffer_lock:
+        if _shared_buffer is None:
+            _shared_buffer = _EventBuffer(
+                publisher,
+                batch_size=int(os.getenv("EVENT_BATCH_SIZE", 50)),
+                interval=int(os.getenv("EVENT_FLUSH_INTERVAL_MS", 20)) / 1000,
+            )
+            atexit.register(_shared_buffer.flush)
+        return _shared_buffer
+
+
 class EventPublisher:
     def __init__(self):
         """
@@ -13,14 +186,55 @@ class EventPublisher:
         """
         redis_url = os.getenv("REDIS_URL", "")
         self.redis_client = redis.from_url(redis_url, decode_responses=True)
+        self.stream_maxlen = int(os.getenv("EVENT_STREAM_MAXLEN", 500))
+        self.stream_ttl = int(os.getenv("EVENT_STREAM_TTL", 3600))
+        self._publish_script = self.redis_client.register_script(_PUBLISH_SCRIPT)
+        self.buffered = os.getenv("EVENT_BUFFERING", "1") != "0"
+        self._buffer = _get_shared_buffer(self) if self.buffered else None
 
-    def publish(self, job_id: str, event: str, payload: dict) -> None:
+    def publish(self, job_id: str, event: str, payload: dict) -> Optional[str]:
         """
-        Publie un événement SSE sur le canal Redis du job donné.
+        Publie un événement SSE sur le canal Redis du job donné et l'ajoute
+        au stream du job (rejouable).
+
+        Les événements intermédiaires sont mis en tampon (retourne None); les
+        événements terminaux vident le tampon puis partent immédiatement, et
+        leur id est retourné.
         """
-        channel = f"sse:job:{job_id}"
         try:
-            message = json.dumps({"event": event, "payload": payload}, default=str)
-            self.redis_client.publish(channel, message)
+            # Sérialiser maintenant: l'appelant peut modifier le dict ensuite
+            message = encode_event(event, payload)
+            if self._buffer is None:
+                return self._publish_many([(job_id, event, message)])[0]
+            if event in TERMINAL_EVENTS:
+                return self._buffer.flush(extra=(job_id, event, message))[-1]
+            self._buffer.add(job_id, event, message)
+            return None
         except Exception as e:
             logger.warning(f"[{job_id}] publish_event error: {e}")
+            return None
+
+    def flush(self) -> None:
+        """Vide le tampon (ex: avant de rendre la main à l'appelant)."""
+        if self._buffer is not None:
+            self._buffer.flush()
+
+    def _publish_many(
+        self, events: List[Tuple[str, str, str]]
+    ) -> List[Optional[str]]:
+        """Un seul aller-retour Redis pour tous les événements (ordre conservé)."""
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for job_id, _event, message in events:
+            self._publish_script(
+                keys=[stream_key(job_id), f"{CHANNEL_PREFIX}{job_id}"],
+                args=[message, self.stream_maxlen, self.stream_ttl],
+                client=pipeline,
+            )
+        try:
+            return pipeline.execute()
+        except Exception as e:
+            logger.warning(f"publish pipeline error ({len(events)} events): {e}")
+            return [None] * len(events)
+
+    def stats(self) -> Dict[str, int]:
+        return self._buffer.stats() if self._buffer is not None else {}
@@ -0,0 +1,204 @@
+"""Geographic tiling helpers for wide-area marketplace searches."""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEG_LAT = 111320.0
+
+# Marketplace search radius used by SearchFacebook.init_session
+DEFAULT_TILE_RADIUS_M = 4000
+
+Point = Tuple[float, float]
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in meters between two (lat, lon) points.
+
+    Args:
+        lat1: Latitude of the first point.
+        lon1: Longitude of the first point.
+        lat2: Latitude of the second point.
+        lon2: Longitude of the second point.
+
+    Returns:
+        float: Distance in meters.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def bbox_from_polygon(polygon: Sequence[Point]) -> Tuple[float, float, float, float]:
+    """Bounding box of a polygon.
+
+    Args:
+        polygon: Vertices as (lat, lon) pairs.
+
+    Returns:
+        tuple: (min_lat, min_lon, max_lat, max_lon).
+    """
+    lats = [p[0] for p in polygon]
+    lons = [p[1] for p in polygon]
+    return min(lats), min(lons), max(lats), max(lons)
+
+
+def point_in_polygon(lat: float, lon: float, polygon: Sequence[Point]) -> bool:
+    """Ray-casting point-in-polygon test on (lat, lon) vertices."""
+    inside = False
+    n = len(polygon)
+    for i in range(n):
+        lat_i, lon_i = polygon[i]
+        lat_j, lon_j = polygon[i - 1]
+        if (lat_i > lat) != (lat_j > lat):
+            cross = lon_i + (lat - lat_i) * (lon_j - lon_i) / (lat_j - lat_i)
+            if lon < cross:
+                inside = not inside
+    return inside
+
+
+def _to_local_m(lat: float, lon: float, lat0: float, lon0: float) -> Point:
+    """Equirectangular projection around (lat0, lon0), in meters (x east, y north)."""
+    x = (lon - lon0) * METERS_PER_DEG_LAT * math.cos(math.radians(lat0))
+    y = (lat - lat0) * METERS_PER_DEG_LAT
+    return x, y
+
+
+def _distance_to_polygon_m(lat: float, lon: float, polygon: Sequence[Point]) -> float:
+    """Distance in meters from a point to the polygon boundary (0 if inside)."""
+    if point_in_polygon(lat, lon, polygon):
+        return 0.0
+    best = math.inf
+    n = len(polygon)
+    for i in range(n):
+        ax, ay = _to_local_m(polygon[i - 1][0], polygon[i - 1][1], lat, lon)
+        bx, by = _to_local_m(polygon[i][0], polygon[i][1], lat, lon)
+        dx, dy = bx - ax, by - ay
+        seg_len2 = dx * dx + dy * dy
+        t = 0.0 if seg_len2 == 0 else max(0.0, min(1.0, -(ax * dx + ay * dy) / seg_len2))
+        px, py = ax + t * dx, ay + t * dy
+        best = min(best, math.hypot(px, py))
+    return best
+
+
+def _distance_to_bbox_m(lat: float, lon: float, bbox: Sequence[float]) -> float:
+    """Distance in meters from a point to a bbox (0 if inside)."""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    clamped_lat = min(max(lat, min_lat), max_lat)
+    clamped_lon = min(max(lon, min_lon), max_lon)
+    return haversine_m(lat, lon, clamped_lat, clamped_lon)
+
+
+def plan_tiles(
+    bbox: Optional[Sequence[float]] = None,
+    polygon: Optional[Sequence[Point]] = None,
+    radius_m: float = DEFAULT_TILE_RADIUS_M,
+    overlap: float = 0.1,
+    max_tiles: Optional[int] = None,
+) -> List[Dict[str, float]]:
+    """Cover a bounding box or polygon with overlapping search circles.
+
+    Centers are laid out on a hexagonal lattice, which covers the plane with
+    the fewest circles of a given radius. The lattice is computed for a
+    radius shrunk by `overlap` so neighbouring tiles overlap at the edges,
+    and only circles that touch the area are kept.
+
+    Args:
+        bbox: (min_lat, min_lon, max_lat, max_lon). Ignored if polygon is given.
+        polygon: Vertices as (lat, lon) pairs.
+        radius_m: Marketplace search radius of each tile in meters.
+        overlap: Fraction of the radius shared with neighbouring tiles (0-0.5).
+        max_tiles: Keep at most this many tiles, closest to the center first.
+
+    Returns:
+        list: Tiles as {"lat", "lon", "radius_m"} dicts.
+    """
+    if polygon:
+        polygon = [(float(p[0]), float(p[1])) for p in polygon]
+        bbox = bbox_from_polygon(polygon)
+    if not bbox:
+        raise ValueError("bbox or polygon is required")
+
+    min_lat, min_lon, max_lat, max_lon = (float(v) for v in bbox)
+    if min_lat > max_lat or min_lon > max_lon:
+        raise ValueError("bbox must be (min_lat, min_lon, max_lat, max_lon)")
+
+    center_lat = (min_lat + max_lat) / 2
+    center_lon = (min_lon + max_lon) / 2
+    meters_per_deg_lon = METERS_PER_DEG_LAT * math.cos(math.radians(center_lat))
+
+    # Small area: one circle at the center already covers every corner
+    corners = polygon or [
+        (min_lat, min_lon),
+        (min_lat, max_lon),
+        (max_lat, min_lon),
+        (max_lat, max_lon),
+    ]
+    if max(haversine_m(center_lat, center_lon, lat, lon) for lat, lon in corners) <= radius_m:
+        return [{"lat": center_lat, "lon": center_lon, "radius_m": radius_m}]
+
+    effective_r = radius_m * (1 - max(0.0, min(overlap, 0.5)))
+    dx = math.sqrt(3) * effective_r  # between centers of a row
+    dy = 1.5 * effective_r  # between rows
+
+    # Lattice centered on the area, plus one extra ring so corners stay covered
+    lat_step = dy / METERS_PER_DEG_LAT
+    lon_step = dx / meters_per_deg_lon
+    half_rows = int(math.ceil((max_lat - min_lat) / 2 / lat_step)) + 1
+    half_cols = int(math.ceil((max_lon - min_lon) / 2 / lon_step)) + 1
+
+    tiles = []
+    for row in range(-half_rows, half_rows + 1):
+        lat = center_lat + row * lat_step
+        offset = lon_step / 2 if row % 2 else 0.0
+        for col in range(-half_cols, half_cols + 1):
+            lon = center_lon + col * lon_step + offset
+            if polygon:
+                distance = _distance_to_polygon_m(lat, lon, polygon)
+            else:
+                distance = _distance_to_bbox_m(lat, lon, (min_lat, min_lon, max_lat, max_lon))
+            if distance < radius_m:
+                tiles.append({"lat": lat, "lon": lon, "radius_m": radius_m})
+
+    if max_tiles and len(tiles) > max_tiles:
+        tiles.sort(key=lambda t: haversine_m(t["lat"], t["lon"], center_lat, center_lon))
+        tiles = tiles[:max_tiles]
+    return tiles
+
+
+def coverage_ratio(
+    tiles: Sequence[Dict[str, float]],
+    bbox: Optional[Sequence[float]] = None,
+    polygon: Optional[Sequence[Point]] = None,
+    samples: int = 60,
+) -> float:
+    """Share of the area (sampled on a samples x samples grid) inside at least one tile.
+
+    Args:
+        tiles: Tiles as returned by plan_tiles.
+        bbox: (min_lat, min_lon, max_lat, max_lon). Ignored if polygon is given.
+        polygon: Vertices as (lat, lon) pairs.
+        samples: Grid resolution along each axis.
+
+    Returns:
+        float: Covered fraction between 0 and 1.
+    """
+    if polygon:
+        bbox = bbox_from_polygon(polygon)
+    min_lat, min_lon, max_lat, max_lon = bbox
+
+    covered = total = 0
+    for i in range(samples):
+        lat = min_lat + (max_lat - min_lat) * (i + 0.5) / samples
+        for j in range(samples):
+            lon = min_lon + (max_lon - min_lon) * (j + 0.5) / samples
+            if polygon and not point_in_polygon(lat, lon, polygon):
+                continue
+            total += 1
+            if any(
+                haversine_m(lat, lon, t["lat"], t["lon"]) <= t["radius_m"] for t in tiles
+            ):
+                covered += 1
+    return covered / total if total else 0.0
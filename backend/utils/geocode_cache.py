@@ -0,0 +1,187 @@
+import os
+import json
+import hashlib
+import logging
+import unicodedata
+from typing import Any, Dict, Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+
+KEY_PREFIX = "geocode:"
+CITIES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cities.json"
+)
+
+
+def _fold(text: str) -> str:
+    """Minuscules, sans accents ni espaces superflus."""
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.casefold().split())
+
+
+def normalize_query(city: str, location_near: Optional[list]) -> str:
+    """Requête normalisée: même texte => même clé, quel que soit l'ordre des lieux."""
+    near = sorted(_fold(x) for x in (location_near or []) if _fold(x))
+    return json.dumps({"city": _fold(city), "near": near}, sort_keys=True)
+
+
+def load_cities(path: str = CITIES_PATH) -> Dict[str, dict]:
+    """Index nom normalisé -> ville de data/cities.json ({} si illisible)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cities = json.load(f).get("cities", [])
+    except Exception as e:
+        logger.warning(f"[GeocodeCache] cities.json illisible: {e}")
+        return {}
+    return {_fold(city["name"]): city for city in cities if city.get("name")}
+
+
+def _as_places(city: dict) -> Dict[str, Any]:
+    """Ville de cities.json au format de réponse Places (searchText)."""
+    return {
+        "places": [
+            {
+                "displayName": {"text": city["name"]},
+                "location": {
+                    "latitude": city["latitude"],
+                    "longitude": city["longitude"],
+                },
+            }
+        ]
+    }
+
+
+class GeocodeCache:
+    """
+    Cache des réponses Google Places (searchText) pour GooglePlaces.execute.
+
+    Ordre de résolution:
+    1. nom de ville seul présent dans data/cities.json: aucun appel réseau
+    2. Redis (geocode:{sha1(requête normalisée)}, GEOCODE_CACHE_TTL, 30 jours)
+    3. Mongo, collection geocode_cache (si GEOCODE_MONGO_CACHE=1), recopié dans Redis
+    Redis ou Mongo indisponibles ne bloquent jamais la résolution.
+    """
+
+    def __init__(self):
+        self.ttl = int(os.getenv("GEOCODE_CACHE_TTL", 30 * 24 * 3600))
+        # Requête sans aucun lieu: mémorisée moins longtemps (Redis seulement)
+        self.negative_ttl = int(os.getenv("GEOCODE_NEGATIVE_TTL", 3600))
+        self.use_mongo = os.getenv("GEOCODE_MONGO_CACHE", "0") == "1"
+        self.cities = load_cities()
+        self._redis: Optional[redis.Redis] = None
+        self._model = None
+
+        # Métriques
+        self.offline_hits = 0
+        self.redis_hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+
+    @property
+    def redis_client(self) -> Optional[redis.Redis]:
+        if self._redis is None and os.getenv("REDIS_URL"):
+            try:
+                self._redis = redis.from_url(os.getenv("REDIS_URL"), decode_responses=True)
+            except Exception as e:
+                logger.warning(f"[GeocodeCache] Redis indisponible: {e}")
+        return self._redis
+
+    @property
+    def model(self):
+        if self._model is None and self.use_mongo:
+            try:
+                from models.geocode_cache import GeocodeCacheModel
+
+                self._model = GeocodeCacheModel()
+            except Exception as e:
+                logger.warning(f"[GeocodeCache] Mongo indisponible: {e}")
+                self.use_mongo = False
+        return self._model
+
+    @staticmethod
+    def key_for(query: str) -> str:
+        return f"{KEY_PREFIX}{hashlib.sha1(query.encode()).hexdigest()}"
+
+    def resolve_offline(self, city: str, location_near: Optional[list]) -> Optional[dict]:
+        """Ville seule (sans location_near) connue de cities.json."""
+        if location_near:
+            return None
+        # "Montréal, QC" -> "montreal"
+        city = self.cities.get(_fold(str(city or "").split(",")[0]))
+        return _as_places(city) if city else None
+
+    def get(self, city: str, location_near: Optional[list]) -> Optional[dict]:
+        """Réponse Places en cache, ou None (il faut appeler l'API)."""
+        offline = self.resolve_offline(city, location_near)
+        if offline is not None:
+            self.offline_hits += 1
+            return offline
+
+        query = normalize_query(city, location_near)
+        key = self.key_for(query)
+        client = self.redis_client
+        if client is not None:
+            try:
+                raw = client.get(key)
+                if raw:
+                    self.redis_hits += 1
+                    return json.loads(raw)
+            except Exception as e:
+                logger.warning(f"[GeocodeCache] lecture Redis impossible: {e}")
+
+        if self.model is not None:
+            try:
+                result = self.model.get(query)
+            except Exception as e:
+                logger.warning(f"[GeocodeCache] lecture Mongo impossible: {e}")
+                result = None
+            if result:
+                self.mongo_hits += 1
+                self._set_redis(key, result)
+                return result
+
+        self.misses += 1
+        return None
+
+    def set(self, city: str, location_near: Optional[list], result: dict) -> None:
+        """Mémorise une réponse Places non vide."""
+        if not (result or {}).get("places"):
+            return
+        query = normalize_query(city, location_near)
+        self._set_redis(self.key_for(query), result)
+        if self.model is not None:
+            try:
+                self.model.save(query, result)
+            except Exception as e:
+                logger.warning(f"[GeocodeCache] écriture Mongo impossible: {e}")
+
+    def set_missing(self, city: str, location_near: Optional[list]) -> None:
+        """Mémorise qu'une requête ne renvoie aucun lieu ({"places": []})."""
+        if self.negative_ttl > 0:
+            query = normalize_query(city, location_near)
+            self._set_redis(self.key_for(query), {"places": []}, self.negative_ttl)
+
+    def _set_redis(self, key: str, result: dict, ttl: Optional[int] = None) -> None:
+        client = self.redis_client
+        if client is None:
+            return
+        try:
+            client.setex(key, ttl or self.ttl, json.dumps(result))
+        except Exception as e:
+            logger.warning(f"[GeocodeCache] écriture Redis impossible: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "offline_hits": self.offline_hits,
+            "redis_hits": self.redis_hits,
+            "mongo_hits": self.mongo_hits,
+            "misses": self.misses,
+        }
+
+
+# Instance globale
+geocode_cache = GeocodeCache()
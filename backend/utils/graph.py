@@ -1,6 +1,14 @@
 """This file contains the graph utilities for the application."""
 
+import json
+
 from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
 from langchain_core.messages import trim_messages as _trim_messages
 
 # from app.core.config import settings
@@ -42,3 +50,145 @@ def prepare_messages(
         allow_partial=False,
     )
     return [Message(role="system", content=system_prompt)] + trimmed_messages
+
+
+def approximate_token_count(messages: list[BaseMessage]) -> int:
+    """Cheap token estimate (~4 characters per token) for budget checks.
+
+    Args:
+        messages (list[BaseMessage]): The messages to measure.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    total = 0
+    for message in messages:
+        content = message.content
+        if not isinstance(content, str):
+            content = json.dumps(content, default=str)
+        total += len(content) // 4 + 4
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            total += len(json.dumps(tool_call.get("args", {}), default=str)) // 4
+    return total
+
+
+def split_turns(messages: list[BaseMessage]) -> list[int]:
+    """Return the index where each conversation turn starts.
+
+    A turn starts on a human message and holds every AI/tool message after it.
+
+    Args:
+        messages (list[BaseMessage]): The conversation history.
+
+    Returns:
+        list[int]: The start index of each turn.
+    """
+    return [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+
+
+def compact_tool_message(message: ToolMessage, max_chars: int = 600) -> ToolMessage:
+    """Replace a bulky tool payload by a short digest.
+
+    Search results keep their status, job id and a few listing titles/prices;
+    any other payload is truncated to ``max_chars``.
+
+    Args:
+        message (ToolMessage): The tool message to compact.
+        max_chars (int): The maximum size of the compacted content.
+
+    Returns:
+        ToolMessage: A copy of the message with a compact content.
+    """
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    if len(content) <= max_chars:
+        return message
+
+    digest = None
+    try:
+        data = json.loads(content)
+        if isinstance(data, dict):
+            listings = data.get("data") or data.get("listings") or []
+            if isinstance(listings, dict):
+                listings = listings.get("listings") or []
+            digest = {
+                key: data[key]
+                for key in ("status", "job_id", "source", "message")
+                if key in data
+            }
+            if isinstance(listings, list):
+                digest["count"] = len(listings)
+                digest["listings"] = [
+                    {k: item.get(k) for k in ("id", "title", "price", "url")}
+                    for item in listings[:5]
+                    if isinstance(item, dict)
+                ]
+            digest = json.dumps(digest, default=str)[:max_chars]
+    except (TypeError, ValueError):
+        digest = None
+
+    if digest is None:
+        digest = content[:max_chars] + "…"
+    return message.model_copy(update={"content": digest})
+
+
+def build_context_window(
+    messages: list[BaseMessage],
+    system_prompt: str,
+    summary: str = "",
+    max_tokens: int = 6000,
+    tool_max_chars: int = 600,
+) -> list[BaseMessage]:
+    """Build the token-budgeted prompt sent to the LLM.
+
+    Tool payloads are compacted everywhere except in the latest turn, the
+    rolling summary (if any) is injected after the system prompt, and the
+    oldest messages are trimmed to fit ``max_tokens``.
+
+    Args:
+        messages (list[BaseMessage]): The not-yet-summarized history.
+        system_prompt (str): The system prompt to use.
+        summary (str): The rolling summary of older turns.
+        max_tokens (int): The token budget for the whole prompt.
+        tool_max_chars (int): The size cap for older tool payloads.
+
+    Returns:
+        list[BaseMessage]: The messages to send to the LLM.
+    """
+    turns = split_turns(messages)
+    last_turn = turns[-1] if turns else 0
+    window = [
+        compact_tool_message(m, tool_max_chars)
+        if isinstance(m, ToolMessage) and i < last_turn
+        else m
+        for i, m in enumerate(messages)
+    ]
+
+    header: list[BaseMessage] = [SystemMessage(content=system_prompt)]
+    if summary:
+        header.append(
+            SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")
+        )
+
+    budget = max(max_tokens - approximate_token_count(header), 0)
+
+    def _trim(candidates: list[BaseMessage]) -> list[BaseMessage]:
+        return _trim_messages(
+            candidates,
+            strategy="last",
+            token_counter=approximate_token_count,
+            max_tokens=budget,
+            start_on="human",
+            include_system=False,
+            allow_partial=False,
+        )
+
+    trimmed = _trim(window)
+    if not trimmed and messages:
+        # The latest turn alone exceeds the budget: compact its tool payloads
+        # too, and never send less than that turn.
+        window = [
+            compact_tool_message(m, tool_max_chars) if isinstance(m, ToolMessage) else m
+            for m in messages
+        ]
+        trimmed = _trim(window) or window[last_turn:]
+    return header + trimmed
@@ -0,0 +1,27 @@
+import os
+from typing import Optional
+
+try:
+    import psutil
+except Exception:
+    psutil = None
+
+
+def process_tree_rss_mb(pid: Optional[int] = None) -> float:
+    """
+    RSS d'un processus + ses enfants (Chromium, chromedriver) en Mo.
+    Mesure commune aux seuils de recyclage des workers et au pool de navigateurs.
+    """
+    if psutil is None:
+        return 0.0
+    try:
+        proc = psutil.Process(pid or os.getpid())
+        total = proc.memory_info().rss
+        for child in proc.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total / (1024 * 1024)
+    except Exception:
+        return 0.0
@@ -0,0 +1,76 @@
+import os
+import time
+import asyncio
+import threading
+from typing import Any, Dict, Optional
+
+
+class RequestBudget:
+    """
+    Budget de requêtes pour une session Facebook: débit (token bucket) et
+    plafond total optionnel.
+
+    Sans verrou asyncio: chaque acquire() réserve son jeton immédiatement
+    (le compteur peut passer en négatif) puis attend son tour. Plusieurs
+    coroutines, ou plusieurs threads, peuvent donc partager le même budget.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_requests: Optional[int] = None,
+    ):
+        self.rate = rate or float(os.getenv("FB_SESSION_RATE", 2))
+        self.burst = burst or int(os.getenv("FB_SESSION_BURST", 4))
+        self.max_requests = max_requests
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Métriques
+        self.used = 0
+        self.refused = 0
+        self.waited = 0.0
+
+    def _reserve(self) -> Optional[float]:
+        """Réserve un jeton; retourne l'attente en secondes, ou None si épuisé."""
+        with self._lock:
+            if self.max_requests is not None and self.used >= self.max_requests:
+                self.refused += 1
+                return None
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            self.used += 1
+            return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self) -> bool:
+        """Attend un jeton. Retourne False si le plafond total est atteint."""
+        wait = self._reserve()
+        if wait is None:
+            return False
+        if wait:
+            self.waited += wait
+            await asyncio.sleep(wait)
+        return True
+
+    @property
+    def exhausted(self) -> bool:
+        return self.max_requests is not None and self.used >= self.max_requests
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "used": self.used,
+            "refused": self.refused,
+            "max_requests": self.max_requests,
+            "waited_seconds": round(self.waited, 2),
+        }
+
+
+class RequestBudgetExhausted(Exception):
+    """Levée quand le plafond de requêtes d'une recherche est atteint."""
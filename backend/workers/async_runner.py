@@ -0,0 +1,401 @@
+import os
+import sys
+import time
+import socket
+import signal
+import asyncio
+import logging
+import traceback
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+from dotenv import load_dotenv
+from rq import Queue
+from rq.job import Job, JobStatus
+from rq.executions import Execution
+from rq.exceptions import NoSuchJobError
+from rq.registry import clean_registries
+from rq.utils import now
+
+# Ajouter le chemin du projet
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workers.scraping_workers import get_scraping_worker
+from services.browser_pool import browser_pool
+from services.http_pool import http_pool
+from workers.recycling import WorkerRecycler
+from utils.codec import rq_serializer
+from services.priority_queues import (
+    TierTracker,
+    WeightedQueueOrder,
+    scraping_queue_names,
+    tier_of_queue,
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+SCRAPE_JOB_FUNC = "workers.scraping_workers.scrape_listings_job"
+
+
+class AsyncJobRunner:
+    """
+    Mode worker alternatif: une seule event loop par processus exécute jusqu'à
+    N jobs de la queue RQ en parallèle (le scraping est I/O-bound).
+
+    - même payload que les workers RQ: scrape_listings_job(search_params, user_id)
+    - mêmes événements SSE (le pipeline est ScrapingWorker.scrape_listings_async)
+    - statut et résultat écrits dans le job RQ: get_job_status fonctionne tel quel
+    - job inscrit dans la StartedJobRegistry avec heartbeat: si le processus
+      meurt, le nettoyage des registres RQ le passe en échec
+    - timeout par job, annulation via job.cancel() ou à l'arrêt du processus
+    """
+
+    def __init__(
+        self,
+        queue_names: Optional[List[str]] = None,
+        concurrency: Optional[int] = None,
+        job_timeout: Optional[float] = None,
+    ):
+        self.redis_url = os.getenv("REDIS_URL")
+        # Connexion binaire: les jobs RQ sont sérialisés (pickle)
+        self.connection = redis.from_url(self.redis_url)
+        self.queue_names = queue_names or [
+            name.strip()
+            for name in os.getenv(
+                "WORKER_QUEUES", ",".join(scraping_queue_names())
+            ).split(",")
+            if name.strip()
+        ]
+        # Payloads/résultats compacts (utils/codec.py), comme SearchService
+        self.serializer = rq_serializer()
+        self.queues = [
+            Queue(name, connection=self.connection, serializer=self.serializer)
+            for name in self.queue_names
+        ]
+        # Round-robin pondéré entre niveaux, plafonds par niveau (services/priority_queues)
+        self.queue_order = WeightedQueueOrder()
+        self.tier_tracker = TierTracker(self.connection)
+
+        self.concurrency = concurrency or int(os.getenv("ASYNC_RUNNER_CONCURRENCY", 10))
+        self.job_timeout = job_timeout or float(os.getenv("ASYNC_RUNNER_JOB_TIMEOUT", 200))
+        self.dequeue_timeout = int(os.getenv("ASYNC_RUNNER_DEQUEUE_TIMEOUT", 5))
+        self.shutdown_grace = float(os.getenv("ASYNC_RUNNER_SHUTDOWN_GRACE", 30))
+        self.result_ttl = int(os.getenv("ASYNC_RUNNER_RESULT_TTL", 500))
+        # Heartbeat des jobs en cours; sans heartbeat pendant heartbeat_ttl,
+        # StartedJobRegistry.cleanup considère le job abandonné (comme RQ)
+        self.heartbeat_interval = int(os.getenv("ASYNC_RUNNER_HEARTBEAT", 30))
+        self.heartbeat_ttl = self.heartbeat_interval + 60
+        # Nettoyage des registres (jobs abandonnés -> failed), même cadence que RQ
+        self.maintenance_interval = int(os.getenv("ASYNC_RUNNER_MAINTENANCE", 600))
+
+        self.name = f"async-runner.{socket.gethostname()}.{os.getpid()}"
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # job_id -> (job, exécution RQ) des jobs en cours, pour le heartbeat
+        self._executions: Dict[str, Tuple[Job, Execution]] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._stopping = False
+        self.recycler = WorkerRecycler()
+
+        # Métriques
+        self.jobs_started = 0
+        self.jobs_succeeded = 0
+        self.jobs_failed = 0
+        self.jobs_cancelled = 0
+
+    def request_stop(self) -> None:
+        """Arrête de consommer la queue; les jobs en cours ont un délai de grâce."""
+        if not self._stopping:
+            logger.info(
+                "[AsyncJobRunner] arrêt demandé, %d jobs en cours", len(self._tasks)
+            )
+        self._stopping = True
+
+    def cancel(self, job_id: str) -> bool:
+        """Annule un job en cours dans ce processus."""
+        task = self._tasks.get(job_id)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+        # Contexte de scraping du processus, branché sur cette loop
+        self.worker = get_scraping_worker()
+        self.worker.attach_loop(loop)
+        await asyncio.to_thread(self.worker._init_scraper)
+
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.request_stop)
+
+        logger.info(
+            "[AsyncJobRunner] %s écoute %s (concurrence=%d, timeout=%ss)",
+            self.name,
+            ",".join(self.queue_names),
+            self.concurrency,
+            self.job_timeout,
+        )
+        watcher = asyncio.create_task(self._watch_cancellations())
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            while not self._stopping:
+                await self._slots.acquire()
+                if self._stopping:
+                    self._slots.release()
+                    break
+                try:
+                    dequeued = await asyncio.to_thread(self._dequeue)
+                except Exception as e:
+                    self._slots.release()
+                    logger.error("[AsyncJobRunner] erreur de dequeue: %s", e)
+                    await asyncio.sleep(1)
+                    continue
+                if dequeued is None:
+                    self._slots.release()
+                    continue
+
+                job, queue = dequeued
+                task = asyncio.create_task(self._run_job(job, queue))
+                self._tasks[job.id] = task
+                task.add_done_callback(
+                    lambda _t, job_id=job.id: self._on_job_done(job_id)
+                )
+        finally:
+            watcher.cancel()
+            await self._drain()
+            heartbeat.cancel()
+            await browser_pool.close()
+            await http_pool.aclose()
+            self.worker.shutdown()
+            logger.info("[AsyncJobRunner] arrêté: %s", self.stats())
+
+    def _on_job_done(self, job_id: str) -> None:
+        self._tasks.pop(job_id, None)
+        self._slots.release()
+
+    def _dequeue(self):
+        """
+        BLPOP sur les queues (thread): retourne (job, queue) ou None.
+        L'ordre des queues est recalculé à chaque appel (niveaux pondérés,
+        niveaux saturés exclus).
+        Le job est marqué démarré aussitôt, pour qu'il ne reste jamais hors
+        de toute queue et de tout registre.
+        """
+        by_name = {queue.name: queue for queue in self.queues}
+        while True:
+            names = self.queue_order.order(
+                self.queue_names, blocked=self.tier_tracker.saturated_tiers()
+            )
+            if not names:
+                time.sleep(self.dequeue_timeout)
+                return None
+            keys = [by_name[name].key for name in names]
+            popped = self.connection.blpop(keys, timeout=self.dequeue_timeout)
+            if popped is None:
+                return None
+            queue_key, job_id = (v.decode() if isinstance(v, bytes) else v for v in popped)
+            queue = next(q for q in self.queues if q.key == queue_key)
+            try:
+                job = Job.fetch(
+                    job_id, connection=self.connection, serializer=self.serializer
+                )
+                self._mark_started(job)
+                return job, queue
+            except NoSuchJobError:
+                # Job expiré/supprimé entre-temps: on passe au suivant
+                continue
+
+    async def _run_job(self, job: Job, queue: Queue) -> None:
+        tier = tier_of_queue(queue.name)
+        if tier:
+            await asyncio.to_thread(
+                self.tier_tracker.job_started, tier, job.id, job.enqueued_at
+            )
+        try:
+            await self._execute_job(job, queue)
+        finally:
+            if tier:
+                await asyncio.to_thread(self.tier_tracker.job_finished, tier, job.id)
+            # Seuil atteint: plus de nouveaux jobs, les jobs en cours se terminent
+            reason = await asyncio.to_thread(
+                self.recycler.job_done, browser_pool.pages_served
+            )
+            if reason:
+                self.request_stop()
+
+    async def _execute_job(self, job: Job, queue: Queue) -> None:
+        self.jobs_started += 1
+        timeout = job.timeout if job.timeout and job.timeout > 0 else self.job_timeout
+        logger.info("[AsyncJobRunner] job %s démarré (%s)", job.id, job.func_name)
+
+        try:
+            if job.func_name == SCRAPE_JOB_FUNC:
+                search_params, user_id = job.args[:2]
+                coro = self.worker.scrape_listings_async(
+                    search_params, user_id, job.id, timeout=timeout
+                )
+            else:
+                # Autre fonction: exécution classique dans un thread
+                coro = asyncio.to_thread(job.func, *job.args, **job.kwargs)
+            # Marge pour laisser le pipeline publier son propre timeout
+            result = await asyncio.wait_for(coro, timeout=timeout + 10)
+        except asyncio.CancelledError:
+            self.jobs_cancelled += 1
+            await asyncio.to_thread(self._mark_failed, job, "Job annulé")
+            raise
+        except Exception:
+            self.jobs_failed += 1
+            await asyncio.to_thread(self._mark_failed, job, traceback.format_exc())
+            logger.error("[AsyncJobRunner] job %s en échec", job.id)
+            return
+
+        self.jobs_succeeded += 1
+        await asyncio.to_thread(self._mark_finished, job, result)
+        logger.info("[AsyncJobRunner] job %s terminé", job.id)
+
+    def _mark_started(self, job: Job) -> None:
+        """Statut started + exécution inscrite dans la StartedJobRegistry (rq.executions)."""
+        with self.connection.pipeline() as pipeline:
+            job.prepare_for_execution(self.name, pipeline=pipeline)
+            job.heartbeat(now(), self.heartbeat_ttl, pipeline=pipeline)
+            execution = Execution.create(
+                job, self.heartbeat_ttl, pipeline=pipeline, worker_name=self.name
+            )
+            pipeline.execute()
+        self._executions[job.id] = (job, execution)
+
+    def _end_execution(self, job: Job, pipeline) -> Optional[Execution]:
+        """Retire l'exécution du job de la StartedJobRegistry."""
+        _, execution = self._executions.pop(job.id, (None, None))
+        if execution is not None:
+            execution.delete(job, pipeline=pipeline)
+        return execution
+
+    def _mark_finished(self, job: Job, result: Any) -> None:
+        job.ended_at = datetime.now(timezone.utc)
+        job._result = result
+        with self.connection.pipeline() as pipeline:
+            execution = self._end_execution(job, pipeline)
+            job._handle_success(
+                job.get_result_ttl(self.result_ttl),
+                pipeline=pipeline,
+                worker_name=self.name,
+                execution_id=execution.id if execution else None,
+                execution_started_at=execution.created_at if execution else None,
+                execution_ended_at=job.ended_at,
+            )
+            pipeline.execute()
+
+    def _mark_failed(self, job: Job, exc_string: str) -> None:
+        job.ended_at = datetime.now(timezone.utc)
+        with self.connection.pipeline() as pipeline:
+            execution = self._end_execution(job, pipeline)
+            job.set_status(JobStatus.FAILED, pipeline=pipeline)
+            job._handle_failure(
+                exc_string,
+                pipeline=pipeline,
+                worker_name=self.name,
+                execution_id=execution.id if execution else None,
+                execution_started_at=execution.created_at if execution else None,
+                execution_ended_at=job.ended_at,
+            )
+            pipeline.execute()
+
+    async def _heartbeat(self) -> None:
+        """
+        Prolonge régulièrement les jobs en cours dans la StartedJobRegistry,
+        et nettoie les registres des queues (jobs d'un processus mort).
+        """
+        last_cleaned = 0.0
+        while True:
+            try:
+                if self._executions:
+                    await asyncio.to_thread(self._send_heartbeats)
+                if time.monotonic() - last_cleaned >= self.maintenance_interval:
+                    await asyncio.to_thread(self._clean_registries)
+                    last_cleaned = time.monotonic()
+            except Exception as e:
+                logger.warning("[AsyncJobRunner] heartbeat impossible: %s", e)
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def _clean_registries(self) -> None:
+        for queue in self.queues:
+            clean_registries(queue)
+
+    def _send_heartbeats(self) -> None:
+        timestamp = now()
+        with self.connection.pipeline() as pipeline:
+            for job, execution in list(self._executions.values()):
+                execution.heartbeat(
+                    job.started_job_registry, self.heartbeat_ttl, pipeline=pipeline
+                )
+                job.heartbeat(timestamp, self.heartbeat_ttl, pipeline=pipeline)
+            pipeline.execute()
+
+    async def _watch_cancellations(self) -> None:
+        """Annule les jobs en cours dont le statut RQ est passé à canceled/stopped."""
+        while True:
+            await asyncio.sleep(2)
+            job_ids = list(self._tasks)
+            if not job_ids:
+                continue
+            try:
+                statuses = await asyncio.to_thread(self._fetch_statuses, job_ids)
+            except Exception as e:
+                logger.warning("[AsyncJobRunner] lecture des statuts impossible: %s", e)
+                continue
+            for job_id, status in zip(job_ids, statuses):
+                if status in (JobStatus.CANCELED.value, JobStatus.STOPPED.value):
+                    logger.info("[AsyncJobRunner] job %s annulé (%s)", job_id, status)
+                    self.cancel(job_id)
+
+    def _fetch_statuses(self, job_ids: List[str]) -> List[Optional[str]]:
+        with self.connection.pipeline() as pipeline:
+            for job_id in job_ids:
+                pipeline.hget(Job.key_for(job_id), "status")
+            raw = pipeline.execute()
+        return [v.decode() if isinstance(v, bytes) else v for v in raw]
+
+    async def _drain(self) -> None:
+        """Laisse finir les jobs en cours, puis annule ceux qui dépassent la grâce."""
+        tasks = list(self._tasks.values())
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=self.shutdown_grace)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning("[AsyncJobRunner] %d jobs annulés à l'arrêt", len(pending))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "in_flight": len(self._tasks),
+            "concurrency": self.concurrency,
+            "jobs_started": self.jobs_started,
+            "jobs_succeeded": self.jobs_succeeded,
+            "jobs_failed": self.jobs_failed,
+            "jobs_cancelled": self.jobs_cancelled,
+        }
+
+
+def start_async_runner():
+    """
+    Point d'entrée du mode asyncio (WORKER_MODE=async)
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(process)d - %(message)s",
+    )
+    asyncio.run(AsyncJobRunner().run())
+
+
+if __name__ == "__main__":
+    start_async_runner()
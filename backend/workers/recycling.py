@@ -0,0 +1,105 @@
+import os
+import time
+import logging
+from typing import Dict, Optional
+
+import redis
+
+from utils.process import process_tree_rss_mb
+
+logger = logging.getLogger(__name__)
+
+
+STATS_KEY_PREFIX = "worker:stats:"
+RECYCLES_KEY = "worker:recycles"
+STATS_TTL = 24 * 3600
+
+
+def stats_key(pid: int) -> str:
+    """Hash Redis des compteurs d'un processus worker."""
+    return f"{STATS_KEY_PREFIX}{pid}"
+
+
+class WorkerRecycler:
+    """
+    Compteurs d'un processus worker, évalués entre deux jobs: au-delà d'un
+    seuil (jobs, pages de navigateur, RSS de l'arbre de processus) le worker
+    doit s'arrêter proprement pour être remplacé par le superviseur.
+
+    Les compteurs et la raison du recyclage sont publiés dans
+    worker:stats:{pid}, lu par scripts/start_workers.py.
+    """
+
+    def __init__(
+        self,
+        max_jobs: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        max_rss_mb: Optional[float] = None,
+    ):
+        self.max_jobs = max_jobs or int(os.getenv("WORKER_MAX_JOBS", 1000))
+        self.max_pages = max_pages or int(os.getenv("WORKER_MAX_PAGES", 2000))
+        self.max_rss_mb = max_rss_mb or float(os.getenv("WORKER_MAX_RSS_MB", 2500))
+
+        self.pid = os.getpid()
+        self.started_at = time.time()
+        self.jobs = 0
+        self.pages = 0
+        self.rss_mb = 0.0
+        self.reason: Optional[str] = None
+
+        try:
+            self.redis_client = redis.from_url(os.getenv("REDIS_URL", ""), decode_responses=True)
+        except Exception:
+            self.redis_client = None
+
+    def job_done(self, pages: int = 0) -> Optional[str]:
+        """
+        À appeler à la fin de chaque job. `pages` est le total de pages
+        servies par le processus. Retourne la raison du recyclage, ou None.
+        """
+        self.jobs += 1
+        self.pages = pages
+        self.rss_mb = process_tree_rss_mb(self.pid)
+
+        if self.reason is None:
+            if self.rss_mb >= self.max_rss_mb:
+                self.reason = "rss"
+            elif self.pages >= self.max_pages:
+                self.reason = "pages"
+            elif self.jobs >= self.max_jobs:
+                self.reason = "jobs"
+            if self.reason:
+                logger.info(
+                    "Recyclage du worker %s (%s): %d jobs, %d pages, %.0f Mo",
+                    self.pid,
+                    self.reason,
+                    self.jobs,
+                    self.pages,
+                    self.rss_mb,
+                )
+
+        self.publish()
+        return self.reason
+
+    def publish(self) -> None:
+        if self.redis_client is None:
+            return
+        try:
+            key = stats_key(self.pid)
+            with self.redis_client.pipeline(transaction=False) as pipeline:
+                pipeline.hset(key, mapping=self.stats())
+                pipeline.expire(key, STATS_TTL)
+                pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Publication des stats du worker impossible: {e}")
+
+    def stats(self) -> Dict[str, str]:
+        return {
+            "pid": str(self.pid),
+            "jobs": str(self.jobs),
+            "pages": str(self.pages),
+            "rss_mb": f"{self.rss_mb:.1f}",
+            "started_at": str(int(self.started_at)),
+            "updated_at": str(int(time.time())),
+            "recycle_reason": self.reason or "",
+        }
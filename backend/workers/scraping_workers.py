@@ -5,11 +5,13 @@ import logging
 import time
 from dotenv import load_dotenv
 import asyncio
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from typing import Dict, Any, List, Optional
 import redis
-from rq import Worker, Queue, get_current_job
-import signal
+import rq
+from rq import SimpleWorker, Queue, get_current_job
 import multiprocessing
 from datetime import datetime
 
@@ -19,11 +21,23 @@ multiprocessing.set_start_method("spawn", force=True)
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from agents.tools.searchFacebook import SearchFacebook
-from agents.tools.googlePlaces import GooglePlaces
+from agents.tools.googlePlaces import GooglePlaces, PlacesError
 from services.search_service import SearchService
 from models.fb_sessions import FacebookSessionModel
 from sessionManager import SessionsManager
 from utils.event_publisher import EventPublisher
+from services.browser_pool import browser_pool
+from services.http_pool import http_pool
+from utils.geo_tiling import bbox_from_polygon, plan_tiles
+from utils.deadline import Deadline, DeadlineExceeded
+from workers.recycling import WorkerRecycler
+from utils.codec import rq_serializer
+from services.priority_queues import (
+    TierTracker,
+    WeightedQueueOrder,
+    scraping_queue_names,
+    tier_of_queue,
+)
 
 load_dotenv()
 
@@ -36,11 +50,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# ScrapingRQWorker surcharge reorder_queues/_ordered_queues: version épinglée
+# dans requirements.txt, à revalider à chaque montée de rq
+RQ_SUPPORTED = "2.12"
+
+
+class ScrapeError(Exception):
+    """Échec du scraping Facebook (session, GraphQL, proxy...)."""
+
+    def __init__(self, error: Exception, message: str):
+        super().__init__(str(error))
+        self.message = message
+
 
 class ScrapingWorker:
     """
     Working RQ avec ThreadPoolExecutor pour gérer 50-100 requêtes/seconde.
     utilise des threads pour le scraping concurrentet des processus pour l'isolation
+
+    Une seule instance par processus (voir get_scraping_worker): clients Redis,
+    scrapers, pools de navigateurs/HTTP et event loop restent chauds d'un job
+    à l'autre.
     """
 
     def __init__(self):
@@ -65,17 +95,69 @@ class ScrapingWorker:
         self.start_time = time.time()
         self._event_publisher = EventPublisher()
 
-        # Gestion des signaux pour arrêt propre
-        signal.signal(signal.SIGTERM, self._handle_shutdown)
-        signal.signal(signal.SIGINT, self._handle_shutdown)
+        # Event loop persistante (thread dédié) partagée par tous les jobs.
+        # Les signaux sont gérés par le worker RQ, pas ici.
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+        self._owns_loop = False
 
-    def _handle_shutdown(self, signum, frame):
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
         """
-        Arrêt propre du worker
+        Démarre l'event loop du processus au premier besoin
         """
-        logger.info(f"Signal {signum} reçu. Arrêt en cours...")
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="scraper-loop", daemon=True
+                )
+                thread.start()
+                self._loop, self._loop_thread = loop, thread
+                self._owns_loop = True
+                logger.info("Event loop de scraping démarrée")
+            return self._loop
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Utilise une loop déjà en marche (runner asyncio) au lieu du thread dédié
+        """
+        with self._loop_lock:
+            self._loop = loop
+            self._loop_thread = None
+            self._owns_loop = False
+
+    def run_async(self, coro, timeout: Optional[float] = None):
+        """
+        Exécute une coroutine sur l'event loop persistante et attend son résultat
+        (appelable depuis n'importe quel thread sauf celui de la loop).
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def shutdown(self):
+        """
+        Arrêt propre: ferme les pools liés à la loop, la loop et les threads.
+        Une loop attachée (attach_loop) reste à la charge de son propriétaire.
+        """
+        logger.info("Arrêt du contexte de scraping...")
+        loop = self._loop
+        if self._owns_loop and loop is not None and not loop.is_closed():
+            try:
+                self.run_async(browser_pool.close(), timeout=30)
+                self.run_async(http_pool.aclose(), timeout=10)
+            except Exception as e:
+                logger.warning(f"Erreur à la fermeture des pools: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+            if self._loop_thread is not None:
+                self._loop_thread.join(timeout=10)
+            loop.close()
+        self._loop = None
         self.thread_pool.shutdown(wait=True)
-        sys.exit(0)
 
     def _init_scraper(self):
         """
@@ -91,6 +173,184 @@ class ScrapingWorker:
             logger.error(f"Erreur lors de l'initialisation des scrapers: {e}")
             raise
 
+    def _resolve_search_area(
+        self, search_params: dict[str, Any], job_id: str, deadline: Deadline
+    ):
+        """
+        Point(s) de recherche: tuiles si bbox/polygone, sinon un lieu Google Places.
+        Retourne (lat, lon, tiles). Appel bloquant (Google Places).
+        """
+        city = search_params.get("city", "")
+        location_near = search_params.get("location_near", [])
+        bbox = search_params.get("bbox")
+        polygon = search_params.get("polygon")
+
+        if bbox or polygon:
+            # Zone étendue: couverture par tuiles au lieu d'un seul point
+            tiles = plan_tiles(
+                bbox=bbox,
+                polygon=polygon,
+                radius_m=int(os.getenv("FB_SEARCH_RADIUS_M", 4000)),
+                max_tiles=int(os.getenv("FB_MAX_TILES", 60)),
+            )
+            min_lat, min_lon, max_lat, max_lon = (
+                bbox_from_polygon(polygon) if polygon else bbox
+            )
+            logger.info(f"[{job_id}] Zone découpée en {len(tiles)} tuiles")
+            return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2, tiles
+
+        logger.info(f"[{job_id}] Recherche de Google Places {city}")
+        deadline.check("places")
+        # Client async partagé (keep-alive, appels identiques fusionnés),
+        # exécuté sur la loop persistante du worker
+        try:
+            places_results = self.run_async(
+                self.google_places.search_async(
+                    city, location_near, timeout=deadline.timeout(cap=10)
+                ),
+                timeout=deadline.timeout(cap=10) + 1,
+            )
+        except (PlacesError, FutureTimeoutError) as e:
+            logger.warning(f"[{job_id}] Google Places indisponible: {e}")
+            places_results = None
+
+        places = places_results.located if places_results else []
+        if not places:
+            if deadline.expired:
+                raise DeadlineExceeded("places")
+            # Cache négatif: lieu inexistant (TTL long) ou API indisponible (TTL court)
+            self.search_service._write_negative(
+                self.search_service._generate_cache_key(search_params),
+                "place_not_found" if places_results is not None else "places_unavailable",
+                {"city": city, "location_near": location_near},
+            )
+            error_msg = f"Aucune place trouvée pour {city}"
+            error_payload = {
+                "error": error_msg,
+                "message": "Aucun lieu trouvé pour cette ville",
+                "timestamp": datetime.now().isoformat(),
+                "retry_possible": True,
+            }
+            self._event_publisher.publish(job_id, "error", error_payload)
+            raise Exception(error_msg)
+
+        max_anchors = int(
+            search_params.get("max_anchors") or os.getenv("FB_MAX_ANCHORS", 3)
+        )
+        if max_anchors > 1 and len(places) > 1:
+            # Fan-out: une recherche autour de chacun des N premiers lieux,
+            # fusionnées par _id (voir SearchFacebook.iter_tiled_listings)
+            anchors = [
+                {
+                    "lat": place.location.latitude,
+                    "lon": place.location.longitude,
+                    "radius_m": int(os.getenv("FB_SEARCH_RADIUS_M", 4000)),
+                    "anchor": place.display_name or "",
+                    # Rang Google: départage les annonces trouvées par plusieurs lieux
+                    "anchor_rank": rank,
+                }
+                for rank, place in enumerate(places[:max_anchors])
+            ]
+            logger.info(
+                f"[{job_id}] Recherche autour de {len(anchors)} lieux: "
+                f"{[a['anchor'] for a in anchors]}"
+            )
+            return anchors[0]["lat"], anchors[0]["lon"], anchors
+
+        # Un seul point: le lieu le mieux classé (résultat stable d'un run à l'autre)
+        selected_place = places[0]
+
+        lat = selected_place.location.latitude
+        lon = selected_place.location.longitude
+        return lat, lon, None
+
+    def _publish_processing(self, search_params, job_id, lat, lon, tiles):
+        payload = {
+            "status": "processing",
+            "message": f"Scraping en cours pour {search_params.get('city', '')}",
+            "coordinates": {"lat": lat, "lon": lon},
+        }
+        if tiles:
+            payload["tiles"] = len(tiles)
+            anchors = [t["anchor"] for t in tiles if t.get("anchor") is not None]
+            if anchors:
+                payload["anchors"] = anchors
+
+        self._event_publisher.publish(job_id, "progress", payload)
+
+        logger.info(f"[{job_id}] Coordonnées: lat={lat}, lon={lon}\n")
+        logger.info(f"[{job_id}] Début scraping Facebook\n")
+
+    def _complete_job(
+        self, job_id, cache_key, listings, start_time, lat, lon, deadline=None
+    ):
+        """
+        Succès: cache, libération du marqueur single-flight, événement completed.
+        Si l'échéance a coupé une étape, le résultat est marqué partial.
+        """
+        partial = deadline is not None and deadline.partial
+        logger.info(
+            f"[{job_id}] Scraping terminé: {len(listings)} listings"
+            + (f" (partiel: {', '.join(deadline.cut_stages)})" if partial else "")
+            + "\n"
+        )
+
+        # Mettre en cache le résultat. Zéro annonce sans coupure: entrée
+        # négative (TTL court) au lieu d'un résultat vide; partiel vide: rien.
+        # Les échecs de scraping passent par _fail_job (scrape_failed)
+        if listings:
+            self.search_service._write_cache(cache_key, listings, partial=partial)
+        elif not partial:
+            self.search_service._write_negative(cache_key, "no_listings")
+
+        # Nettoyer de la clé job
+        self.redis_client.delete(f"job:{cache_key}")
+
+        self.jobs_processed += 1
+        elapsed = time.time() - start_time
+        logger.info(f"[{job_id}] Job terminé en {elapsed:.2f}s\n")
+        payload = {
+            "listings": listings,
+            "processing_time": elapsed,
+            "coordinates": {"lat": lat, "lon": lon},
+            "partial": partial,
+        }
+        self._event_publisher.publish(job_id, "completed", payload)
+
+        return {
+            "status": "success",
+            "listings": listings,
+            "count": len(listings),
+            "processing_time": elapsed,
+            "coordinates": {"lat": lat, "lon": lon},
+            "partial": partial,
+        }
+
+    def _fail_job(
+        self, job_id, cache_key, error, message, retry_possible, cache_negative=True
+    ):
+        """
+        Échec: libère le marqueur pour que la prochaine requête relance un job
+        """
+        self.jobs_failed += 1
+        # Brève entrée négative: les retries immédiats ne relancent pas un job.
+        # Ne remplace pas une raison plus précise (place_not_found...)
+        if cache_negative:
+            try:
+                self.search_service._write_negative(
+                    cache_key, "scrape_failed", {"error": str(error)}, overwrite=False
+                )
+            except Exception as e:
+                logger.warning(f"[{job_id}] Cache négatif non écrit: {e}")
+        self.redis_client.delete(f"job:{cache_key}")
+        error_payload = {
+            "error": str(error),
+            "message": message,
+            "timestamp": datetime.now().isoformat(),
+            "retry_possible": retry_possible,
+        }
+        self._event_publisher.publish(job_id, "error", error_payload)
+
     def scrape_listings(
         self, search_params: dict[str, Any], user_id: str
     ) -> List[dict[str, Any]]:
@@ -100,142 +360,153 @@ class ScrapingWorker:
         start_time = time.time()
         rq_job = get_current_job()
         job_id = rq_job.id if rq_job else f"{user_id[:8]}_{int(time.time())}"
+        cache_key = self.search_service._generate_cache_key(search_params)
+        deadline = Deadline.from_params(search_params)
 
         try:
-            logger.info(f"Worker démarré pour user {user_id[:8]}\n")
+            logger.info(f"Worker démarré pour user {user_id[:8]} ({deadline})\n")
             self._event_publisher.publish(
                 job_id, "start", {"message": "Démarrage du scraping"}
             )
             self._init_scraper()
 
-            city = search_params.get("city", "")
-            min_bedrooms = search_params.get("min_bedrooms", 1)
-            max_bedrooms = search_params.get("max_bedrooms", 5)
-            min_price = search_params.get("min_price", 0)
-            max_price = search_params.get("max_price", 10000)
-            location_near = search_params.get("location_near", [])
-            enrich_top_k = search_params.get("enrich_top_k", 4)
-
-            logger.info(f"[{job_id}] Recherche de Google Places {city}")
-            places_results = self.google_places.execute(city, location_near)
-
-            if not places_results.get("places"):
-                error_msg = f"Aucune place trouvée pour {city}"
-                error_payload = {
-                    "error": error_msg,
-                    "message": "Aucun lieu trouvé pour cette ville",
-                    "timestamp": datetime.now().isoformat(),
-                    "retry_possible": True,
-                }
-                self._event_publisher.publish(job_id, "error", error_payload)
-                raise Exception(error_msg)
-
-            import random
-
-            selected_place = random.choice(places_results["places"])
-
-            lat = selected_place["location"]["latitude"]
-            lon = selected_place["location"]["longitude"]
-
-            payload = {
-                "status": "processing",
-                "message": f"Scraping en cours pour {city}",
-                "coordinates": {"lat": lat, "lon": lon},
-            }
-
-            self._event_publisher.publish(job_id, "progress", payload)
-
-            # 2. Scraping Facebook avec ThreadPoolExecutor
-            logger.info(f"[{job_id}] Coordonnées: lat={lat}, lon={lon}\n")
-
-            logger.info(f"[{job_id}] Début scraping Facebook\n")
+            try:
+                lat, lon, tiles = self._resolve_search_area(
+                    search_params, job_id, deadline
+                )
+            except DeadlineExceeded:
+                deadline.cut("places")
+                return self._complete_job(
+                    job_id, cache_key, [], start_time, None, None, deadline
+                )
+            self._publish_processing(search_params, job_id, lat, lon, tiles)
 
             # Utiliser le ThreadPool pour le scraping concurrent
             future = self.thread_pool.submit(
                 self._scrape_facebook_sync,
-                lat,
-                lon,
-                min_price,
-                max_price,
-                min_bedrooms,
-                max_bedrooms,
+                search_params,
                 user_id,
-                enrich_top_k,
                 job_id,  # pass job_id for progress callback
+                lat,
+                lon,
+                tiles,
+                deadline,
+            )
+
+            # Le pipeline s'arrête de lui-même à l'échéance: ce délai
+            # n'est qu'un filet de sécurité
+            listings = future.result(timeout=deadline.remaining() + 10)
+            return self._complete_job(
+                job_id, cache_key, listings, start_time, lat, lon, deadline
+            )
+        except ScrapeError as e:
+            logger.error(f"[{job_id}] Erreur scraping: {e}")
+            self._fail_job(job_id, cache_key, e, e.message, True)
+            raise
+        except FutureTimeoutError:
+            logger.error(f"[{job_id}] Timeout scraping")
+            self._fail_job(
+                job_id, cache_key, "timeout", "Délai de scraping dépassé", True
+            )
+            raise
+        except Exception as e:
+            logger.error(f"[{job_id}] Erreur fatale: {e}")
+            self._fail_job(
+                job_id, cache_key, e, "Erreur fatale lors du scraping", False
+            )
+            raise
+
+    async def scrape_listings_async(
+        self,
+        search_params: dict[str, Any],
+        user_id: str,
+        job_id: str,
+        timeout: Optional[float] = None,
+    ) -> dict[str, Any]:
+        """
+        Même pipeline que scrape_listings, en coroutine: utilisé par le runner
+        asyncio (workers/async_runner.py) qui exécute plusieurs jobs par loop.
+        Les étapes bloquantes (Google Places, Mongo) passent par un thread.
+        """
+        start_time = time.time()
+        cache_key = self.search_service._generate_cache_key(search_params)
+        deadline = Deadline.from_params(search_params)
+        if timeout:
+            deadline.expires_at = min(deadline.expires_at, time.time() + timeout)
+
+        try:
+            logger.info(f"Worker démarré pour user {user_id[:8]} ({deadline})\n")
+            self._event_publisher.publish(
+                job_id, "start", {"message": "Démarrage du scraping"}
             )
+            await asyncio.to_thread(self._init_scraper)
 
             try:
-                listings = future.result(
-                    timeout=200
-                )  # timeout 25s pour laisser 5s de marge
-                logger.info(f"[{job_id}] Scraping terminé: {len(listings)} listings\n")
-
-                # Mettre en cache le résultat
-                cache_key = self.search_service._generate_cache_key(search_params)
-                self.redis_client.setex(
-                    cache_key,
-                    300,  # TTL 5 minutes
-                    json.dumps(listings),
+                lat, lon, tiles = await asyncio.to_thread(
+                    self._resolve_search_area, search_params, job_id, deadline
+                )
+            except DeadlineExceeded:
+                deadline.cut("places")
+                return self._complete_job(
+                    job_id, cache_key, [], start_time, None, None, deadline
                 )
+            self._publish_processing(search_params, job_id, lat, lon, tiles)
+
+            # Le pipeline s'arrête de lui-même à l'échéance: filet de sécurité
+            listings = await asyncio.wait_for(
+                self._scrape_facebook_async(
+                    search_params, user_id, job_id, lat, lon, tiles, deadline
+                ),
+                timeout=deadline.remaining() + 10,
+            )
+            return self._complete_job(
+                job_id, cache_key, listings, start_time, lat, lon, deadline
+            )
 
-                # Nettoyer de la clé job
-                job_key = f"job:{cache_key}"
-                self.redis_client.delete(job_key)
-
-                self.jobs_processed += 1
-                elapsed = time.time() - start_time
-                logger.info(f"[{job_id}] Job terminé en {elapsed:.2f}s\n")
-                payload = {
-                    
-                    "listings": listings,
-                    "processing_time": elapsed,
-                    "coordinates": {"lat": lat, "lon": lon},
-                }
-                self._event_publisher.publish(job_id, "completed", payload)
-
-                return {
-                    "status": "success",
-                    "listings": listings,
-                    "count": len(listings),
-                    "processing_time": elapsed,
-                    "coordinates": {"lat": lat, "lon": lon},
-                }
-            except Exception as e:
-                logger.error(f"[{job_id}] Timeout ou erreur scraping {e}")
-                self.jobs_failed += 1
-                logger.error(f"[{job_id}] Erreur scraping: {e}")
-                error_payload = {
-                    "error": str(e),
-                    "message": "Erreur lors du scraping Facebook",
-                    "timestamp": datetime.now().isoformat(),
-                    "retry_possible": True,
-                }
-                self._event_publisher.publish(job_id, "error", error_payload)
-                raise
+        except ScrapeError as e:
+            logger.error(f"[{job_id}] Erreur scraping: {e}")
+            self._fail_job(job_id, cache_key, e, e.message, True)
+            raise
+        except asyncio.TimeoutError:
+            logger.error(f"[{job_id}] Timeout scraping")
+            self._fail_job(
+                job_id, cache_key, "timeout", "Délai de scraping dépassé", True
+            )
+            raise
+        except asyncio.CancelledError:
+            logger.warning(f"[{job_id}] Job annulé")
+            self._fail_job(
+                job_id,
+                cache_key,
+                "cancelled",
+                "Scraping interrompu",
+                True,
+                cache_negative=False,
+            )
+            raise
         except Exception as e:
-            self.jobs_failed += 1
             logger.error(f"[{job_id}] Erreur fatale: {e}")
-            error_payload = {
-                "error": str(e),
-                "message": "Erreur fatale lors du scraping",
-                "timestamp": datetime.now().isoformat(),
-                "retry_possible": False,
-            }
-            self._event_publisher.publish(job_id, "error", error_payload)
+            self._fail_job(
+                job_id, cache_key, e, "Erreur fatale lors du scraping", False
+            )
             raise
 
-    def check_user_session(self, user_id: str) -> dict:
+    def check_user_session(
+        self, user_id: str, deadline: Optional[Deadline] = None
+    ) -> dict:
         """
         Vérifie et crée une session Facebook pour l'utilisateur si nécessaire.
 
         Args:
             user_id: Identifiant de l'utilisateur
+            deadline: Échéance du job; création et attentes bornées au temps restant
 
         Returns:
             dict: Session Facebook avec headers, payload, variables
 
         Raises:
             Exception: Si impossible de créer/récupérer la session après 3 tentatives
+            DeadlineExceeded: Si l'échéance ne laisse pas le temps d'une nouvelle tentative
         """
         max_retries = 3
         retry_count = 0
@@ -253,31 +524,23 @@ class ScrapingWorker:
                     f"[{user_id[:8]}] Aucune session trouvée, création en cours..."
                 )
 
-                # Créer un event loop pour ce thread (comme dans _scrape_facebook_sync)
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-
-                try:
-                    # Créer la session de manière asynchrone
-                    session_manager = SessionsManager()
-                    success = loop.run_until_complete(
-                        session_manager.create_session_for_user(user_id)
-                    )
+                # Créer la session de manière asynchrone sur la loop du processus
+                session_manager = SessionsManager()
+                success = self.run_async(
+                    session_manager.create_session_for_user(user_id),
+                    timeout=deadline.timeout() if deadline else None,
+                )
 
-                    if success:
-                        # Vérifier que la session a bien été créée
-                        session = FacebookSessionModel().get_session(user_id)
-                        if session is not None:
-                            logger.info(f"[{user_id[:8]}] Session créée avec succès")
-                            return session
-                        else:
-                            raise Exception("Session créée mais non trouvée en base")
+                if success:
+                    # Vérifier que la session a bien été créée
+                    session = FacebookSessionModel().get_session(user_id)
+                    if session is not None:
+                        logger.info(f"[{user_id[:8]}] Session créée avec succès")
+                        return session
                     else:
-                        raise Exception("Échec de la création de session")
-
-                finally:
-                    # Nettoyer l'event loop
-                    loop.close()
+                        raise Exception("Session créée mais non trouvée en base")
+                else:
+                    raise Exception("Échec de la création de session")
 
             except Exception as e:
                 retry_count += 1
@@ -295,6 +558,8 @@ class ScrapingWorker:
 
                 # Attendre avant de réessayer (backoff exponentiel)
                 wait_time = 2**retry_count
+                if deadline is not None and not deadline.allows(wait_time):
+                    raise DeadlineExceeded("session")
                 logger.info(f"[{user_id[:8]}] Attente de {wait_time}s avant retry...")
                 time.sleep(wait_time)
 
@@ -303,20 +568,42 @@ class ScrapingWorker:
 
     def _scrape_facebook_sync(
         self,
+        search_params: dict[str, Any],
+        user_id: str,
+        job_id: str,
         lat: float,
         lon: float,
-        min_price: float,
-        max_price: float,
-        min_bedrooms: int,
-        max_bedrooms: int,
+        tiles: Optional[List[dict]] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> List[dict[str, Any]]:
+        """
+        Scraping Facebook de manière synchrone (appelé par ThreadPoolExecutor).
+        cette méthode s'exécute dans un thread séparé et délègue à la loop
+        persistante du processus
+        """
+        deadline = deadline or Deadline.from_params(search_params)
+        return self.run_async(
+            self._scrape_facebook_async(
+                search_params, user_id, job_id, lat, lon, tiles, deadline
+            ),
+            timeout=deadline.remaining() + 5,
+        )
+
+    async def _scrape_facebook_async(
+        self,
+        search_params: dict[str, Any],
         user_id: str,
-        enrich_top_k: int,
         job_id: str,
+        lat: float,
+        lon: float,
+        tiles: Optional[List[dict]] = None,
+        deadline: Optional[Deadline] = None,
     ) -> List[dict[str, Any]]:
         """
-        Scraping Facebook de manière synchrone (appelé par ThreadPoolExecutor).
-        cette méthode s'exécute dans un thread séparé
+        Vérifie la session Facebook puis lance la collecte + enrichissement,
+        le tout dans les limites de l'échéance du job
         """
+        deadline = deadline or Deadline.from_params(search_params)
         try:
             # Vérifier/créer la session Facebook AVANT le scraping
             logger.info(
@@ -325,75 +612,39 @@ class ScrapingWorker:
             self._event_publisher.publish(
                 job_id, "progress", {"message": "Vérification de la session Facebook"}
             )
-            session = self.check_user_session(user_id)
+            # Lecture Mongo + éventuelle création (bloquant): hors de la loop
+            await asyncio.to_thread(self.check_user_session, user_id, deadline)
             logger.info(f"[{job_id}] Session Facebook validée pour {user_id[:8]}")
 
-            # define progress callback to publish SSE
-            def progress_cb(event: str, payload: dict):
-                try:
-                    self._event_publisher.publish(job_id, event, payload)
-                except Exception:
-                    logger.warning(f"[{job_id}] progress publish failed")
-
-            # créer un event loop pour ce thread
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-            try:
-
-                # Exécuter le scraping asynchrone avec progress callback
-                result = loop.run_until_complete(
-                    self.facebook_scraper.execute_async(
-                        lat,
-                        lon,
-                        min_price,
-                        max_price,
-                        min_bedrooms,
-                        max_bedrooms,
-                        user_id,
-                        [],
-                        job_id,
-                        top_k=enrich_top_k,
-                        
-                       
-                    )
-                )
-                return result or []
-
-            except Exception as e:
-                logger.error(f"Erreur dans _scrape_facebook_sync: {e}")
+            result = await self.facebook_scraper.execute_async(
+                lat,
+                lon,
+                search_params.get("min_price", 0),
+                search_params.get("max_price", 10000),
+                search_params.get("min_bedrooms", 1),
+                search_params.get("max_bedrooms", 5),
+                user_id,
+                [],
+                job_id,
+                top_k=search_params.get("enrich_top_k", 4),
+                tiles=tiles,
+                deadline=deadline,
+            )
+            return result or []
 
-                # Gestion d'erreur spécifique pour les sessions
-                if "session" in str(e).lower():
-                    error_message = "Erreur de session Facebook"
-                    retry_possible = True
-                else:
-                    error_message = "Erreur lors du scraping Facebook asynchrone"
-                    retry_possible = True
-
-                error_payload = {
-                    "error": str(e),
-                    "message": error_message,
-                    "timestamp": datetime.now().isoformat(),
-                    "retry_possible": retry_possible,
-                }
-                rq_job = get_current_job()
-                job_id = rq_job.id if rq_job else f"{user_id[:8]}_{int(time.time())}"
-                self._event_publisher.publish(job_id, "error", error_payload)
-                return []
+        except DeadlineExceeded as e:
+            # Plus de temps avant même la collecte: résultat partiel vide
+            logger.warning(f"[{job_id}] Échéance atteinte ({e})")
+            deadline.cut(str(e) or "session")
+            return []
 
         except Exception as e:
-            logger.error(f"Erreur dans _scrape_facebook_sync: {e}")
-            error_payload = {
-                "error": str(e),
-                "message": "Erreur lors du scraping Facebook asynchrone",
-                "timestamp": datetime.now().isoformat(),
-                "retry_possible": True,
-            }
-            rq_job = get_current_job()
-            job_id = rq_job.id if rq_job else f"{user_id[:8]}_{int(time.time())}"
-            self._event_publisher.publish(job_id, "error", error_payload)
-            return []
+            logger.error(f"Erreur dans _scrape_facebook_async: {e}")
+            # Pas de liste vide: un échec ne doit pas être mis en cache
+            # comme une recherche sans annonce (no_listings)
+            if "session" in str(e).lower():
+                raise ScrapeError(e, "Erreur de session Facebook") from e
+            raise ScrapeError(e, "Erreur lors du scraping Facebook asynchrone") from e
 
     def get_metrics(self) -> dict[str, Any]:
         """
@@ -415,45 +666,150 @@ class ScrapingWorker:
         }
 
 
+_worker_instance: Optional[ScrapingWorker] = None
+_worker_instance_lock = threading.Lock()
+
+
+def get_scraping_worker() -> ScrapingWorker:
+    """
+    Contexte de scraping du processus, créé au premier appel puis réutilisé
+    """
+    global _worker_instance
+    with _worker_instance_lock:
+        if _worker_instance is None:
+            _worker_instance = ScrapingWorker()
+        return _worker_instance
+
+
 def scrape_listings_job(
     search_params: dict[str, Any], user_id: str
 ) -> List[dict[str, Any]]:
     """
-    Fonction standalone pour RQ - crée une instance et appelle la méthode
+    Fonction standalone pour RQ - réutilise l'instance du processus
     Cette fonction peut être appelée directement par RQ sans passer par la classe
     """
     try:
-        worker_instance = ScrapingWorker()
-        return worker_instance.scrape_listings(search_params, user_id)
+        return get_scraping_worker().scrape_listings(search_params, user_id)
     except Exception as e:
         logger.error(f"Erreur dans scrape_listings_job: {e}")
         raise
 
 
+class ScrapingRQWorker(SimpleWorker):
+    """
+    Worker RQ sans fork: les jobs s'exécutent dans le processus du worker,
+    qui prépare le contexte de scraping au démarrage et le ferme à l'arrêt.
+
+    Les queues de scraping par niveau (scraping:high/default/prefetch) sont
+    servies en round-robin pondéré: l'ordre d'écoute est recalculé avant
+    chaque dequeue (WeightedQueueOrder), sans les niveaux saturés.
+    """
+
+    def bootstrap(self, *args, **kwargs):
+        super().bootstrap(*args, **kwargs)
+        if not rq.VERSION.startswith(RQ_SUPPORTED + "."):
+            logger.warning(
+                f"rq {rq.VERSION} non testé (attendu {RQ_SUPPORTED}.*): "
+                "l'ordre pondéré des queues repose sur reorder_queues"
+            )
+        self.recycler = WorkerRecycler()
+        self.queue_order = WeightedQueueOrder()
+        self.tier_tracker = TierTracker(self.connection)
+        # Attente max d'un BLPOP avant de recalculer l'ordre (plafonds levés)
+        self.priority_poll = int(os.getenv("QUEUE_PRIORITY_POLL", 5))
+        get_scraping_worker()._init_scraper()
+
+    def reorder_queues(self, reference_queue):
+        # Point d'extension de RQ pour les stratégies de dequeue (comme
+        # RoundRobinWorker/RandomWorker). RQ l'appelle après chaque dequeue
+        # avec la queue servie: ignoré, l'ordre est recalculé juste avant le
+        # dequeue suivant (un seul tour de round-robin par job)
+        if reference_queue is not None:
+            return
+        by_name = {queue.name: queue for queue in self.queues}
+        names = self.queue_order.order(
+            [queue.name for queue in self.queues],
+            blocked=self.tier_tracker.saturated_tiers(),
+        )
+        self._ordered_queues = [by_name[name] for name in names]
+
+    def dequeue_job_and_maintain_ttl(self, timeout, max_idle_time=None):
+        if max_idle_time is not None or timeout is None:
+            self.reorder_queues(reference_queue=None)
+            return super().dequeue_job_and_maintain_ttl(timeout, max_idle_time)
+        # BLPOP court puis nouvel ordre: un niveau saturé revient dès qu'un job
+        # se termine, le round-robin avance même sans trafic
+        while True:
+            self.reorder_queues(reference_queue=None)
+            result = super().dequeue_job_and_maintain_ttl(
+                self.priority_poll, max_idle_time=self.priority_poll
+            )
+            if result is not None or self._stop_requested:
+                return result
+
+    def execute_job(self, job, queue):
+        tier = tier_of_queue(queue.name)
+        if tier:
+            wait = self.tier_tracker.job_started(tier, job.id, job.enqueued_at)
+            if wait is not None:
+                logger.info(f"[{job.id}] niveau {tier}, attente en queue {wait:.1f}s")
+        try:
+            return super().execute_job(job, queue)
+        finally:
+            if tier:
+                self.tier_tracker.job_finished(tier, job.id)
+            # Entre deux jobs: s'arrêter si la mémoire/les pages/les jobs
+            # dépassent les seuils, le superviseur relance un processus neuf
+            if self.recycler.job_done(pages=browser_pool.pages_served):
+                self._stop_requested = True
+
+    def teardown(self):
+        try:
+            if _worker_instance is not None:
+                _worker_instance.shutdown()
+        finally:
+            super().teardown()
+
+
 def start_worker():
     """
     Point d'entrée pour démarrer un worker RQ
     cette fonction est appelée par RQ pour chaque processus worker.
     """
 
+    if os.getenv("WORKER_MODE", "rq") == "async":
+        # Mode asyncio: plusieurs jobs en parallèle sur une seule event loop
+        from workers.async_runner import start_async_runner
+
+        return start_async_runner()
+
     try:
         # Configuration Redis
         redis_url = os.getenv("REDIS_URL")
 
-        # Créer la queue directement (plus besoin de Connection)
-        queue = Queue("scraping", connection=redis.from_url(redis_url))
-
-        # Créer et démarrer le worker
-        worker = Worker([queue], connection=redis.from_url(redis_url))
+        # Queues écoutées (WORKER_QUEUES, par défaut les queues de scraping par
+        # niveau + l'ancienne queue "scraping"); l'ordre des niveaux est pondéré
+        connection = redis.from_url(redis_url)
+        serializer = rq_serializer()
+        queues = [
+            Queue(name.strip(), connection=connection, serializer=serializer)
+            for name in os.getenv(
+                "WORKER_QUEUES", ",".join(scraping_queue_names())
+            ).split(",")
+            if name.strip()
+        ]
+
+        # Créer et démarrer le worker (sans fork: contexte réutilisé entre jobs)
+        worker = ScrapingRQWorker(
+            queues, connection=redis.from_url(redis_url), serializer=serializer
+        )
 
         logger.info(f"Worker démarré avec PID {os.getpid()}")
-        logger.info(f"Ecoute la queue: {queue.name}")
+        logger.info(f"Ecoute les queues: {', '.join(q.name for q in queues)}")
 
         # Nouvelle API RQ 2.5 - plus de paramètres incompatibles
-        worker.work(
-            with_scheduler=True,
-            max_jobs=1000,  # Max jobs par worker avant redémarrage
-        )
+        # Redémarrage piloté par WorkerRecycler (WORKER_MAX_JOBS/PAGES/RSS_MB)
+        worker.work(with_scheduler=True)
 
     except Exception as e:
         logger.error(f"Erreur fatale du worker: {e}")
@@ -478,4 +834,9 @@ def start_worker():
 
 
 if __name__ == "__main__":
-    start_worker()
+    # Passer par le module importable: les jobs RQ résolvent
+    # workers.scraping_workers.scrape_listings_job, pas __main__, et doivent
+    # voir le même contexte de scraping
+    from workers.scraping_workers import start_worker as _start_worker
+
+    _start_worker()